@@ -1,20 +1,68 @@
-"""Candlestick pattern detection using pure numpy/pandas."""
+"""Candlestick pattern detection using pure numpy/pandas.
+
+Every pattern is evaluated as a boolean mask over the whole series at once;
+detections are then emitted in candle order, and in the order the patterns
+are listed below for candles that match more than one.
+"""
 
 import numpy as np
 import pandas as pd
 from typing import List, Dict
 
+from app.utils.candles import CandleFrame
+
+
+# (pattern_name, direction, confidence, description) in emission order
+PATTERN_META = [
+    ("Doji", "NEUTRAL", 0.6,
+     "Indecision candle - open and close nearly equal"),
+    ("Hammer", "BULLISH", 0.7,
+     "Bullish reversal - long lower shadow with small body at top"),
+    ("Inverted Hammer", "BULLISH", 0.65,
+     "Potential bullish reversal - long upper shadow"),
+    ("Shooting Star", "BEARISH", 0.7,
+     "Bearish reversal - long upper shadow with small body at bottom"),
+    ("Hanging Man", "BEARISH", 0.65,
+     "Bearish reversal - long lower shadow at top of uptrend"),
+    ("Bullish Marubozu", "BULLISH", 0.75,
+     "Strong bullish candle with no shadows"),
+    ("Bearish Marubozu", "BEARISH", 0.75,
+     "Strong bearish candle with no shadows"),
+    ("Spinning Top", "NEUTRAL", 0.55,
+     "Indecision - small body with shadows on both sides"),
+    ("Bullish Engulfing", "BULLISH", 0.8,
+     "Strong bullish reversal - bullish candle completely engulfs previous bearish candle"),
+    ("Bearish Engulfing", "BEARISH", 0.8,
+     "Strong bearish reversal - bearish candle completely engulfs previous bullish candle"),
+    ("Piercing Line", "BULLISH", 0.7,
+     "Bullish reversal - opens below previous low, closes above midpoint"),
+    ("Dark Cloud Cover", "BEARISH", 0.7,
+     "Bearish reversal - opens above previous high, closes below midpoint"),
+    ("Tweezer Bottom", "BULLISH", 0.65,
+     "Bullish reversal - two candles with matching lows"),
+    ("Tweezer Top", "BEARISH", 0.65,
+     "Bearish reversal - two candles with matching highs"),
+    ("Morning Star", "BULLISH", 0.85,
+     "Strong bullish reversal - three candle pattern with gap down and recovery"),
+    ("Evening Star", "BEARISH", 0.85,
+     "Strong bearish reversal - three candle pattern with gap up and decline"),
+    ("Three White Soldiers", "BULLISH", 0.85,
+     "Strong bullish continuation - three consecutive long bullish candles"),
+    ("Three Black Crows", "BEARISH", 0.85,
+     "Strong bearish continuation - three consecutive long bearish candles"),
+]
+
 
 def _body(o, c):
-    return abs(c - o)
+    return np.abs(c - o)
 
 
 def _upper_shadow(h, o, c):
-    return h - max(o, c)
+    return h - np.maximum(o, c)
 
 
 def _lower_shadow(o, c, l):
-    return min(o, c) - l
+    return np.minimum(o, c) - l
 
 
 def _is_bullish(o, c):
@@ -25,249 +73,98 @@ def _is_bearish(o, c):
     return c < o
 
 
-def detect_patterns(candles: List[Dict]) -> List[Dict]:
-    """Detect candlestick patterns from OHLCV data."""
-    if len(candles) < 5:
-        return []
-
-    df = pd.DataFrame(candles)
-    patterns = []
-
-    o = df["open"].values
-    h = df["high"].values
-    l = df["low"].values
-    c = df["close"].values
-    v = df["volume"].values
-    times = df["time"].values
-
-    avg_body = pd.Series(abs(c - o)).rolling(20).mean().values
-
-    for i in range(2, len(df)):
-        body_i = _body(o[i], c[i])
-        upper_i = _upper_shadow(h[i], o[i], c[i])
-        lower_i = _lower_shadow(o[i], c[i], l[i])
-        avg = avg_body[i] if not np.isnan(avg_body[i]) else body_i
-
-        if avg == 0:
-            avg = 0.01
-
+def _pattern_masks(o, h, l, c) -> np.ndarray:
+    """Evaluate every pattern for candles 2..n-1.
+
+    Returns a (len(PATTERN_META), n - 2) boolean matrix; column k refers to
+    candle k + 2 so that two- and three-candle lookbacks are plain slices.
+    """
+    body = _body(o, c)
+    avg_body = pd.Series(body).rolling(20).mean().values
+
+    # Current candle (i), previous (i-1) and the one before that (i-2)
+    o0, h0, l0, c0 = o[2:], h[2:], l[2:], c[2:]
+    o1, h1, l1, c1 = o[1:-1], h[1:-1], l[1:-1], c[1:-1]
+    o2, c2 = o[:-2], c[:-2]
+
+    body_i = body[2:]
+    body_prev = body[1:-1]
+    body_2 = body[:-2]
+    upper_i = _upper_shadow(h0, o0, c0)
+    lower_i = _lower_shadow(o0, c0, l0)
+
+    avg = avg_body[2:]
+    avg = np.where(np.isnan(avg), body_i, avg)
+    avg = np.where(avg == 0, 0.01, avg)
+
+    bull_i = _is_bullish(o0, c0)
+    bear_i = _is_bearish(o0, c0)
+    bull_prev = _is_bullish(o1, c1)
+    bear_prev = _is_bearish(o1, c1)
+    bull_2 = _is_bullish(o2, c2)
+    bear_2 = _is_bearish(o2, c2)
+
+    # Shared single-candle shapes
+    long_lower = (lower_i > body_i * 2) & (upper_i < body_i * 0.3) & (body_i > avg * 0.3)
+    long_upper = (upper_i > body_i * 2) & (lower_i < body_i * 0.3) & (body_i > avg * 0.3)
+    no_shadows = (body_i > avg * 1.5) & (upper_i < body_i * 0.05) & (lower_i < body_i * 0.05)
+    three_long = (body_i > avg * 0.5) & (body_prev > avg * 0.5) & (body_2 > avg * 0.5)
+
+    return np.vstack([
         # --- Single candle patterns ---
-
-        # Doji
-        if body_i < avg * 0.1:
-            patterns.append({
-                "time": int(times[i]),
-                "pattern_name": "Doji",
-                "direction": "NEUTRAL",
-                "confidence": 0.6,
-                "description": "Indecision candle - open and close nearly equal",
-            })
-
-        # Hammer (bullish reversal)
-        if (lower_i > body_i * 2 and upper_i < body_i * 0.3 and
-                body_i > avg * 0.3 and _is_bullish(o[i], c[i])):
-            patterns.append({
-                "time": int(times[i]),
-                "pattern_name": "Hammer",
-                "direction": "BULLISH",
-                "confidence": 0.7,
-                "description": "Bullish reversal - long lower shadow with small body at top",
-            })
-
-        # Inverted Hammer
-        if (upper_i > body_i * 2 and lower_i < body_i * 0.3 and
-                body_i > avg * 0.3 and _is_bullish(o[i], c[i])):
-            patterns.append({
-                "time": int(times[i]),
-                "pattern_name": "Inverted Hammer",
-                "direction": "BULLISH",
-                "confidence": 0.65,
-                "description": "Potential bullish reversal - long upper shadow",
-            })
-
-        # Shooting Star (bearish)
-        if (upper_i > body_i * 2 and lower_i < body_i * 0.3 and
-                body_i > avg * 0.3 and _is_bearish(o[i], c[i])):
-            patterns.append({
-                "time": int(times[i]),
-                "pattern_name": "Shooting Star",
-                "direction": "BEARISH",
-                "confidence": 0.7,
-                "description": "Bearish reversal - long upper shadow with small body at bottom",
-            })
-
-        # Hanging Man
-        if (lower_i > body_i * 2 and upper_i < body_i * 0.3 and
-                body_i > avg * 0.3 and _is_bearish(o[i], c[i])):
-            patterns.append({
-                "time": int(times[i]),
-                "pattern_name": "Hanging Man",
-                "direction": "BEARISH",
-                "confidence": 0.65,
-                "description": "Bearish reversal - long lower shadow at top of uptrend",
-            })
-
-        # Marubozu (Bullish)
-        if (_is_bullish(o[i], c[i]) and body_i > avg * 1.5 and
-                upper_i < body_i * 0.05 and lower_i < body_i * 0.05):
-            patterns.append({
-                "time": int(times[i]),
-                "pattern_name": "Bullish Marubozu",
-                "direction": "BULLISH",
-                "confidence": 0.75,
-                "description": "Strong bullish candle with no shadows",
-            })
-
-        # Marubozu (Bearish)
-        if (_is_bearish(o[i], c[i]) and body_i > avg * 1.5 and
-                upper_i < body_i * 0.05 and lower_i < body_i * 0.05):
-            patterns.append({
-                "time": int(times[i]),
-                "pattern_name": "Bearish Marubozu",
-                "direction": "BEARISH",
-                "confidence": 0.75,
-                "description": "Strong bearish candle with no shadows",
-            })
-
-        # Spinning Top
-        if (body_i < avg * 0.3 and upper_i > body_i and lower_i > body_i):
-            if body_i > avg * 0.05:  # Not a doji
-                patterns.append({
-                    "time": int(times[i]),
-                    "pattern_name": "Spinning Top",
-                    "direction": "NEUTRAL",
-                    "confidence": 0.55,
-                    "description": "Indecision - small body with shadows on both sides",
-                })
-
-        if i < 1:
-            continue
+        body_i < avg * 0.1,                                       # Doji
+        long_lower & bull_i,                                      # Hammer
+        long_upper & bull_i,                                      # Inverted Hammer
+        long_upper & bear_i,                                      # Shooting Star
+        long_lower & bear_i,                                      # Hanging Man
+        bull_i & no_shadows,                                      # Bullish Marubozu
+        bear_i & no_shadows,                                      # Bearish Marubozu
+        ((body_i < avg * 0.3) & (upper_i > body_i) & (lower_i > body_i) &
+         (body_i > avg * 0.05)),                                  # Spinning Top
 
         # --- Two candle patterns ---
-        body_prev = _body(o[i-1], c[i-1])
-
-        # Bullish Engulfing
-        if (_is_bearish(o[i-1], c[i-1]) and _is_bullish(o[i], c[i]) and
-                o[i] <= c[i-1] and c[i] >= o[i-1] and body_i > body_prev):
-            patterns.append({
-                "time": int(times[i]),
-                "pattern_name": "Bullish Engulfing",
-                "direction": "BULLISH",
-                "confidence": 0.8,
-                "description": "Strong bullish reversal - bullish candle completely engulfs previous bearish candle",
-            })
-
-        # Bearish Engulfing
-        if (_is_bullish(o[i-1], c[i-1]) and _is_bearish(o[i], c[i]) and
-                o[i] >= c[i-1] and c[i] <= o[i-1] and body_i > body_prev):
-            patterns.append({
-                "time": int(times[i]),
-                "pattern_name": "Bearish Engulfing",
-                "direction": "BEARISH",
-                "confidence": 0.8,
-                "description": "Strong bearish reversal - bearish candle completely engulfs previous bullish candle",
-            })
-
-        # Piercing Line
-        if (_is_bearish(o[i-1], c[i-1]) and _is_bullish(o[i], c[i]) and
-                o[i] < l[i-1] and c[i] > (o[i-1] + c[i-1]) / 2 and c[i] < o[i-1]):
-            patterns.append({
-                "time": int(times[i]),
-                "pattern_name": "Piercing Line",
-                "direction": "BULLISH",
-                "confidence": 0.7,
-                "description": "Bullish reversal - opens below previous low, closes above midpoint",
-            })
-
-        # Dark Cloud Cover
-        if (_is_bullish(o[i-1], c[i-1]) and _is_bearish(o[i], c[i]) and
-                o[i] > h[i-1] and c[i] < (o[i-1] + c[i-1]) / 2 and c[i] > o[i-1]):
-            patterns.append({
-                "time": int(times[i]),
-                "pattern_name": "Dark Cloud Cover",
-                "direction": "BEARISH",
-                "confidence": 0.7,
-                "description": "Bearish reversal - opens above previous high, closes below midpoint",
-            })
-
-        # Tweezer Bottom
-        if (abs(l[i] - l[i-1]) < avg * 0.05 and
-                _is_bearish(o[i-1], c[i-1]) and _is_bullish(o[i], c[i])):
-            patterns.append({
-                "time": int(times[i]),
-                "pattern_name": "Tweezer Bottom",
-                "direction": "BULLISH",
-                "confidence": 0.65,
-                "description": "Bullish reversal - two candles with matching lows",
-            })
-
-        # Tweezer Top
-        if (abs(h[i] - h[i-1]) < avg * 0.05 and
-                _is_bullish(o[i-1], c[i-1]) and _is_bearish(o[i], c[i])):
-            patterns.append({
-                "time": int(times[i]),
-                "pattern_name": "Tweezer Top",
-                "direction": "BEARISH",
-                "confidence": 0.65,
-                "description": "Bearish reversal - two candles with matching highs",
-            })
-
-        if i < 2:
-            continue
+        (bear_prev & bull_i & (o0 <= c1) & (c0 >= o1) &
+         (body_i > body_prev)),                                   # Bullish Engulfing
+        (bull_prev & bear_i & (o0 >= c1) & (c0 <= o1) &
+         (body_i > body_prev)),                                   # Bearish Engulfing
+        (bear_prev & bull_i & (o0 < l1) &
+         (c0 > (o1 + c1) / 2) & (c0 < o1)),                       # Piercing Line
+        (bull_prev & bear_i & (o0 > h1) &
+         (c0 < (o1 + c1) / 2) & (c0 > o1)),                       # Dark Cloud Cover
+        (np.abs(l0 - l1) < avg * 0.05) & bear_prev & bull_i,      # Tweezer Bottom
+        (np.abs(h0 - h1) < avg * 0.05) & bull_prev & bear_i,      # Tweezer Top
 
         # --- Three candle patterns ---
+        (bear_2 & (body_2 > avg) & (body_prev < avg * 0.3) &
+         bull_i & (body_i > avg) & (c0 > (o2 + c2) / 2)),         # Morning Star
+        (bull_2 & (body_2 > avg) & (body_prev < avg * 0.3) &
+         bear_i & (body_i > avg) & (c0 < (o2 + c2) / 2)),         # Evening Star
+        (bull_i & bull_prev & bull_2 & (c0 > c1) & (c1 > c2) &
+         (o0 > o1) & (o1 > o2) & three_long),                     # Three White Soldiers
+        (bear_i & bear_prev & bear_2 & (c0 < c1) & (c1 < c2) &
+         (o0 < o1) & (o1 < o2) & three_long),                     # Three Black Crows
+    ])
+
+
+def detect_patterns(candles: CandleFrame) -> List[Dict]:
+    """Detect candlestick patterns from OHLCV data."""
+    if len(candles) < 5:
+        return []
 
-        # Morning Star
-        body_2 = _body(o[i-2], c[i-2])
-        if (_is_bearish(o[i-2], c[i-2]) and body_2 > avg and
-                body_prev < avg * 0.3 and
-                _is_bullish(o[i], c[i]) and body_i > avg and
-                c[i] > (o[i-2] + c[i-2]) / 2):
-            patterns.append({
-                "time": int(times[i]),
-                "pattern_name": "Morning Star",
-                "direction": "BULLISH",
-                "confidence": 0.85,
-                "description": "Strong bullish reversal - three candle pattern with gap down and recovery",
-            })
-
-        # Evening Star
-        if (_is_bullish(o[i-2], c[i-2]) and body_2 > avg and
-                body_prev < avg * 0.3 and
-                _is_bearish(o[i], c[i]) and body_i > avg and
-                c[i] < (o[i-2] + c[i-2]) / 2):
-            patterns.append({
-                "time": int(times[i]),
-                "pattern_name": "Evening Star",
-                "direction": "BEARISH",
-                "confidence": 0.85,
-                "description": "Strong bearish reversal - three candle pattern with gap up and decline",
-            })
-
-        # Three White Soldiers
-        if (all(_is_bullish(o[i-j], c[i-j]) for j in range(3)) and
-                c[i] > c[i-1] > c[i-2] and
-                o[i] > o[i-1] > o[i-2] and
-                all(_body(o[i-j], c[i-j]) > avg * 0.5 for j in range(3))):
-            patterns.append({
-                "time": int(times[i]),
-                "pattern_name": "Three White Soldiers",
-                "direction": "BULLISH",
-                "confidence": 0.85,
-                "description": "Strong bullish continuation - three consecutive long bullish candles",
-            })
+    masks = _pattern_masks(candles.open, candles.high, candles.low, candles.close)
 
-        # Three Black Crows
-        if (all(_is_bearish(o[i-j], c[i-j]) for j in range(3)) and
-                c[i] < c[i-1] < c[i-2] and
-                o[i] < o[i-1] < o[i-2] and
-                all(_body(o[i-j], c[i-j]) > avg * 0.5 for j in range(3))):
-            patterns.append({
-                "time": int(times[i]),
-                "pattern_name": "Three Black Crows",
-                "direction": "BEARISH",
-                "confidence": 0.85,
-                "description": "Strong bearish continuation - three consecutive long bearish candles",
-            })
+    # Transposing makes nonzero() walk candle-major, pattern-minor
+    candle_idx, pattern_idx = np.nonzero(masks.T)
+    hit_times = candles.time[2:][candle_idx].tolist()
 
+    patterns = []
+    for t, p in zip(hit_times, pattern_idx.tolist()):
+        name, direction, confidence, description = PATTERN_META[p]
+        patterns.append({
+            "time": t,
+            "pattern_name": name,
+            "direction": direction,
+            "confidence": confidence,
+            "description": description,
+        })
     return patterns
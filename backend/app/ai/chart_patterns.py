@@ -1,9 +1,19 @@
-"""Chart pattern detection using scipy for peak/trough detection."""
+"""Chart pattern detection using scipy for peak/trough detection.
+
+The local extrema of a series are found once per `order` (see Extrema) and
+shared by every detector in detect_all_chart_patterns. Head and shoulders
+and double tops/bottoms test all consecutive peak triples/pairs at once
+with array operations; only matches are turned into dicts. Confidences
+are computed as arrays but rounded per match with Python's round(), since
+np.round scales by 100 first and can break x.xx5 ties differently.
+"""
 
 import numpy as np
 import pandas as pd
 from scipy.signal import argrelextrema
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+
+from app.utils.candles import CandleFrame
 
 
 def _find_peaks_troughs(closes: np.ndarray, order: int = 5):
@@ -13,114 +23,126 @@ def _find_peaks_troughs(closes: np.ndarray, order: int = 5):
     return peaks, troughs
 
 
-def detect_head_and_shoulders(candles: List[Dict], order: int = 5) -> List[Dict]:
+class Extrema:
+    """Peaks and troughs of one close series, computed once per `order`."""
+
+    def __init__(self, closes: np.ndarray):
+        self.closes = closes
+        self._by_order: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def get(self, order: int) -> Tuple[np.ndarray, np.ndarray]:
+        if order not in self._by_order:
+            self._by_order[order] = _find_peaks_troughs(self.closes, order)
+        return self._by_order[order]
+
+
+def detect_head_and_shoulders(candles: CandleFrame, order: int = 5,
+                              extrema: Optional[Extrema] = None) -> List[Dict]:
     """Detect Head and Shoulders pattern."""
     patterns = []
     if len(candles) < 30:
         return patterns
 
-    closes = np.array([c["close"] for c in candles])
-    times = np.array([c["time"] for c in candles])
-    peaks, troughs = _find_peaks_troughs(closes, order)
+    closes = candles.close
+    times = candles.time
+    peaks, troughs = (extrema or Extrema(closes)).get(order)
 
     if len(peaks) < 3 or len(troughs) < 2:
         return patterns
 
-    for i in range(len(peaks) - 2):
-        p1, p2, p3 = peaks[i], peaks[i + 1], peaks[i + 2]
-        left_shoulder = closes[p1]
-        head = closes[p2]
-        right_shoulder = closes[p3]
-
-        # Head should be highest
-        if head <= left_shoulder or head <= right_shoulder:
-            continue
-
-        # Shoulders should be roughly equal (within 3%)
-        shoulder_diff = abs(left_shoulder - right_shoulder) / max(left_shoulder, right_shoulder)
-        if shoulder_diff > 0.03:
-            continue
-
-        # Find neckline troughs between shoulders
-        t_between = troughs[(troughs > p1) & (troughs < p3)]
-        if len(t_between) < 2:
-            continue
-
-        confidence = 0.7 + min(0.2, (1 - shoulder_diff) * 0.2)
-
+    # Every consecutive peak triple at once
+    p1, p2, p3 = peaks[:-2], peaks[1:-1], peaks[2:]
+    left, head, right = closes[p1], closes[p2], closes[p3]
+    # Head should be highest
+    ok = ~((head <= left) | (head <= right))
+    # Shoulders should be roughly equal (within 3%)
+    shoulder_diff = np.abs(left - right) / np.maximum(left, right)
+    ok &= ~(shoulder_diff > 0.03)
+    # At least two neckline troughs between the shoulders
+    between = np.searchsorted(troughs, p3, "left") - np.searchsorted(troughs, p1, "right")
+    ok &= between >= 2
+
+    confidence = 0.7 + np.minimum(0.2, (1 - shoulder_diff[ok]) * 0.2)
+    for t1, t2, t3, left_shoulder, head_price, right_shoulder, conf in zip(
+            times[p1[ok]].tolist(), times[p2[ok]].tolist(), times[p3[ok]].tolist(),
+            left[ok].tolist(), head[ok].tolist(), right[ok].tolist(), confidence.tolist()):
         patterns.append({
-            "time": int(times[p3]),
+            "time": t3,
             "pattern_name": "Head and Shoulders",
             "direction": "BEARISH",
-            "confidence": round(confidence, 2),
-            "description": f"Bearish reversal pattern. Head: {head:.2f}, Shoulders: {left_shoulder:.2f}/{right_shoulder:.2f}",
+            "confidence": round(conf, 2),
+            "description": f"Bearish reversal pattern. Head: {head_price:.2f}, Shoulders: {left_shoulder:.2f}/{right_shoulder:.2f}",
             "points": {
-                "left_shoulder": {"time": int(times[p1]), "price": float(left_shoulder)},
-                "head": {"time": int(times[p2]), "price": float(head)},
-                "right_shoulder": {"time": int(times[p3]), "price": float(right_shoulder)},
+                "left_shoulder": {"time": t1, "price": left_shoulder},
+                "head": {"time": t2, "price": head_price},
+                "right_shoulder": {"time": t3, "price": right_shoulder},
             }
         })
 
     return patterns
 
 
-def detect_double_top_bottom(candles: List[Dict], order: int = 5) -> List[Dict]:
+def _similar_pairs(closes: np.ndarray, times: np.ndarray, points: np.ndarray):
+    """Consecutive extrema at least 5 bars apart and within 2% of each other.
+
+    Yields (first price, second price, second time, confidence) per match.
+    """
+    a, b = points[:-1], points[1:]
+    first, second = closes[a], closes[b]
+    price_diff = np.abs(first - second) / np.maximum(first, second)
+    ok = ((b - a) >= 5) & (price_diff < 0.02)
+    confidence = 0.75 + np.minimum(0.15, (1 - price_diff[ok]) * 0.15)
+    return zip(first[ok].tolist(), second[ok].tolist(), times[b[ok]].tolist(),
+               [round(c, 2) for c in confidence.tolist()])
+
+
+def detect_double_top_bottom(candles: CandleFrame, order: int = 5,
+                             extrema: Optional[Extrema] = None) -> List[Dict]:
     """Detect Double Top and Double Bottom patterns."""
     patterns = []
     if len(candles) < 20:
         return patterns
 
-    closes = np.array([c["close"] for c in candles])
-    times = np.array([c["time"] for c in candles])
-    peaks, troughs = _find_peaks_troughs(closes, order)
+    closes = candles.close
+    times = candles.time
+    peaks, troughs = (extrema or Extrema(closes)).get(order)
 
     # Double Top
-    for i in range(len(peaks) - 1):
-        p1, p2 = peaks[i], peaks[i + 1]
-        if p2 - p1 < 5:
-            continue
-        price_diff = abs(closes[p1] - closes[p2]) / max(closes[p1], closes[p2])
-        if price_diff < 0.02:
-            confidence = 0.75 + min(0.15, (1 - price_diff) * 0.15)
-            patterns.append({
-                "time": int(times[p2]),
-                "pattern_name": "Double Top",
-                "direction": "BEARISH",
-                "confidence": round(confidence, 2),
-                "description": f"Bearish reversal - two peaks at similar levels ({closes[p1]:.2f}, {closes[p2]:.2f})",
-            })
+    for first, second, time, confidence in _similar_pairs(closes, times, peaks):
+        patterns.append({
+            "time": time,
+            "pattern_name": "Double Top",
+            "direction": "BEARISH",
+            "confidence": confidence,
+            "description": f"Bearish reversal - two peaks at similar levels ({first:.2f}, {second:.2f})",
+        })
 
     # Double Bottom
-    for i in range(len(troughs) - 1):
-        t1, t2 = troughs[i], troughs[i + 1]
-        if t2 - t1 < 5:
-            continue
-        price_diff = abs(closes[t1] - closes[t2]) / max(closes[t1], closes[t2])
-        if price_diff < 0.02:
-            confidence = 0.75 + min(0.15, (1 - price_diff) * 0.15)
-            patterns.append({
-                "time": int(times[t2]),
-                "pattern_name": "Double Bottom",
-                "direction": "BULLISH",
-                "confidence": round(confidence, 2),
-                "description": f"Bullish reversal - two troughs at similar levels ({closes[t1]:.2f}, {closes[t2]:.2f})",
-            })
+    for first, second, time, confidence in _similar_pairs(closes, times, troughs):
+        patterns.append({
+            "time": time,
+            "pattern_name": "Double Bottom",
+            "direction": "BULLISH",
+            "confidence": confidence,
+            "description": f"Bullish reversal - two troughs at similar levels ({first:.2f}, {second:.2f})",
+        })
 
     return patterns
 
 
-def detect_triangles(candles: List[Dict], min_points: int = 4) -> List[Dict]:
+def detect_triangles(candles: CandleFrame, min_points: int = 4,
+                     extrema: Optional[Extrema] = None) -> List[Dict]:
     """Detect triangle patterns (ascending, descending, symmetric)."""
     patterns = []
     if len(candles) < 20:
         return patterns
 
-    closes = np.array([c["close"] for c in candles])
-    highs = np.array([c["high"] for c in candles])
-    lows = np.array([c["low"] for c in candles])
-    times = np.array([c["time"] for c in candles])
+    closes = candles.close
+    highs = candles.high
+    lows = candles.low
+    times = candles.time
 
-    peaks, troughs = _find_peaks_troughs(closes, order=3)
+    peaks, troughs = (extrema or Extrema(closes)).get(3)
 
     if len(peaks) < 2 or len(troughs) < 2:
         return patterns
@@ -170,18 +192,18 @@ def detect_triangles(candles: List[Dict], min_points: int = 4) -> List[Dict]:
     return patterns
 
 
-def detect_wedges(candles: List[Dict]) -> List[Dict]:
+def detect_wedges(candles: CandleFrame, extrema: Optional[Extrema] = None) -> List[Dict]:
     """Detect Rising and Falling Wedge patterns."""
     patterns = []
     if len(candles) < 20:
         return patterns
 
-    closes = np.array([c["close"] for c in candles])
-    highs = np.array([c["high"] for c in candles])
-    lows = np.array([c["low"] for c in candles])
-    times = np.array([c["time"] for c in candles])
+    closes = candles.close
+    highs = candles.high
+    lows = candles.low
+    times = candles.time
 
-    peaks, troughs = _find_peaks_troughs(closes, order=3)
+    peaks, troughs = (extrema or Extrema(closes)).get(3)
 
     if len(peaks) < 2 or len(troughs) < 2:
         return patterns
@@ -222,11 +244,12 @@ def detect_wedges(candles: List[Dict]) -> List[Dict]:
     return patterns
 
 
-def detect_all_chart_patterns(candles: List[Dict]) -> List[Dict]:
-    """Run all chart pattern detectors."""
+def detect_all_chart_patterns(candles: CandleFrame) -> List[Dict]:
+    """Run all chart pattern detectors, sharing one extrema search per order."""
+    extrema = Extrema(candles.close)
     patterns = []
-    patterns.extend(detect_head_and_shoulders(candles))
-    patterns.extend(detect_double_top_bottom(candles))
-    patterns.extend(detect_triangles(candles))
-    patterns.extend(detect_wedges(candles))
+    patterns.extend(detect_head_and_shoulders(candles, extrema=extrema))
+    patterns.extend(detect_double_top_bottom(candles, extrema=extrema))
+    patterns.extend(detect_triangles(candles, extrema=extrema))
+    patterns.extend(detect_wedges(candles, extrema=extrema))
     return patterns
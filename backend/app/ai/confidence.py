@@ -3,15 +3,17 @@
 import numpy as np
 from typing import List, Dict
 
+from app.utils.candles import CandleFrame
 
-def adjust_confidence(patterns: List[Dict], candles: List[Dict]) -> List[Dict]:
+
+def adjust_confidence(patterns: List[Dict], candles: CandleFrame) -> List[Dict]:
     """Adjust pattern confidence based on volume and trend context."""
     if not patterns or not candles:
         return patterns
 
-    closes = np.array([c["close"] for c in candles])
-    volumes = np.array([c["volume"] for c in candles])
-    times = np.array([c["time"] for c in candles])
+    closes = candles.close
+    volumes = candles.volume
+    times = candles.time
 
     avg_volume = np.mean(volumes[-20:]) if len(volumes) >= 20 else np.mean(volumes)
 
@@ -0,0 +1,22 @@
+"""Full pattern analysis for one candle series.
+
+Kept free of service/async imports so it can run in worker processes.
+"""
+
+from typing import List, Dict
+
+from app.ai.candlestick_patterns import detect_patterns as detect_candlestick
+from app.ai.chart_patterns import detect_all_chart_patterns
+from app.ai.confidence import adjust_confidence
+from app.utils.candles import CandleFrame
+
+
+def analyze_patterns(candles: CandleFrame) -> List[Dict]:
+    """Candlestick and chart patterns, tagged by type, with context-adjusted confidence."""
+    candlestick = detect_candlestick(candles)
+    chart = detect_all_chart_patterns(candles)
+    for p in candlestick:
+        p["pattern_type"] = "candlestick"
+    for p in chart:
+        p["pattern_type"] = "chart"
+    return adjust_confidence(candlestick + chart, candles)
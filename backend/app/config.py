@@ -6,15 +6,67 @@ import json
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite+aiosqlite:///./stock_analyzer.db"
     CORS_ORIGINS: str = '["http://localhost:5173","http://127.0.0.1:5173"]'
-    PRICE_POLL_INTERVAL: int = 5
+    PRICE_POLL_INTERVAL: int = 5  # hot-tier interval; see app.services.poll_scheduler
+    POLL_WARM_INTERVAL: int = 15
+    POLL_COLD_INTERVAL: int = 60
+    POLL_HOT_SYMBOLS: int = 25
+    POLL_WARM_SYMBOLS: int = 100
+    POLL_OFF_HOURS_FACTOR: float = 12.0
+    POLL_BUDGET_PER_MINUTE: int = 600  # upstream quote lookups (symbols) per minute
     INDEX_POLL_INTERVAL: int = 10
+    SNAPSHOT_REFRESH_INTERVAL: int = 30
+    INDICATOR_SNAPSHOT_INTERVAL: int = 60  # check for changed daily bars; rebuild only then
+    FUNDAMENTALS_REFRESH_INTERVAL: int = 900  # how often to look for stale fundamentals
+    FUNDAMENTALS_TTL_HOURS: int = 24  # a row older than this is refetched
+    FUNDAMENTALS_BATCH_SIZE: int = 10  # symbols per upstream job
+    FUNDAMENTALS_CONCURRENCY: int = 4  # batches in flight
     NEWS_POLL_INTERVAL: int = 300
     PATTERN_SCAN_INTERVAL: int = 60
+    LIVE_CANDLE_INTERVALS: str = "1m,5m,15m,1h,1d"  # forming bars built from polled quotes
+    PATTERN_SCAN_SYMBOLS: str = ""  # comma-separated; empty scans all of NIFTY 50
+    PATTERN_SCAN_FETCH_CONCURRENCY: int = 8
+    PATTERN_ALERT_CACHE_SIZE: int = 5000
+
+    # WebSocket fan-out: per-connection outbound queue and slow-client handling
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_SLOW_CLIENT_POLICY: str = "conflate"  # or "drop_oldest"
+    WS_SEND_TIMEOUT: float = 10.0
+    WS_BATCH_FULL_EVERY: int = 12  # batch-mode clients get a full snapshot every N frames
+
+    # /api/patterns/scan defaults
+    SCAN_CONCURRENCY: int = 16
+    SCAN_TIME_BUDGET: float = 15.0
+    SCAN_MAX_SYMBOLS: int = 500
+
+    # Process pool for pattern detection and indicators (0 = run inline)
+    CPU_WORKERS: int = 2
+    CPU_MAX_PENDING: int = 64
+
+    # Market data source: "yfinance" (live) or "replay" (offline, deterministic)
+    MARKET_DATA_PROVIDER: str = "yfinance"
+    REPLAY_DATA_DIR: str = ""  # <SYMBOL>_<interval>.csv/.parquet; synthetic walk if absent
+    REPLAY_LATENCY_MS: int = 0
+    REPLAY_FAILURE_RATE: float = 0.0
+    REPLAY_SEED: int = 42
+    MARKET_DATA_WORKERS: int = 16  # threads for blocking upstream calls
+
+    # On-disk OHLCV store (one SQLite file per provider); empty disables it
+    HISTORY_STORE_DIR: str = "./history_store"
+    HISTORY_TAIL_TTL: int = 60  # min seconds between tail fetches per symbol/interval
+    HISTORY_REVALIDATE_HOURS: int = 24  # full refetch to pick up split/dividend adjustments
 
     @property
     def cors_origins_list(self) -> List[str]:
         return json.loads(self.CORS_ORIGINS)
 
+    @property
+    def pattern_scan_symbols_list(self) -> List[str]:
+        return [s.strip().upper() for s in self.PATTERN_SCAN_SYMBOLS.split(",") if s.strip()]
+
+    @property
+    def live_candle_intervals_list(self) -> List[str]:
+        return [s.strip() for s in self.LIVE_CANDLE_INTERVALS.split(",") if s.strip()]
+
     class Config:
         env_file = ".env"
 
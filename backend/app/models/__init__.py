@@ -2,8 +2,9 @@ from app.models.stock import Stock
 from app.models.portfolio import Portfolio, Holding, Transaction
 from app.models.watchlist import Watchlist, WatchlistItem
 from app.models.pattern import PatternDetection
+from app.models.indicator_snapshot import IndicatorSnapshot
 
 __all__ = [
     "Stock", "Portfolio", "Holding", "Transaction",
-    "Watchlist", "WatchlistItem", "PatternDetection"
+    "Watchlist", "WatchlistItem", "PatternDetection", "IndicatorSnapshot"
 ]
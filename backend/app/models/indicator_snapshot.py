@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, Float, BigInteger
+from app.database import Base
+
+
+class IndicatorSnapshot(Base):
+    """Latest daily indicator values per symbol; the on-disk copy of the
+    in-memory table in app.services.indicator_snapshot."""
+
+    __tablename__ = "indicator_snapshots"
+
+    symbol = Column(String(20), primary_key=True)
+    bar_time = Column(BigInteger)  # time of the last bar the values include
+    bars = Column(Integer, nullable=False)
+    close = Column(Float)
+    rsi = Column(Float)
+    macd = Column(Float)
+    macd_prev = Column(Float)
+    macd_signal = Column(Float)
+    macd_signal_prev = Column(Float)
+    sma20 = Column(Float)
+    sma50 = Column(Float)
+    sma200 = Column(Float)
+    volume = Column(Float)
+    avg_volume_20 = Column(Float)
+    volume_ratio = Column(Float)
+    atr = Column(Float)
+    high_52w = Column(Float)
+    low_52w = Column(Float)
+    pct_from_52w_high = Column(Float)
+    pct_from_52w_low = Column(Float)
+    computed_at = Column(Float, nullable=False)
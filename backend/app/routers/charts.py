@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
 from app.services.chart_service import get_chart_data
-from app.services.indicator_service import get_indicators
+from app.services.indicator_service import compute_indicators
+from app.services.cpu_executor import cpu_executor
 
 router = APIRouter(prefix="/api/charts", tags=["charts"])
 
@@ -12,10 +13,13 @@ async def get_chart(
     interval: str = "1d",
     period: Optional[str] = None,
     indicators: Optional[str] = None,
+    timings: bool = False,
 ):
     """Get chart data with optional indicators.
 
-    indicators: comma-separated list (e.g., 'sma20,rsi,macd,bollinger')
+    indicators: comma-separated list (e.g., 'sma20,rsi,macd,bollinger');
+    parameterized names such as 'sma:100' or 'ema:9' are also accepted.
+    timings: include per-indicator compute time in milliseconds.
     """
     symbol = symbol.upper().strip()
     chart_data = await get_chart_data(symbol, interval, period)
@@ -24,6 +28,12 @@ async def get_chart(
 
     if indicators:
         indicator_list = [i.strip() for i in indicators.split(",")]
-        chart_data["indicators"] = get_indicators(chart_data["candles"], indicator_list)
+        results, indicator_timings = await cpu_executor.run(
+            compute_indicators, chart_data["candles"], indicator_list,
+        )
+        chart_data["indicators"] = results
+        if timings:
+            chart_data["indicator_timings_ms"] = indicator_timings
 
+    chart_data["candles"] = chart_data["candles"].to_records()
     return chart_data
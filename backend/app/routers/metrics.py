@@ -0,0 +1,46 @@
+from fastapi import APIRouter
+
+from app.services.market_data import cache_stats
+from app.services.cpu_executor import cpu_executor
+from app.websocket.manager import ws_manager
+from app.services.poll_scheduler import poll_scheduler
+from app.services.indicator_snapshot import indicator_snapshot
+from app.services.fundamentals import fundamentals
+
+router = APIRouter(prefix="/api/metrics", tags=["metrics"])
+
+
+@router.get("/cache")
+async def get_cache_metrics():
+    """Hit, miss and coalesced-request counts per market data cache."""
+    return cache_stats()
+
+
+@router.get("/cpu")
+async def get_cpu_metrics():
+    """Queue depth, rejections and job latency of the CPU executor."""
+    return cpu_executor.stats()
+
+
+@router.get("/ws")
+async def get_ws_metrics():
+    """Connection counts and outbound queue/drop counters of the WebSocket manager."""
+    return ws_manager.stats()
+
+
+@router.get("/poller")
+async def get_poller_metrics():
+    """Upstream quote calls, freshness lag and tier sizes of the price poll scheduler."""
+    return poll_scheduler.stats()
+
+
+@router.get("/indicator-snapshot")
+async def get_indicator_snapshot_metrics():
+    """Size, version and build count of the indicator snapshot table."""
+    return indicator_snapshot.stats()
+
+
+@router.get("/fundamentals")
+async def get_fundamentals_metrics():
+    """Rows, stale rows and upstream fetch counts of the fundamentals store."""
+    return fundamentals.stats()
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional
+import json
+import time
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Dict, Optional
+from app.config import settings
 from app.services.market_data import get_history
-from app.ai.candlestick_patterns import detect_patterns as detect_candlestick
-from app.ai.chart_patterns import detect_all_chart_patterns
-from app.ai.confidence import adjust_confidence
+from app.services.cpu_executor import cpu_executor
+from app.services.pattern_service import PERIOD_MAP, ScanResult, scan_symbols
+from app.ai.pipeline import analyze_patterns
 from app.schemas.pattern import PatternResponse
 
 router = APIRouter(prefix="/api/patterns", tags=["patterns"])
@@ -18,38 +23,18 @@ async def get_patterns(
     """Detect all patterns for a symbol."""
     symbol = symbol.upper().strip()
 
-    period_map = {
-        "1d": "6mo",
-        "1h": "1mo",
-        "15m": "5d",
-        "5m": "5d",
-        "1wk": "2y",
-    }
-    period = period_map.get(timeframe, "6mo")
+    period = PERIOD_MAP.get(timeframe, "6mo")
     candles = await get_history(symbol, period=period, interval=timeframe)
 
     if not candles:
         raise HTTPException(status_code=404, detail=f"No data for {symbol}")
 
-    # Detect patterns
-    candlestick_patterns = detect_candlestick(candles)
-    chart_patterns = detect_all_chart_patterns(candles)
-
-    # Tag pattern types
-    for p in candlestick_patterns:
-        p["pattern_type"] = "candlestick"
-        p["symbol"] = symbol
-        p["timeframe"] = timeframe
-    for p in chart_patterns:
-        p["pattern_type"] = "chart"
+    # Detect patterns and adjust confidence with context (off the event loop)
+    all_patterns = await cpu_executor.run(analyze_patterns, candles)
+    for p in all_patterns:
         p["symbol"] = symbol
         p["timeframe"] = timeframe
 
-    all_patterns = candlestick_patterns + chart_patterns
-
-    # Adjust confidence with context
-    all_patterns = adjust_confidence(all_patterns, candles)
-
     # Filter by minimum confidence
     all_patterns = [p for p in all_patterns if p.get("confidence", 0) >= min_confidence]
 
@@ -60,36 +45,80 @@ async def get_patterns(
     return all_patterns[:50]
 
 
+def _top_patterns(result: ScanResult, min_confidence: float, top: int) -> List[Dict]:
+    filtered = [p for p in result.patterns if p.get("confidence", 0) >= min_confidence]
+    for p in filtered:
+        p["symbol"] = result.symbol
+    return sorted(filtered, key=lambda x: x.get("confidence", 0), reverse=True)[:top]
+
+
 @router.post("/scan")
-async def scan_patterns(symbols: List[str], timeframe: str = "1d", min_confidence: float = 0.6):
-    """Scan multiple symbols for patterns."""
-    results = {}
-    for symbol in symbols[:20]:  # Limit to 20 symbols
-        try:
-            symbol = symbol.upper().strip()
-            period_map = {"1d": "6mo", "1h": "1mo", "15m": "5d", "5m": "5d", "1wk": "2y"}
-            period = period_map.get(timeframe, "6mo")
-            candles = await get_history(symbol, period=period, interval=timeframe)
-
-            if not candles:
-                continue
-
-            candlestick = detect_candlestick(candles)
-            chart = detect_all_chart_patterns(candles)
-
-            for p in candlestick:
-                p["pattern_type"] = "candlestick"
-                p["symbol"] = symbol
-            for p in chart:
-                p["pattern_type"] = "chart"
-                p["symbol"] = symbol
-
-            all_p = adjust_confidence(candlestick + chart, candles)
-            filtered = [p for p in all_p if p.get("confidence", 0) >= min_confidence]
-
-            if filtered:
-                results[symbol] = sorted(filtered, key=lambda x: x.get("confidence", 0), reverse=True)[:5]
-        except Exception:
-            continue
-
-    return results
+async def scan_patterns(
+    symbols: List[str],
+    timeframe: str = "1d",
+    min_confidence: float = 0.6,
+    stream: Optional[str] = Query(None, pattern="^(ndjson|sse)$"),
+    concurrency: int = Query(settings.SCAN_CONCURRENCY, ge=1, le=64),
+    time_budget: float = Query(settings.SCAN_TIME_BUDGET, gt=0),
+    top: int = Query(5, ge=1, le=50),
+):
+    """Scan multiple symbols for patterns.
+
+    Histories are fetched `concurrency` at a time and analysed in parallel
+    workers; symbols not finished within `time_budget` seconds are skipped.
+    Without `stream` the response is {symbol: top patterns} for symbols with
+    matches. With stream=ndjson or stream=sse, one record per symbol is sent
+    as soon as it completes ({"symbol", "patterns"} or {"symbol", "error"}),
+    followed by a final {"done": true, ...} summary.
+    """
+    symbols = list(dict.fromkeys(s.upper().strip() for s in symbols if s.strip()))
+    if len(symbols) > settings.SCAN_MAX_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.SCAN_MAX_SYMBOLS} symbols per scan")
+
+    started = time.perf_counter()
+    scan = scan_symbols(symbols, timeframe, concurrency=concurrency, time_budget=time_budget)
+
+    if stream is None:
+        results = {}
+        timed_out = 0
+        async for result in scan:
+            if result.patterns:
+                filtered = _top_patterns(result, min_confidence, top)
+                if filtered:
+                    results[result.symbol] = filtered
+            elif result.error == "timeout":
+                timed_out += 1
+        headers = {"X-Scan-Timed-Out": str(timed_out)}
+        return JSONResponse(content=jsonable_encoder(results), headers=headers)
+
+    async def records():
+        completed = timed_out = failed = 0
+        async for result in scan:
+            if result.patterns is not None:
+                completed += 1
+                yield {"symbol": result.symbol, "patterns": _top_patterns(result, min_confidence, top)}
+            else:
+                if result.error == "timeout":
+                    timed_out += 1
+                else:
+                    failed += 1
+                yield {"symbol": result.symbol, "error": result.error}
+        yield {
+            "done": True,
+            "completed": completed,
+            "failed": failed,
+            "timed_out": timed_out,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    if stream == "sse":
+        async def body():
+            async for record in records():
+                event = "done" if record.get("done") else "result"
+                yield f"event: {event}\ndata: {json.dumps(jsonable_encoder(record))}\n\n"
+        return StreamingResponse(body(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    async def body():
+        async for record in records():
+            yield json.dumps(jsonable_encoder(record)) + "\n"
+    return StreamingResponse(body(), media_type="application/x-ndjson")
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from typing import Optional, List
-from app.services.screener_service import run_screen, PREBUILT_SCREENS
+from app.services.screener_service import run_screen, run_query, PREBUILT_SCREENS
+from app.services.screener_query import FIELDS, ALIASES, FUNCTIONS, QueryError
 
 router = APIRouter(prefix="/api/screener", tags=["screener"])
 
@@ -13,6 +14,7 @@ async def get_presets():
 
 @router.get("/run")
 async def run_screener(
+    response: Response,
     preset: Optional[str] = None,
     min_pe: Optional[float] = None,
     max_pe: Optional[float] = None,
@@ -24,19 +26,46 @@ async def run_screener(
     min_volume_ratio: Optional[float] = None,
     near_52w_high_pct: Optional[float] = None,
     near_52w_low_pct: Optional[float] = None,
+    min_roe: Optional[float] = None,
+    max_debt_to_equity: Optional[float] = None,
 ):
     """Run stock screener with filters."""
     # If preset, use pre-defined filters
     if preset and preset in PREBUILT_SCREENS:
         filters = PREBUILT_SCREENS[preset]["filters"]
-        return await run_screen(**filters)
-
-    return await run_screen(
-        min_pe=min_pe, max_pe=max_pe,
-        min_market_cap=min_market_cap, max_market_cap=max_market_cap,
-        min_rsi=min_rsi, max_rsi=max_rsi,
-        macd_cross=macd_cross,
-        min_volume_ratio=min_volume_ratio,
-        near_52w_high_pct=near_52w_high_pct,
-        near_52w_low_pct=near_52w_low_pct,
-    )
+        results, version = await run_screen(**filters)
+    else:
+        results, version = await run_screen(
+            min_pe=min_pe, max_pe=max_pe,
+            min_market_cap=min_market_cap, max_market_cap=max_market_cap,
+            min_rsi=min_rsi, max_rsi=max_rsi,
+            macd_cross=macd_cross,
+            min_volume_ratio=min_volume_ratio,
+            near_52w_high_pct=near_52w_high_pct,
+            near_52w_low_pct=near_52w_low_pct,
+            min_roe=min_roe, max_debt_to_equity=max_debt_to_equity,
+        )
+    response.headers["X-Snapshot-Version"] = str(version)
+    return results
+
+
+@router.get("/fields")
+async def get_query_fields():
+    """Fields, aliases and functions available to screener queries."""
+    return {"fields": list(FIELDS), "aliases": ALIASES, "functions": list(FUNCTIONS)}
+
+
+@router.get("/query")
+async def run_screener_query(
+    response: Response,
+    q: str = Query(..., description="e.g. rsi14 < 30 and close > sma200 and vol / avg_vol20 > 2"),
+    symbols: Optional[str] = Query(None, description="Comma-separated symbols (default: NIFTY 50)"),
+):
+    """Run a screener query expression."""
+    universe = [s.strip().upper() for s in symbols.split(",") if s.strip()] if symbols else None
+    try:
+        results, version = await run_query(q, universe)
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers["X-Snapshot-Version"] = str(version)
+    return results
@@ -53,4 +53,4 @@ async def get_stock_history(
     data = await get_history(symbol, period, interval)
     if not data:
         raise HTTPException(status_code=404, detail=f"History not found for {symbol}")
-    return {"symbol": symbol, "interval": interval, "data": data}
+    return {"symbol": symbol, "interval": interval, "data": data.to_records()}
@@ -2,6 +2,7 @@
 
 from typing import Optional, Dict, List
 from app.services.market_data import get_history
+from app.services.tick_aggregator import tick_aggregator
 
 
 PERIOD_MAP = {
@@ -20,7 +21,10 @@ async def get_chart_data(
     interval: str = "1d",
     period: Optional[str] = None
 ) -> Optional[Dict]:
-    """Get OHLCV chart data for a symbol."""
+    """Get OHLCV chart data for a symbol.
+
+    "candles" is returned as a CandleFrame; the router serializes it.
+    """
     if period is None:
         period = PERIOD_MAP.get(interval, ("6mo", "1d"))[0]
 
@@ -28,6 +32,9 @@ async def get_chart_data(
     if not candles:
         return None
 
+    # Extend the last bar with live quotes polled since the history was cached
+    candles = tick_aggregator.merge(symbol, interval, candles)
+
     return {
         "symbol": symbol,
         "interval": interval,
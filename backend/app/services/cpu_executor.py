@@ -0,0 +1,172 @@
+"""Process pool for CPU-bound analytics (pattern detection, indicators).
+
+Handlers submit jobs with `await cpu_executor.run(fn, *args)`; `fn` must be a
+module-level function so it can be pickled to a worker. At most
+CPU_MAX_PENDING jobs are admitted at once (running or waiting for a
+worker). When that is reached, interactive callers get CPUExecutorBusy
+(served as 503) instead of queueing without bound. Background callers pass
+`wait=True` to queue for a slot instead; they are limited to half of the
+slots so a scan cannot lock out API requests. A job keeps its slot until
+its worker is done with it, even if the caller is cancelled first.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CPUExecutorBusy(Exception):
+    """Raised when the CPU job queue is full."""
+
+
+def _warm_worker():
+    """Import the analytics modules once per worker, before the first job."""
+    import app.ai.pipeline  # noqa: F401
+    import app.services.indicator_service  # noqa: F401
+
+
+def _noop() -> None:
+    return None
+
+
+class CPUExecutor:
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._background_slots: Optional[asyncio.Semaphore] = None
+        self._latencies = deque(maxlen=1024)
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _get_slots(self):
+        # Created lazily so they bind to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+            self._background_slots = asyncio.Semaphore(max(self.max_pending // 2, 1))
+        return self._slots, self._background_slots
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that already runs executor threads is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+            )
+        return self._pool
+
+    async def start(self):
+        """Spawn and warm every worker so the first requests don't pay for it."""
+        if self.workers <= 0:
+            return
+        started = time.perf_counter()
+        loop = asyncio.get_event_loop()
+        pool = self._get_pool()
+        await asyncio.gather(*(loop.run_in_executor(pool, _noop) for _ in range(self.workers)))
+        logger.info(f"CPU executor: {self.workers} workers ready in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, fn: Callable, *args, wait: bool = False) -> Any:
+        """Run fn(*args) in a worker process and return its result."""
+        slots, background_slots = self._get_slots()
+        if slots.locked() and not wait:
+            self.rejected += 1
+            raise CPUExecutorBusy("CPU job queue is full")
+
+        submitted = time.perf_counter()
+        self.waiting += 1
+        try:
+            if wait:
+                await background_slots.acquire()
+            try:
+                await slots.acquire()
+            except BaseException:
+                if wait:
+                    background_slots.release()
+                raise
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        if self.workers <= 0:
+            try:
+                result = fn(*args)
+                self.completed += 1
+                return result
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self._release(wait, submitted)
+
+        try:
+            future = self._get_pool().submit(fn, *args)
+        except BaseException:
+            self._release(wait, submitted)
+            raise
+        # The slot is held until the worker is done with the job, not until
+        # the caller stops waiting: cancelling a running job doesn't stop it
+        loop = asyncio.get_running_loop()
+
+        def done(f):  # runs on the pool's management thread
+            try:
+                loop.call_soon_threadsafe(self._finish, f, wait, submitted)
+            except RuntimeError:
+                pass  # event loop already closed
+
+        future.add_done_callback(done)
+        return await asyncio.wrap_future(future)
+
+    def _finish(self, future, wait: bool, submitted: float):
+        if not future.cancelled():
+            if future.exception() is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+        self._release(wait, submitted)
+
+    def _release(self, wait: bool, submitted: float):
+        slots, background_slots = self._get_slots()
+        self.in_flight -= 1
+        slots.release()
+        if wait:
+            background_slots.release()
+        self._latencies.append((time.perf_counter() - submitted) * 1000)
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = np.array(self._latencies) if self._latencies else None
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "latency_ms": {
+                "p50": round(float(np.percentile(latencies, 50)), 2),
+                "p95": round(float(np.percentile(latencies, 95)), 2),
+                "max": round(float(latencies.max()), 2),
+            } if latencies is not None else None,
+        }
+
+
+cpu_executor = CPUExecutor(settings.CPU_WORKERS, settings.CPU_MAX_PENDING)
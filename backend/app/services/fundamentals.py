@@ -0,0 +1,218 @@
+"""Universe-wide fundamentals for the screener.
+
+Fundamentals change at most once a quarter, but `get_stock_info` fetches
+them one symbol at a time. This store loads them for many symbols at once:
+stale symbols are split into batches of FUNDAMENTALS_BATCH_SIZE, and up to
+FUNDAMENTALS_CONCURRENCY batches are in flight on the market data executor.
+Rows are upserted into the `stocks` table (app.models.stock), which is read
+back at startup. A refresh only fetches symbols that are missing or older
+than FUNDAMENTALS_TTL_HOURS.
+
+For screening, the store keeps a columnar copy, with one numpy column per
+field and one row per symbol:
+
+    pe, pb, eps, debt_to_equity   as reported (yfinance reports D/E in percent)
+    market_cap                    in crores of rupees
+    roe                           in percent
+
+Missing values are NaN.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import async_session
+from app.models.stock import Stock
+from app.services.market_data import executor
+from app.services.providers import get_provider
+from app.utils.cache import info_cache
+from app.utils.nse_symbols import NIFTY_50_SYMBOLS
+from app.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+CRORE = 1e7
+
+# Column -> (StockInfo key, scale)
+COLUMNS = {
+    "pe": ("pe_ratio", 1.0),
+    "pb": ("pb_ratio", 1.0),
+    "market_cap": ("market_cap", 1 / CRORE),
+    "roe": ("roe", 100.0),
+    "debt_to_equity": ("debt_to_equity", 1.0),
+    "eps": ("eps", 1.0),
+}
+
+# StockInfo keys stored on the Stock row
+_STOCK_FIELDS = (
+    "sector", "industry", "market_cap", "pe_ratio", "pb_ratio", "dividend_yield", "roe",
+    "debt_to_equity", "eps", "book_value", "face_value", "week_52_high", "week_52_low",
+)
+
+
+def _num(value: Any) -> float:
+    """Float, or NaN for None, non-numeric and infinite values."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return value if math.isfinite(value) else math.nan
+
+
+def _utc(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None)
+
+
+class FundamentalsTable:
+    """One immutable version of the columns, with a fetch time per row."""
+
+    def __init__(self, symbols: List[str], columns: Dict[str, np.ndarray], fetched_at: np.ndarray):
+        self.symbols = symbols
+        self.index = {s: i for i, s in enumerate(symbols)}
+        self.columns = columns
+        self.fetched_at = fetched_at
+
+    @classmethod
+    def from_infos(cls, infos: Dict[str, Dict[str, Any]], fetched_at: Dict[str, float]) -> "FundamentalsTable":
+        symbols = list(infos)
+        columns = {name: np.array([_num(infos[s].get(key)) * scale for s in symbols])
+                   for name, (key, scale) in COLUMNS.items()}
+        return cls(symbols, columns, np.array([fetched_at[s] for s in symbols], dtype=float))
+
+    def select(self, symbols: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Columns for `symbols` in that order; NaN rows for symbols not in the table."""
+        rows = np.array([self.index.get(s, -1) for s in symbols], dtype=np.int64)
+        return {name: np.append(values, np.nan)[rows] for name, values in self.columns.items()}
+
+    def stale(self, symbols: Sequence[str], before: float) -> List[str]:
+        """Symbols missing from the table or fetched before `before`."""
+        return [s for s in symbols if s not in self.index or self.fetched_at[self.index[s]] < before]
+
+    def merged(self, other: "FundamentalsTable") -> "FundamentalsTable":
+        keep = [s for s in self.symbols if s not in other.index]
+        rows = np.array([self.index[s] for s in keep], dtype=np.int64)
+        columns = {name: np.concatenate((self.columns[name][rows], other.columns[name]))
+                   for name in COLUMNS}
+        return FundamentalsTable(keep + other.symbols, columns,
+                                 np.concatenate((self.fetched_at[rows], other.fetched_at)))
+
+
+class FundamentalsStore:
+    def __init__(self):
+        self._table = FundamentalsTable([], {name: np.array([]) for name in COLUMNS}, np.array([]))
+        self._flight = SingleFlight()
+        self.fetched = 0
+        self.failed = 0
+        self.batches = 0
+
+    @property
+    def table(self) -> FundamentalsTable:
+        return self._table
+
+    async def load(self):
+        """Warm the columns from the `stocks` table."""
+        try:
+            async with async_session() as session:
+                rows = (await session.execute(
+                    select(Stock).where(Stock.updated_at.is_not(None)))).scalars().all()
+        except Exception as e:
+            logger.warning(f"Could not load fundamentals: {e}")
+            return
+        if not rows:
+            return
+        infos = {r.symbol: {key: getattr(r, key) for key, _ in COLUMNS.values()} for r in rows}
+        fetched_at = {r.symbol: r.updated_at.replace(tzinfo=timezone.utc).timestamp() for r in rows}
+        self._table = self._table.merged(FundamentalsTable.from_infos(infos, fetched_at))
+        logger.info(f"Fundamentals loaded: {len(rows)} symbols")
+
+    async def refresh(self, symbols: Optional[Sequence[str]] = None, max_age: Optional[float] = None) -> int:
+        """Fetch fundamentals for stale `symbols` (default: the table plus NIFTY 50).
+
+        Rows older than `max_age` seconds (default FUNDAMENTALS_TTL_HOURS)
+        are stale. Returns the number of symbols fetched.
+        """
+        if symbols is None:
+            symbols = list(dict.fromkeys([*NIFTY_50_SYMBOLS, *self._table.symbols]))
+        if max_age is None:
+            max_age = settings.FUNDAMENTALS_TTL_HOURS * 3600
+        stale = self._table.stale(symbols, time.time() - max_age)
+        if not stale:
+            return 0
+        return await self._flight.do(",".join(stale), lambda: self._fetch(stale))
+
+    async def _fetch(self, symbols: List[str]) -> int:
+        size = max(1, settings.FUNDAMENTALS_BATCH_SIZE)
+        sem = asyncio.Semaphore(max(1, settings.FUNDAMENTALS_CONCURRENCY))
+        provider = get_provider()
+        loop = asyncio.get_event_loop()
+
+        async def fetch(batch: List[str]) -> Dict[str, Dict[str, Any]]:
+            async with sem:
+                try:
+                    return await loop.run_in_executor(executor, provider.fetch_stock_infos, batch)
+                except Exception as e:
+                    logger.warning(f"Fundamentals batch error ({batch[0]}..): {e}")
+                    return {}
+
+        batches = [symbols[i:i + size] for i in range(0, len(symbols), size)]
+        infos: Dict[str, Dict[str, Any]] = {}
+        for result in await asyncio.gather(*(fetch(b) for b in batches)):
+            infos.update(result)
+        self.batches += len(batches)
+        self.fetched += len(infos)
+        self.failed += len(symbols) - len(infos)
+        if not infos:
+            return 0
+
+        now = time.time()
+        self._table = self._table.merged(FundamentalsTable.from_infos(infos, dict.fromkeys(infos, now)))
+        for symbol, info in infos.items():
+            info_cache.set(symbol, info, ttl=3600)
+        await self._persist(infos, now)
+        return len(infos)
+
+    async def _persist(self, infos: Dict[str, Dict[str, Any]], now: float):
+        try:
+            async with async_session() as session:
+                async with session.begin():
+                    existing = {s.symbol: s for s in (await session.execute(
+                        select(Stock).where(Stock.symbol.in_(list(infos))))).scalars()}
+                    for symbol, info in infos.items():
+                        row = existing.get(symbol)
+                        if row is None:
+                            row = Stock(symbol=symbol)
+                            session.add(row)
+                        row.name = info.get("name") or symbol
+                        row.exchange = info.get("exchange") or "NSE"
+                        for key in _STOCK_FIELDS:
+                            value = _num(info.get(key)) if key not in ("sector", "industry") else info.get(key)
+                            setattr(row, key, None if value != value else value)
+                        row.updated_at = _utc(now)
+        except Exception as e:
+            logger.warning(f"Could not persist fundamentals: {e}")
+
+    async def columns_for(self, symbols: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Columns for `symbols`, fetching only rows never loaded; stale rows are served as is."""
+        await self.refresh(symbols, max_age=math.inf)
+        return self._table.select(symbols)
+
+    def stats(self) -> Dict:
+        ttl = settings.FUNDAMENTALS_TTL_HOURS * 3600
+        return {
+            "symbols": len(self._table.symbols),
+            "stale": len(self._table.stale(self._table.symbols, time.time() - ttl)),
+            "fetched": self.fetched,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+
+fundamentals = FundamentalsStore()
@@ -0,0 +1,278 @@
+"""Persistent OHLCV store with incremental tail gap-fill.
+
+Candles are kept permanently in SQLite, keyed on (symbol, interval, time),
+one database file per market data provider. A `get` for a period that is
+already covered only asks the provider for the bars since the last stored
+one (re-fetching that bar, which may still have been forming). The full
+period is fetched when coverage is missing or too short, and once every
+HISTORY_REVALIDATE_HOURS so split/dividend adjustments reach old bars.
+Revalidation refetches the whole stored range, whatever period the
+triggering caller asked for, so a short-period caller never truncates the
+history a longer-period one relies on. Stored bars older than a full fetch
+returned are dropped rather than kept unadjusted next to adjusted ones.
+
+Reads are served from memory-mapped column files (app.utils.columnar)
+kept in step with SQLite, so a local read is a zero-copy slice of the page
+cache rather than a query. A tail fetch or provisional write appends just
+the rows it touched; a full fetch rewrites the file.
+
+Runs in the market data executor threads; each thread gets its own
+connection.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, NamedTuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.providers import get_provider
+from app.services.providers.base import MarketDataProvider
+from app.utils.candles import CandleFrame
+from app.utils.columnar import ColumnFiles
+from app.utils.timeframes import DAY, period_seconds, ist_day, ist_midnight
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    time INTEGER NOT NULL,
+    open REAL NOT NULL,
+    high REAL NOT NULL,
+    low REAL NOT NULL,
+    close REAL NOT NULL,
+    volume INTEGER NOT NULL,
+    PRIMARY KEY (symbol, interval, time)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS coverage (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    start INTEGER NOT NULL,          -- earliest time fetched in full; older bars unknown
+    last_time INTEGER NOT NULL,      -- newest stored bar
+    fetched_at REAL NOT NULL,        -- last upstream fetch (full or tail)
+    validated_at REAL NOT NULL,      -- last full fetch
+    PRIMARY KEY (symbol, interval)
+);
+"""
+
+
+class Coverage(NamedTuple):
+    start: int
+    last_time: int
+    fetched_at: float
+    validated_at: float
+
+
+class HistoryStore:
+    def __init__(self, path: str, tail_ttl: int = 60, revalidate_hours: int = 24,
+                 columns_dir: Optional[str] = None):
+        self.path = path
+        self._columns = ColumnFiles(columns_dir) if columns_dir else None
+        self.tail_ttl = tail_ttl
+        self.revalidate_seconds = revalidate_hours * 3600
+        self._local = threading.local()
+        self.full_fetches = 0
+        self.tail_fetches = 0
+        self.local_reads = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # --- storage ---
+
+    def coverage(self, symbol: str, interval: str) -> Optional[Coverage]:
+        row = self._conn().execute(
+            "SELECT start, last_time, fetched_at, validated_at FROM coverage WHERE symbol = ? AND interval = ?",
+            (symbol, interval),
+        ).fetchone()
+        return Coverage(*row) if row else None
+
+    def write(self, symbol: str, interval: str, frame: CandleFrame, full_from: Optional[int] = None):
+        """Upsert `frame`; `full_from` marks a full fetch covering everything since that time.
+
+        A full fetch deletes stored bars older than it covers, since they
+        may predate a split/dividend adjustment the fetch picked up.
+        """
+        now = time.time()
+        rows = zip(
+            [symbol] * len(frame), [interval] * len(frame), frame.time.tolist(),
+            frame.open.tolist(), frame.high.tolist(), frame.low.tolist(),
+            frame.close.tolist(), frame.volume.tolist(),
+        )
+        last_time = int(frame.time[-1])
+        conn = self._conn()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            if full_from is not None:
+                # "Nd" periods count sessions, so the fetch may reach back past full_from
+                full_from = min(full_from, int(frame.time[0]))
+                conn.execute("DELETE FROM candles WHERE symbol = ? AND interval = ? AND time < ?",
+                             (symbol, interval, full_from))
+                conn.execute(
+                    """INSERT INTO coverage VALUES (?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (symbol, interval) DO UPDATE SET
+                           start = excluded.start,
+                           last_time = MAX(last_time, excluded.last_time),
+                           fetched_at = excluded.fetched_at,
+                           validated_at = excluded.validated_at""",
+                    (symbol, interval, full_from, last_time, now, now),
+                )
+            else:
+                conn.execute(
+                    "UPDATE coverage SET last_time = MAX(last_time, ?), fetched_at = ? WHERE symbol = ? AND interval = ?",
+                    (last_time, now, symbol, interval),
+                )
+
+    def write_provisional(self, symbol: str, interval: str, frame: CandleFrame) -> bool:
+        """Add locally built bars (app.services.tick_aggregator) to a stored series.
+
+        Rows never replace upstream bars and coverage is left alone, so the
+        next tail fetch starts from the last upstream bar and overwrites
+        them. Series the store doesn't hold yet are skipped.
+        """
+        if self.coverage(symbol, interval) is None or not len(frame):
+            return False
+        rows = zip(
+            [symbol] * len(frame), [interval] * len(frame), frame.time.tolist(),
+            frame.open.tolist(), frame.high.tolist(), frame.low.tolist(),
+            frame.close.tolist(), frame.volume.tolist(),
+        )
+        with self._conn() as conn:
+            conn.executemany("INSERT OR IGNORE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self._materialize(symbol, interval, since=int(frame.time[0]))
+        return True
+
+    def touch(self, symbol: str, interval: str):
+        """Record an upstream check that returned nothing new."""
+        with self._conn() as conn:
+            conn.execute("UPDATE coverage SET fetched_at = ? WHERE symbol = ? AND interval = ?",
+                         (time.time(), symbol, interval))
+
+    def read(self, symbol: str, interval: str, start: int = 0) -> CandleFrame:
+        rows = self._conn().execute(
+            "SELECT time, open, high, low, close, volume FROM candles"
+            " WHERE symbol = ? AND interval = ? AND time >= ? ORDER BY time",
+            (symbol, interval, start),
+        ).fetchall()
+        if not rows:
+            return CandleFrame([], [], [], [], [], [])
+        cols = list(zip(*rows))
+        return CandleFrame(*cols)
+
+    def _materialize(self, symbol: str, interval: str, since: Optional[int] = None):
+        """Bring the column file up to date; only rows from `since` changed, if given."""
+        if self._columns is None:
+            return
+        if since is not None and self._columns.append(symbol, interval, self.read(symbol, interval, since)):
+            return
+        self._columns.write(symbol, interval, self.read(symbol, interval))
+
+    def _series(self, symbol: str, interval: str, start: int = 0) -> CandleFrame:
+        """Stored bars from `start`: a view into the column file when enabled."""
+        if self._columns is None:
+            return self.read(symbol, interval, start)
+        frame = self._columns.open(symbol, interval)
+        if frame is None:
+            self._materialize(symbol, interval)
+            frame = self._columns.open(symbol, interval)
+        return frame[int(np.searchsorted(frame.time, start)):]
+
+    # --- period handling ---
+
+    def _period_frame(self, symbol: str, interval: str, period: str, now: int, last_time: int) -> CandleFrame:
+        span = period_seconds(period)
+        if span is None:
+            return self._series(symbol, interval)
+        if period.endswith("d"):
+            # "Nd" periods mean the last N sessions (as yfinance does), not N calendar days
+            sessions = span // DAY
+            recent = self._series(symbol, interval, ist_midnight(ist_day(last_time) - sessions - 10))
+            days = np.unique(ist_day(recent.time))
+            cut = ist_midnight(int(days[-sessions])) if len(days) >= sessions else 0
+            return recent[int(np.searchsorted(recent.time, cut)):]
+        return self._series(symbol, interval, now - span)
+
+    # --- read-through ---
+
+    def get(self, provider: MarketDataProvider, symbol: str, period: str, interval: str) -> Optional[CandleFrame]:
+        """Candles for `period`, from the store, topped up from `provider`."""
+        now = int(time.time())
+        span = period_seconds(period)
+        want_from = now - span if span is not None else 0
+        cov = self.coverage(symbol, interval)
+
+        if cov is None or cov.start > want_from or now - cov.validated_at > self.revalidate_seconds:
+            if cov is not None and 0 < cov.start <= want_from:
+                # Revalidate from the coverage start, not just this period
+                full_from = cov.start
+                frame = provider.fetch_history(symbol, period, interval, start=full_from)
+            else:
+                full_from = want_from
+                frame = provider.fetch_history(symbol, period, interval)
+            self.full_fetches += 1
+            if frame is not None and len(frame):
+                self.write(symbol, interval, frame, full_from=full_from)
+                self._materialize(symbol, interval)
+            elif cov is None:
+                return None
+            else:
+                logger.warning(f"Full history refresh failed for {symbol} {interval}; serving stored bars")
+        elif now - cov.fetched_at > self.tail_ttl:
+            frame = provider.fetch_history(symbol, period, interval, start=cov.last_time)
+            self.tail_fetches += 1
+            if frame is not None and len(frame):
+                self.write(symbol, interval, frame)
+                self._materialize(symbol, interval, since=min(int(frame.time[0]), cov.last_time))
+            else:
+                self.touch(symbol, interval)
+        else:
+            self.local_reads += 1
+
+        cov = self.coverage(symbol, interval)
+        frame = self._period_frame(symbol, interval, period, now, cov.last_time)
+        return frame if len(frame) else None
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "full_fetches": self.full_fetches,
+            "tail_fetches": self.tail_fetches,
+            "local_reads": self.local_reads,
+        }
+
+
+_store: Optional[HistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_history_store() -> Optional[HistoryStore]:
+    """The store for the active provider, or None when HISTORY_STORE_DIR is empty."""
+    global _store
+    if not settings.HISTORY_STORE_DIR:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                name = get_provider().name
+                _store = HistoryStore(
+                    os.path.join(settings.HISTORY_STORE_DIR, f"{name}.sqlite"),
+                    settings.HISTORY_TAIL_TTL,
+                    settings.HISTORY_REVALIDATE_HOURS,
+                    columns_dir=os.path.join(settings.HISTORY_STORE_DIR, f"{name}-columns"),
+                )
+    return _store
@@ -0,0 +1,443 @@
+"""Incremental (streaming) indicator state next to indicator_service.
+
+Each indicator keeps only the running state of its *committed* bars plus
+the bar that is still forming. `update(candle)` commits the forming bar and
+starts a new one; `revise(candle)` replaces the forming bar. Both are O(1)
+in the length of the history, so live values can be pushed every poll
+without recomputing the full series.
+
+Values follow the batch definitions in indicator_service (same seeding,
+same smoothing), rounded to 2 decimals like the REST output.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Dict, List, Optional, Iterable, Any
+
+from app.services.indicator_service import parse_indicator
+from app.services.market_data import get_history
+from app.utils.candles import CandleFrame
+from app.utils.timeframes import ist_day, ist_midnight
+
+logger = logging.getLogger(__name__)
+
+
+def _round(v: Optional[float]) -> Optional[float]:
+    return round(v, 2) if v is not None else None
+
+
+class _EMA:
+    """EMA over scalars with pandas ewm(span, adjust=False) semantics."""
+
+    def __init__(self, span: int):
+        self.alpha = 2 / (span + 1)
+        self.value: Optional[float] = None
+
+    def peek(self, x: float) -> float:
+        if self.value is None:
+            return x
+        return (1 - self.alpha) * self.value + self.alpha * x
+
+    def push(self, x: float):
+        self.value = self.peek(x)
+
+
+# Rolling mean state, updated like pandas' roll_mean:
+# (sum, add compensation, remove compensation, count, negatives, run of equal values, last value)
+_MEAN_EMPTY = (0.0, 0.0, 0.0, 0, 0, 0, math.nan)
+
+
+def _mean_add(state: tuple, x: float) -> tuple:
+    total, comp_add, comp_remove, n, neg, same, prev = state
+    y = x - comp_add
+    t = total + y
+    return (t, t - total - y, comp_remove, n + 1, neg + (math.copysign(1.0, x) < 0),
+            same + 1 if x == prev else 1, x)
+
+
+def _mean_remove(state: tuple, x: float) -> tuple:
+    total, comp_add, comp_remove, n, neg, same, prev = state
+    y = -x - comp_remove
+    t = total + y
+    return (t, comp_add, t - total - y, n - 1, neg - (math.copysign(1.0, x) < 0), same, prev)
+
+
+def _mean_value(state: tuple) -> float:
+    total, _, _, n, neg, same, prev = state
+    if same >= n:
+        return prev
+    mean = total / n
+    if (neg == 0 and mean < 0) or (neg == n and mean > 0):
+        return 0.0
+    return mean
+
+
+class _Window:
+    """Fixed-size ring buffer with a rolling mean, sum and sum of squares.
+
+    Holds the last `size - 1` committed values, so peeking with the forming
+    value yields a full window. The mean replays pandas' rolling().mean()
+    (Kahan-compensated adds and removes, in the same order) so it is
+    bit-identical to the batch series; a plain running sum drifts from it
+    and rounds differently at x.xx5 ties. The sums behind the standard
+    deviation are re-derived from the buffer once per `size` pushes.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._buf = deque(maxlen=max(size - 1, 0))
+        self._mean = _MEAN_EMPTY
+        self._evicted: Optional[float] = None  # left the window at the last push
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._pushes = 0
+
+    def full(self) -> bool:
+        return len(self._buf) == self.size - 1
+
+    def _mean_with(self, x: float) -> tuple:
+        state = self._mean
+        if self._evicted is not None:
+            state = _mean_remove(state, self._evicted)
+        return _mean_add(state, x)
+
+    def peek_mean(self, x: float) -> Optional[float]:
+        if not self.full():
+            return None
+        return _mean_value(self._mean_with(x))
+
+    def peek_std(self, x: float) -> Optional[float]:
+        """Sample standard deviation (ddof=1), like pandas rolling().std()."""
+        if not self.full() or self.size < 2:
+            return None
+        s = self._sum + x
+        var = (self._sumsq + x * x - s * s / self.size) / (self.size - 1)
+        return max(var, 0.0) ** 0.5
+
+    def push(self, x: float):
+        if self._buf.maxlen == 0:
+            return
+        self._mean = self._mean_with(x)
+        self._evicted = None
+        if len(self._buf) == self._buf.maxlen:
+            old = self._evicted = self._buf[0]
+            self._sum -= old
+            self._sumsq -= old * old
+        self._buf.append(x)
+        self._sum += x
+        self._sumsq += x * x
+        self._pushes += 1
+        if self._pushes % self.size == 0:
+            self._sum = sum(self._buf)
+            self._sumsq = sum(v * v for v in self._buf)
+
+
+class _SMA:
+    def __init__(self, period: int):
+        self._window = _Window(period)
+
+    def peek(self, c: Dict) -> Optional[float]:
+        return _round(self._window.peek_mean(c["close"]))
+
+    def commit(self, c: Dict):
+        self._window.push(c["close"])
+
+
+class _EMAIndicator:
+    def __init__(self, period: int):
+        self._ema = _EMA(period)
+
+    def peek(self, c: Dict) -> float:
+        return _round(self._ema.peek(c["close"]))
+
+    def commit(self, c: Dict):
+        self._ema.push(c["close"])
+
+
+class _RSI:
+    """Wilder RSI seeded with the simple mean of the first `period` moves.
+
+    As in the batch version the first bar contributes a zero gain/loss.
+    """
+
+    def __init__(self, period: int):
+        self.period = period
+        self._count = 0
+        self._prev_close: Optional[float] = None
+        self._seed_gain = 0.0
+        self._seed_loss = 0.0
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+
+    def _step(self, close: float):
+        delta = close - self._prev_close if self._prev_close is not None else 0.0
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        p = self.period
+        if self._count < p - 1:
+            return None, self._seed_gain + gain, self._seed_loss + loss
+        if self._count == p - 1:
+            return ((self._seed_gain + gain) / p, (self._seed_loss + loss) / p), None, None
+        return ((self._avg_gain * (p - 1) + gain) / p,
+                (self._avg_loss * (p - 1) + loss) / p), None, None
+
+    def peek(self, c: Dict) -> Optional[float]:
+        avgs, _, _ = self._step(c["close"])
+        if avgs is None:
+            return None
+        avg_gain, avg_loss = avgs
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else None
+        return _round(100 - 100 / (1 + avg_gain / avg_loss))
+
+    def commit(self, c: Dict):
+        avgs, seed_gain, seed_loss = self._step(c["close"])
+        if avgs is None:
+            self._seed_gain, self._seed_loss = seed_gain, seed_loss
+        else:
+            self._avg_gain, self._avg_loss = avgs
+        self._prev_close = c["close"]
+        self._count += 1
+
+
+class _MACD:
+    def __init__(self, fast: int, slow: int, signal: int):
+        self._fast = _EMA(fast)
+        self._slow = _EMA(slow)
+        self._signal = _EMA(signal)
+
+    def _line(self, close: float) -> float:
+        return self._fast.peek(close) - self._slow.peek(close)
+
+    def peek(self, c: Dict) -> Dict[str, float]:
+        macd = self._line(c["close"])
+        signal = self._signal.peek(macd)
+        return {"macd": _round(macd), "signal": _round(signal), "histogram": _round(macd - signal)}
+
+    def commit(self, c: Dict):
+        macd = self._line(c["close"])
+        self._fast.push(c["close"])
+        self._slow.push(c["close"])
+        self._signal.push(macd)
+
+
+class _Bollinger:
+    def __init__(self, period: int, std_dev: float):
+        self._window = _Window(period)
+        self.std_dev = std_dev
+
+    def peek(self, c: Dict) -> Dict[str, Optional[float]]:
+        mean = self._window.peek_mean(c["close"])
+        std = self._window.peek_std(c["close"])
+        if mean is None or std is None:
+            return {"upper": None, "middle": None, "lower": None}
+        return {
+            "upper": _round(mean + std * self.std_dev),
+            "middle": _round(mean),
+            "lower": _round(mean - std * self.std_dev),
+        }
+
+    def commit(self, c: Dict):
+        self._window.push(c["close"])
+
+
+class _Supertrend:
+    """Supertrend with simple-average ATR, mirroring calculate_supertrend."""
+
+    def __init__(self, period: int, multiplier: float):
+        self.period = period
+        self.multiplier = multiplier
+        self._count = 0
+        self._prev_close: Optional[float] = None
+        self._tr = _Window(period)
+        self._supertrend: Optional[float] = None
+        self._direction: Optional[int] = None
+
+    def _step(self, c: Dict):
+        high, low, close = c["high"], c["low"], c["close"]
+        if self._prev_close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - self._prev_close), abs(low - self._prev_close))
+        atr = self._tr.peek_mean(tr)
+        if atr is None:
+            return tr, None, None
+
+        hl2 = (high + low) / 2
+        upper = hl2 + self.multiplier * atr
+        lower = hl2 - self.multiplier * atr
+
+        if self._count == self.period - 1:
+            return tr, upper, -1
+        prev = self._supertrend
+        if close > prev:
+            return tr, (max(lower, prev) if self._direction == 1 else lower), 1
+        return tr, (min(upper, prev) if self._direction == -1 else upper), -1
+
+    def peek(self, c: Dict) -> Dict[str, Any]:
+        _, value, direction = self._step(c)
+        return {
+            "value": _round(value),
+            "color": "#22c55e" if direction == 1 else "#ef4444" if direction == -1 else None,
+        }
+
+    def commit(self, c: Dict):
+        tr, value, direction = self._step(c)
+        self._tr.push(tr)
+        self._supertrend, self._direction = value, direction
+        self._prev_close = c["close"]
+        self._count += 1
+
+
+class _VWAP:
+    def __init__(self):
+        self._tp_vol = 0.0
+        self._vol = 0
+
+    def _sums(self, c: Dict):
+        tp = (c["high"] + c["low"] + c["close"]) / 3
+        return self._tp_vol + tp * c["volume"], self._vol + c["volume"]
+
+    def peek(self, c: Dict) -> Optional[float]:
+        tp_vol, vol = self._sums(c)
+        return _round(tp_vol / vol) if vol else None
+
+    def commit(self, c: Dict):
+        self._tp_vol, self._vol = self._sums(c)
+
+
+_STATE_TYPES = {
+    "sma": _SMA,
+    "ema": _EMAIndicator,
+    "rsi": _RSI,
+    "macd": _MACD,
+    "bollinger": _Bollinger,
+    "supertrend": _Supertrend,
+    "vwap": _VWAP,
+}
+
+
+class IndicatorStream:
+    """Running indicator state for one symbol/interval.
+
+    Accepts the same names as get_indicators ('rsi', 'sma20', 'ema:9', ...);
+    unknown names are ignored.
+    """
+
+    def __init__(self, indicator_names: Iterable[str]):
+        self._states = {}
+        for name in indicator_names:
+            parsed = parse_indicator(name)
+            if parsed:
+                kind, params = parsed
+                self._states[name] = _STATE_TYPES[kind](*params)
+        self.forming: Optional[Dict] = None
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._states)
+
+    @classmethod
+    def from_history(cls, candles: CandleFrame, indicator_names: Iterable[str]) -> "IndicatorStream":
+        """Replay a history; its last candle becomes the forming bar."""
+        stream = cls(indicator_names)
+        for candle in candles.to_records():
+            stream.update(candle, emit=False)
+        return stream
+
+    def update(self, candle: Dict, emit: bool = True) -> Optional[Dict[str, Any]]:
+        """Close the forming bar and start `candle` as the new forming bar."""
+        if self.forming is not None:
+            for state in self._states.values():
+                state.commit(self.forming)
+        self.forming = candle
+        return self.values() if emit else None
+
+    def revise(self, candle: Dict) -> Dict[str, Any]:
+        """Replace the forming bar (same time, new prices/volume)."""
+        self.forming = candle
+        return self.values()
+
+    def values(self) -> Dict[str, Any]:
+        if self.forming is None:
+            return {}
+        return {name: state.peek(self.forming) for name, state in self._states.items()}
+
+
+class IndicatorHub:
+    """Daily indicator streams for symbols with live WebSocket subscribers.
+
+    Streams are seeded once from a year of daily history and then driven by
+    polled quotes: the quote revises today's forming bar, and the first
+    quote of a new IST trading day opens a new bar.
+    """
+
+    SEED_PERIOD = "1y"
+
+    def __init__(self):
+        self._streams: Dict[str, IndicatorStream] = {}
+        self._lock = asyncio.Lock()
+
+    async def _stream_for(self, symbol: str, names: Iterable[str]) -> Optional[IndicatorStream]:
+        stream = self._streams.get(symbol)
+        # Unknown names never reach stream.names; keeping them would re-seed every poll
+        wanted = {name for name in names if parse_indicator(name)}
+        if stream is not None and wanted.issubset(stream.names):
+            return stream
+
+        async with self._lock:
+            stream = self._streams.get(symbol)
+            if stream is not None and wanted.issubset(stream.names):
+                return stream
+            if stream is not None:
+                wanted.update(stream.names)
+            candles = await get_history(symbol, period=self.SEED_PERIOD, interval="1d")
+            if not candles:
+                return None
+            stream = IndicatorStream.from_history(candles, sorted(wanted))
+            self._streams[symbol] = stream
+            return stream
+
+    async def on_quote(self, symbol: str, quote: Dict[str, Any], names: Iterable[str]) -> Optional[Dict[str, Any]]:
+        """Fold a polled quote into the symbol's stream and return live values."""
+        stream = await self._stream_for(symbol, names)
+        if stream is None or stream.forming is None:
+            return None
+
+        price = quote.get("last_price")
+        if not price:
+            return None
+        volume = int(quote.get("volume") or 0)
+        bar = stream.forming
+        today = ist_day(int(time.time()))
+
+        if today > ist_day(bar["time"]):
+            values = stream.update({
+                "time": ist_midnight(today),
+                "open": price, "high": price, "low": price, "close": price,
+                "volume": volume,
+            })
+        else:
+            values = stream.revise({
+                "time": bar["time"],
+                "open": bar["open"],
+                "high": max(bar["high"], price),
+                "low": min(bar["low"], price),
+                "close": price,
+                "volume": max(volume, bar["volume"]),
+            })
+        return {"time": stream.forming["time"], "values": values}
+
+    def drop(self, symbols: Iterable[str]):
+        """Forget streams for symbols nobody watches any more."""
+        for symbol in symbols:
+            self._streams.pop(symbol, None)
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._streams)
+
+
+indicator_hub = IndicatorHub()
@@ -2,171 +2,280 @@
 
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import logging
+import math
+import re
+import time
+
+from app.utils.candles import CandleFrame
 
 logger = logging.getLogger(__name__)
 
 
-def _candles_to_df(candles: List[Dict]) -> pd.DataFrame:
-    """Convert candle list to DataFrame."""
-    df = pd.DataFrame(candles)
-    df.columns = [c.capitalize() if c != "time" else "Time" for c in df.columns]
-    return df
+def _to_points(candles: CandleFrame, series) -> List[Dict]:
+    """Pair indicator values with candle times in the JSON point shape."""
+    values = np.asarray(series, dtype=float).tolist()
+    return [{"time": t, "value": round(v, 2) if not math.isnan(v) else None}
+            for t, v in zip(candles.time.tolist(), values)]
 
 
-def calculate_sma(candles: List[Dict], period: int = 20) -> List[Dict]:
-    """Simple Moving Average."""
-    df = _candles_to_df(candles)
-    sma = df["Close"].rolling(window=period).mean()
-    return [{"time": c["time"], "value": round(float(v), 2) if not pd.isna(v) else None}
-            for c, v in zip(candles, sma)]
+def _wilder_smooth(values: np.ndarray, period: int) -> np.ndarray:
+    """Wilder's running average, seeded with the simple mean of the first window.
 
+    avg[i] = (avg[i-1] * (period - 1) + values[i]) / period for i >= period.
+    The recursion runs over plain floats in the same operation order as the
+    original per-row implementation, so results are bit-identical.
+    """
+    avg = pd.Series(values).rolling(window=period).mean().tolist()
+    x = values.tolist()
+    for i in range(period, len(x)):
+        avg[i] = (avg[i - 1] * (period - 1) + x[i]) / period
+    return np.array(avg, dtype=float)
 
-def calculate_ema(candles: List[Dict], period: int = 20) -> List[Dict]:
-    """Exponential Moving Average."""
-    df = _candles_to_df(candles)
-    ema = df["Close"].ewm(span=period, adjust=False).mean()
-    return [{"time": c["time"], "value": round(float(v), 2) if not pd.isna(v) else None}
-            for c, v in zip(candles, ema)]
 
+class IndicatorPlan:
+    """Memoized graph of intermediate series for one candle history.
 
-def calculate_rsi(candles: List[Dict], period: int = 14) -> List[Dict]:
-    """Relative Strength Index."""
-    df = _candles_to_df(candles)
-    delta = df["Close"].diff()
-    gain = delta.where(delta > 0, 0.0)
-    loss = (-delta).where(delta < 0, 0.0)
+    Nodes are keyed by tuples such as ("sma", 20) or ("ema", 12) and built on
+    first use from their dependencies (close -> ema -> macd -> macd_signal,
+    high/low/close -> true_range -> atr, ...). Every later request for the
+    same node reuses the computed series, so Bollinger's middle band is the
+    sma20 series and MACD reuses any ema12/ema26 already requested.
+    """
+
+    def __init__(self, candles: CandleFrame):
+        self.candles = candles
+        self._nodes: Dict[tuple, object] = {}
+
+    def get(self, kind: str, *params):
+        key = (kind, *params)
+        if key not in self._nodes:
+            self._nodes[key] = getattr(self, f"_build_{kind}")(*params)
+        return self._nodes[key]
+
+    def _build_close(self) -> pd.Series:
+        return pd.Series(self.candles.close)
+
+    def _build_high(self) -> pd.Series:
+        return pd.Series(self.candles.high)
+
+    def _build_low(self) -> pd.Series:
+        return pd.Series(self.candles.low)
+
+    def _build_sma(self, period: int) -> pd.Series:
+        return self.get("close").rolling(window=period).mean()
+
+    def _build_std(self, period: int) -> pd.Series:
+        return self.get("close").rolling(window=period).std()
 
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
+    def _build_ema(self, span: int) -> pd.Series:
+        return self.get("close").ewm(span=span, adjust=False).mean()
 
-    # Use Wilder's smoothing after initial window
-    for i in range(period, len(df)):
-        avg_gain.iloc[i] = (avg_gain.iloc[i-1] * (period - 1) + gain.iloc[i]) / period
-        avg_loss.iloc[i] = (avg_loss.iloc[i-1] * (period - 1) + loss.iloc[i]) / period
+    def _build_macd(self, fast: int, slow: int) -> pd.Series:
+        return self.get("ema", fast) - self.get("ema", slow)
 
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
+    def _build_macd_signal(self, fast: int, slow: int, signal: int) -> pd.Series:
+        return self.get("macd", fast, slow).ewm(span=signal, adjust=False).mean()
 
-    return [{"time": c["time"], "value": round(float(v), 2) if not pd.isna(v) else None}
-            for c, v in zip(candles, rsi)]
+    def _build_true_range(self) -> pd.Series:
+        high, low, close = self.get("high"), self.get("low"), self.get("close")
+        return pd.concat([
+            high - low,
+            (high - close.shift(1)).abs(),
+            (low - close.shift(1)).abs()
+        ], axis=1).max(axis=1)
 
+    def _build_atr(self, period: int) -> pd.Series:
+        """Simple-average true range, as used by Supertrend."""
+        return self.get("true_range").rolling(window=period).mean()
+
+    def _build_hl2(self) -> pd.Series:
+        return (self.get("high") + self.get("low")) / 2
+
+    def _build_rsi(self, period: int) -> np.ndarray:
+        delta = np.diff(self.candles.close, prepend=np.nan)
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+
+        avg_gain = _wilder_smooth(gain, period)
+        avg_loss = _wilder_smooth(loss, period)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = avg_gain / avg_loss
+            return 100 - (100 / (1 + rs))
+
+    def _build_vwap(self) -> pd.Series:
+        volume = pd.Series(self.candles.volume)
+        typical_price = (self.get("high") + self.get("low") + self.get("close")) / 3
+        return (typical_price * volume).cumsum() / volume.cumsum()
+
+
+def calculate_sma(candles: CandleFrame, period: int = 20, plan: Optional[IndicatorPlan] = None) -> List[Dict]:
+    """Simple Moving Average."""
+    plan = plan or IndicatorPlan(candles)
+    return _to_points(candles, plan.get("sma", period))
+
+
+def calculate_ema(candles: CandleFrame, period: int = 20, plan: Optional[IndicatorPlan] = None) -> List[Dict]:
+    """Exponential Moving Average."""
+    plan = plan or IndicatorPlan(candles)
+    return _to_points(candles, plan.get("ema", period))
 
-def calculate_macd(candles: List[Dict], fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, List[Dict]]:
+
+def calculate_rsi(candles: CandleFrame, period: int = 14, plan: Optional[IndicatorPlan] = None) -> List[Dict]:
+    """Relative Strength Index."""
+    plan = plan or IndicatorPlan(candles)
+    return _to_points(candles, plan.get("rsi", period))
+
+
+def calculate_macd(candles: CandleFrame, fast: int = 12, slow: int = 26, signal: int = 9,
+                   plan: Optional[IndicatorPlan] = None) -> Dict[str, List[Dict]]:
     """MACD indicator."""
-    df = _candles_to_df(candles)
-    ema_fast = df["Close"].ewm(span=fast, adjust=False).mean()
-    ema_slow = df["Close"].ewm(span=slow, adjust=False).mean()
-    macd_line = ema_fast - ema_slow
-    signal_line = macd_line.ewm(span=signal, adjust=False).mean()
+    plan = plan or IndicatorPlan(candles)
+    macd_line = plan.get("macd", fast, slow)
+    signal_line = plan.get("macd_signal", fast, slow, signal)
     histogram = macd_line - signal_line
 
-    def to_list(series):
-        return [{"time": c["time"], "value": round(float(v), 2) if not pd.isna(v) else None}
-                for c, v in zip(candles, series)]
-
     return {
-        "macd": to_list(macd_line),
-        "signal": to_list(signal_line),
-        "histogram": to_list(histogram),
+        "macd": _to_points(candles, macd_line),
+        "signal": _to_points(candles, signal_line),
+        "histogram": _to_points(candles, histogram),
     }
 
 
-def calculate_bollinger_bands(candles: List[Dict], period: int = 20, std_dev: float = 2.0) -> Dict[str, List[Dict]]:
+def calculate_bollinger_bands(candles: CandleFrame, period: int = 20, std_dev: float = 2.0,
+                              plan: Optional[IndicatorPlan] = None) -> Dict[str, List[Dict]]:
     """Bollinger Bands."""
-    df = _candles_to_df(candles)
-    sma = df["Close"].rolling(window=period).mean()
-    std = df["Close"].rolling(window=period).std()
+    plan = plan or IndicatorPlan(candles)
+    sma = plan.get("sma", period)
+    std = plan.get("std", period)
     upper = sma + (std * std_dev)
     lower = sma - (std * std_dev)
 
-    def to_list(series):
-        return [{"time": c["time"], "value": round(float(v), 2) if not pd.isna(v) else None}
-                for c, v in zip(candles, series)]
-
     return {
-        "upper": to_list(upper),
-        "middle": to_list(sma),
-        "lower": to_list(lower),
+        "upper": _to_points(candles, upper),
+        "middle": _to_points(candles, sma),
+        "lower": _to_points(candles, lower),
     }
 
 
-def calculate_supertrend(candles: List[Dict], period: int = 10, multiplier: float = 3.0) -> List[Dict]:
-    """Supertrend indicator."""
-    df = _candles_to_df(candles)
-    high = df["High"]
-    low = df["Low"]
-    close = df["Close"]
-
-    atr_series = pd.Series(index=df.index, dtype=float)
-    tr = pd.concat([
-        high - low,
-        (high - close.shift(1)).abs(),
-        (low - close.shift(1)).abs()
-    ], axis=1).max(axis=1)
-    atr_series = tr.rolling(window=period).mean()
-
-    hl2 = (high + low) / 2
-    upper_band = hl2 + (multiplier * atr_series)
-    lower_band = hl2 - (multiplier * atr_series)
+def _supertrend_kernel(close: np.ndarray, upper_band: np.ndarray, lower_band: np.ndarray, period: int):
+    """Supertrend band state machine over plain float lists.
 
-    supertrend = pd.Series(index=df.index, dtype=float)
-    direction = pd.Series(index=df.index, dtype=float)
+    Returns (supertrend, direction) lists; both are NaN before `period - 1`.
+    Raises IndexError when there are fewer than `period` candles.
+    """
+    close = close.tolist()
+    upper = upper_band.tolist()
+    lower = lower_band.tolist()
+    nan = float("nan")
+    supertrend = [nan] * len(close)
+    direction = [nan] * len(close)
 
-    supertrend.iloc[period - 1] = upper_band.iloc[period - 1]
-    direction.iloc[period - 1] = -1
+    supertrend[period - 1] = upper[period - 1]
+    direction[period - 1] = -1
 
-    for i in range(period, len(df)):
-        if close.iloc[i] > supertrend.iloc[i - 1]:
-            supertrend.iloc[i] = max(lower_band.iloc[i], supertrend.iloc[i - 1]) if direction.iloc[i-1] == 1 else lower_band.iloc[i]
-            direction.iloc[i] = 1
+    for i in range(period, len(close)):
+        if close[i] > supertrend[i - 1]:
+            supertrend[i] = max(lower[i], supertrend[i - 1]) if direction[i - 1] == 1 else lower[i]
+            direction[i] = 1
         else:
-            supertrend.iloc[i] = min(upper_band.iloc[i], supertrend.iloc[i - 1]) if direction.iloc[i-1] == -1 else upper_band.iloc[i]
-            direction.iloc[i] = -1
+            supertrend[i] = min(upper[i], supertrend[i - 1]) if direction[i - 1] == -1 else upper[i]
+            direction[i] = -1
 
-    return [{"time": c["time"], "value": round(float(v), 2) if not pd.isna(v) else None,
-             "color": "#22c55e" if d == 1 else "#ef4444" if d == -1 else None}
-            for c, v, d in zip(candles, supertrend, direction)]
+    return supertrend, direction
 
 
-def calculate_vwap(candles: List[Dict]) -> List[Dict]:
-    """Volume Weighted Average Price."""
-    df = _candles_to_df(candles)
-    typical_price = (df["High"] + df["Low"] + df["Close"]) / 3
-    cum_tp_vol = (typical_price * df["Volume"]).cumsum()
-    cum_vol = df["Volume"].cumsum()
-    vwap = cum_tp_vol / cum_vol
+def calculate_supertrend(candles: CandleFrame, period: int = 10, multiplier: float = 3.0,
+                         plan: Optional[IndicatorPlan] = None) -> List[Dict]:
+    """Supertrend indicator."""
+    plan = plan or IndicatorPlan(candles)
+    atr_series = plan.get("atr", period)
+    hl2 = plan.get("hl2")
+    upper_band = hl2 + (multiplier * atr_series)
+    lower_band = hl2 - (multiplier * atr_series)
 
-    return [{"time": c["time"], "value": round(float(v), 2) if not pd.isna(v) else None}
-            for c, v in zip(candles, vwap)]
+    supertrend, direction = _supertrend_kernel(
+        candles.close, upper_band.to_numpy(), lower_band.to_numpy(), period
+    )
 
+    return [{"time": t, "value": round(v, 2) if not math.isnan(v) else None,
+             "color": "#22c55e" if d == 1 else "#ef4444" if d == -1 else None}
+            for t, v, d in zip(candles.time.tolist(), supertrend, direction)]
 
-def get_indicators(candles: List[Dict], indicator_names: List[str]) -> Dict:
-    """Calculate multiple indicators."""
+
+def calculate_vwap(candles: CandleFrame, plan: Optional[IndicatorPlan] = None) -> List[Dict]:
+    """Volume Weighted Average Price."""
+    plan = plan or IndicatorPlan(candles)
+    return _to_points(candles, plan.get("vwap"))
+
+
+# Indicator kind -> (calculator, default parameters)
+INDICATORS = {
+    "sma": (calculate_sma, (20,)),
+    "ema": (calculate_ema, (20,)),
+    "rsi": (calculate_rsi, (14,)),
+    "macd": (calculate_macd, (12, 26, 9)),
+    "bollinger": (calculate_bollinger_bands, (20, 2.0)),
+    "supertrend": (calculate_supertrend, (10, 3.0)),
+    "vwap": (calculate_vwap, ()),
+}
+
+_NAME_RE = re.compile(r"^([a-z]+?)(\d+)?(?::([\d.,]+))?$")
+
+
+def parse_indicator(name: str) -> Optional[Tuple[str, tuple]]:
+    """Parse an indicator name into (kind, params).
+
+    Accepts the bare kind ('rsi', 'macd'), a trailing period ('sma20',
+    'ema50') or explicit parameters ('sma:100', 'ema:9', 'macd:8,21,5',
+    'bollinger:20,2.5'). Missing trailing parameters take their defaults.
+    Returns None for unknown kinds or invalid parameters.
+    """
+    match = _NAME_RE.match(name.strip().lower())
+    if not match or match.group(1) not in INDICATORS:
+        return None
+    kind, suffix, explicit = match.groups()
+    defaults = INDICATORS[kind][1]
+    if suffix and explicit:
+        return None
+    raw = [suffix] if suffix else explicit.split(",") if explicit else []
+    if len(raw) > len(defaults):
+        return None
+    try:
+        params = tuple(type(d)(r) for d, r in zip(defaults, raw)) + defaults[len(raw):]
+    except ValueError:
+        return None
+    if params and params[0] < 1:
+        return None
+    return kind, params
+
+
+def compute_indicators(candles: CandleFrame, indicator_names: List[str]) -> Tuple[Dict, Dict[str, float]]:
+    """Calculate several indicators over one shared IndicatorPlan.
+
+    Returns (results, timings_ms). Results are keyed by the requested name;
+    each timing covers the intermediates first built for that indicator plus
+    its serialization, so shared work is charged to the first requester.
+    """
+    plan = IndicatorPlan(candles)
     results = {}
+    timings = {}
     for name in indicator_names:
+        parsed = parse_indicator(name)
+        if parsed is None:
+            continue
+        kind, params = parsed
+        started = time.perf_counter()
         try:
-            if name == "sma20":
-                results["sma20"] = calculate_sma(candles, 20)
-            elif name == "sma50":
-                results["sma50"] = calculate_sma(candles, 50)
-            elif name == "sma200":
-                results["sma200"] = calculate_sma(candles, 200)
-            elif name == "ema20":
-                results["ema20"] = calculate_ema(candles, 20)
-            elif name == "ema50":
-                results["ema50"] = calculate_ema(candles, 50)
-            elif name == "rsi":
-                results["rsi"] = calculate_rsi(candles)
-            elif name == "macd":
-                results["macd"] = calculate_macd(candles)
-            elif name == "bollinger":
-                results["bollinger"] = calculate_bollinger_bands(candles)
-            elif name == "supertrend":
-                results["supertrend"] = calculate_supertrend(candles)
-            elif name == "vwap":
-                results["vwap"] = calculate_vwap(candles)
+            results[name] = INDICATORS[kind][0](candles, *params, plan=plan)
         except Exception as e:
             logger.error(f"Error calculating {name}: {e}")
-    return results
+        timings[name] = round((time.perf_counter() - started) * 1000, 3)
+    return results, timings
+
+
+def get_indicators(candles: CandleFrame, indicator_names: List[str]) -> Dict:
+    """Calculate multiple indicators."""
+    return compute_indicators(candles, indicator_names)[0]
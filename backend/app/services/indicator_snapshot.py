@@ -0,0 +1,155 @@
+"""Materialized "latest indicators" table for instant screening.
+
+Daily indicators only move when a bar changes, so instead of computing
+them per screener request a background job (app.tasks.indicator_snapshot_poller)
+rebuilds this table when the universe's daily histories change: RSI,
+MACD/signal (with the previous bar's values, for crossovers), SMA
+20/50/200, 20-day average volume and volume ratio, ATR and the distance
+from the 52-week high/low.
+
+The table is a set of numpy columns in memory (one row per symbol) with a
+copy in the `indicator_snapshots` database table, loaded at startup so a
+restart serves screens before the first rebuild.
+"""
+
+import logging
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import delete, select
+
+from app.database import async_session
+from app.models.indicator_snapshot import IndicatorSnapshot
+from app.services.screener_engine import LatestColumns, ScreenerEngine
+from app.utils.nse_symbols import NIFTY_50_SYMBOLS
+from app.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = LatestColumns.NAMES
+
+
+class IndicatorTable:
+    """One immutable build of the table: `columns[name][row]`, rows in `symbols` order."""
+
+    def __init__(self, symbols: List[str], columns: Dict[str, np.ndarray],
+                 bar_time: np.ndarray, version: int, as_of: float):
+        self.symbols = symbols
+        self.index = {s: i for i, s in enumerate(symbols)}
+        self.columns = columns
+        self.bar_time = bar_time
+        self.version = version
+        self.as_of = as_of
+
+    def select(self, symbols: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Columns for `symbols` in that order; all must be present."""
+        rows = np.array([self.index[s] for s in symbols], dtype=np.int64)
+        return {name: values[rows] for name, values in self.columns.items()}
+
+    def missing(self, symbols: Sequence[str]) -> List[str]:
+        return [s for s in symbols if s not in self.index]
+
+    def merged(self, other: "IndicatorTable", version: int) -> "IndicatorTable":
+        """This table with `other`'s rows added or replacing ours."""
+        keep = [s for s in self.symbols if s not in other.index]
+        rows = np.array([self.index[s] for s in keep], dtype=np.int64)
+        columns = {name: np.concatenate((self.columns[name][rows], other.columns[name]))
+                   for name in COLUMNS}
+        bar_time = np.concatenate((self.bar_time[rows], other.bar_time))
+        return IndicatorTable(keep + other.symbols, columns, bar_time, version, other.as_of)
+
+    def records(self) -> List[Dict]:
+        out = []
+        for i, symbol in enumerate(self.symbols):
+            row = {"symbol": symbol, "bar_time": int(self.bar_time[i]), "computed_at": self.as_of}
+            for name in COLUMNS:
+                v = self.columns[name][i].item()
+                row[name] = None if v != v else v
+            out.append(row)
+        return out
+
+
+def _empty() -> IndicatorTable:
+    return IndicatorTable([], {name: np.array([], dtype=float) for name in COLUMNS},
+                          np.array([], dtype=np.int64), 0, 0.0)
+
+
+class IndicatorSnapshotStore:
+    """Holds the current IndicatorTable, rebuilds it and mirrors it to the database."""
+
+    def __init__(self, period: str = "1y"):
+        # A year of bars covers SMA200 and the 52-week range
+        self._engine = ScreenerEngine(period=period)
+        self._table = _empty()
+        self._version = 0
+        self._flight = SingleFlight()
+        self._matrix = None
+        self.builds = 0
+
+    @property
+    def table(self) -> IndicatorTable:
+        return self._table
+
+    async def load(self):
+        """Warm the in-memory table from the database copy."""
+        try:
+            async with async_session() as session:
+                rows = (await session.execute(select(IndicatorSnapshot))).scalars().all()
+        except Exception as e:
+            logger.warning(f"Could not load indicator snapshot: {e}")
+            return
+        if not rows:
+            return
+        columns = {name: np.array([getattr(r, name) for r in rows], dtype=float) for name in COLUMNS}
+        columns["bars"] = columns["bars"].astype(np.int64)
+        bar_time = np.array([r.bar_time or 0 for r in rows], dtype=np.int64)
+        self._version += 1
+        self._table = IndicatorTable([r.symbol for r in rows], columns, bar_time,
+                                     self._version, max(r.computed_at for r in rows))
+        logger.info(f"Indicator snapshot loaded: {len(rows)} symbols")
+
+    async def refresh(self, symbols: Optional[Sequence[str]] = None) -> IndicatorTable:
+        """Rebuild rows for `symbols` (default: the whole table plus NIFTY 50)."""
+        if symbols is None:
+            symbols = list(dict.fromkeys([*NIFTY_50_SYMBOLS, *self._table.symbols]))
+        key = ",".join(symbols)
+        return await self._flight.do(key, lambda: self._build(list(symbols)))
+
+    async def _build(self, symbols: List[str]) -> IndicatorTable:
+        matrix = await self._engine.load(symbols)
+        if matrix is self._matrix and not self._table.missing(symbols):
+            return self._table  # no history changed since the last build
+        columns = matrix.latest()
+        self._version += 1
+        built = IndicatorTable(list(symbols), {n: columns[n] for n in COLUMNS}, matrix.last_time,
+                               self._version, time.time())
+        self._table = self._table.merged(built, self._version)
+        self._matrix = matrix
+        self.builds += 1
+        await self._persist(built)
+        return self._table
+
+    async def _persist(self, table: IndicatorTable):
+        try:
+            async with async_session() as session:
+                async with session.begin():
+                    await session.execute(delete(IndicatorSnapshot).where(
+                        IndicatorSnapshot.symbol.in_(table.symbols)))
+                    session.add_all([IndicatorSnapshot(**row) for row in table.records()])
+        except Exception as e:
+            logger.warning(f"Could not persist indicator snapshot: {e}")
+
+    async def columns_for(self, symbols: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Table columns for `symbols`, building rows for any not in the table yet."""
+        missing = self._table.missing(symbols)
+        if missing:
+            await self.refresh(missing)
+        return self._table.select(symbols)
+
+    def stats(self) -> Dict:
+        return {"symbols": len(self._table.symbols), "version": self._table.version,
+                "as_of": self._table.as_of, "builds": self.builds}
+
+
+indicator_snapshot = IndicatorSnapshotStore()
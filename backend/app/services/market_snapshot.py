@@ -0,0 +1,183 @@
+"""NIFTY 50 market snapshot shared by the market-wide endpoints and the screener.
+
+The whole universe is fetched with one batch quote call per refresh and
+stored column-wise. Gainers/losers, breadth, sector aggregates and
+screener quotes are then cheap reductions over the same table, and every
+view reports the snapshot `version` and `as_of` time it was derived from.
+"""
+
+import logging
+import time
+from typing import Optional, List, Dict, Any, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.market_data import get_batch_quotes
+from app.utils.nse_symbols import NIFTY_50_SYMBOLS, SECTOR_MAP
+from app.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+UNIVERSE = list(NIFTY_50_SYMBOLS.keys())
+SECTORS = list(SECTOR_MAP.keys())
+
+
+class SnapshotTable:
+    """One immutable refresh of the universe.
+
+    Rows keep the universe order; `valid` marks symbols the upstream
+    returned. `quotes` holds the raw batch quote dicts for row-shaped output.
+    """
+
+    def __init__(self, quotes: Dict[str, Dict[str, Any]], version: int, as_of: float):
+        self.version = version
+        self.as_of = as_of
+        self.symbols = UNIVERSE
+        self.quotes = quotes
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+
+        rows = [quotes.get(s) or {} for s in self.symbols]
+        self.valid = np.array([bool(r) for r in rows])
+        self.last_price = np.array([r.get("last_price", 0) or 0 for r in rows], dtype=np.float64)
+        self.day_change = np.array([r.get("day_change", 0) or 0 for r in rows], dtype=np.float64)
+        self.day_change_pct = np.array([r.get("day_change_pct", 0) or 0 for r in rows], dtype=np.float64)
+        self.volume = np.array([r.get("volume", 0) or 0 for r in rows], dtype=np.int64)
+
+        members = [(s, i) for i, sector in enumerate(SECTORS) for s in SECTOR_MAP[sector]]
+        sector_of = {s: i for s, i in members}
+        rank_of = {s: k for k, (s, _) in enumerate(members)}
+        self.sector = np.array([sector_of.get(s, -1) for s in self.symbols], dtype=np.int64)
+        # Position in SECTOR_MAP, to break ties the way max() over a sector list does
+        self.sector_rank = np.array([rank_of.get(s, -1) for s in self.symbols], dtype=np.int64)
+
+    def meta(self) -> Dict[str, Any]:
+        return {"version": self.version, "as_of": self.as_of}
+
+    def gainers_losers(self, count: int = 5) -> Dict[str, Any]:
+        rows = np.flatnonzero(self.valid)
+        # Stable descending sort keeps universe order among ties, like sorted(reverse=True)
+        order = rows[np.argsort(-self.day_change_pct[rows], kind="stable")]
+        ranked = [self.quotes[self.symbols[i]] for i in order.tolist()]
+        return {
+            "gainers": ranked[:count],
+            "losers": ranked[-count:][::-1] if len(ranked) >= count else [],
+            **self.meta(),
+        }
+
+    def breadth(self) -> Dict[str, Any]:
+        change = self.day_change[self.valid]
+        advances = int(np.count_nonzero(change > 0))
+        declines = int(np.count_nonzero(change < 0))
+        return {
+            "advances": advances,
+            "declines": declines,
+            "unchanged": int(change.size) - advances - declines,
+            **self.meta(),
+        }
+
+    def sectors(self) -> Dict[str, Any]:
+        mask = self.valid & (self.sector >= 0)
+        codes = self.sector[mask]
+        pct = self.day_change_pct[mask]
+        n = len(SECTORS)
+        counts = np.bincount(codes, minlength=n)
+        sums = np.bincount(codes, weights=pct, minlength=n)
+
+        # Best row per sector: sort by sector, then change desc, then list position
+        rows = np.flatnonzero(mask)
+        order = np.lexsort((self.sector_rank[rows], -pct, codes))
+        firsts = order[np.r_[True, codes[order][1:] != codes[order][:-1]]] if codes.size else order
+
+        sectors = []
+        for j in firsts.tolist():
+            code = int(codes[j])
+            top = self.symbols[rows[j]]
+            sectors.append({
+                "sector": SECTORS[code],
+                "change_pct": round(float(sums[code] / counts[code]), 2),
+                "top_stock": top,
+                "top_stock_change": self.quotes[top].get("day_change_pct"),
+            })
+        sectors.sort(key=lambda x: x["change_pct"], reverse=True)
+        return {"sectors": sectors, **self.meta()}
+
+    def quotes_for(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        return {s: self.quotes[s] for s in symbols if s in self.quotes}
+
+
+class MarketSnapshot:
+    """Holds the latest SnapshotTable and refreshes it once per interval."""
+
+    def __init__(self, interval: int):
+        self.interval = interval
+        self._table: Optional[SnapshotTable] = None
+        self._version = 0
+        self._flight = SingleFlight()
+
+    async def refresh(self) -> Optional[SnapshotTable]:
+        """Fetch the universe once; on failure keep serving the previous table."""
+        return await self._flight.do("snapshot", self._load)
+
+    async def _load(self) -> Optional[SnapshotTable]:
+        quotes = await get_batch_quotes(UNIVERSE)
+        if not quotes:
+            logger.warning("Market snapshot refresh returned no quotes; keeping previous snapshot")
+            return self._table
+        self._version += 1
+        self._table = SnapshotTable(quotes, self._version, time.time())
+        return self._table
+
+    async def current(self) -> Optional[SnapshotTable]:
+        """Latest table; blocks only when there is none yet.
+
+        If the refresher has fallen behind, the old table is still served
+        and a background refresh is started.
+        """
+        table = self._table
+        if table is None:
+            return await self.refresh()
+        if time.time() - table.as_of > self.interval:
+            self._flight.spawn("snapshot", self._load)
+        return table
+
+    @property
+    def version(self) -> int:
+        return self._table.version if self._table else 0
+
+
+market_snapshot = MarketSnapshot(settings.SNAPSHOT_REFRESH_INTERVAL)
+
+
+async def get_gainers_losers(count: int = 5) -> Dict[str, Any]:
+    table = await market_snapshot.current()
+    if table is None:
+        return {"gainers": [], "losers": [], "version": 0, "as_of": None}
+    return table.gainers_losers(count)
+
+
+async def get_market_breadth() -> Dict[str, Any]:
+    table = await market_snapshot.current()
+    if table is None:
+        return {"advances": 0, "declines": 0, "unchanged": 0, "version": 0, "as_of": None}
+    return table.breadth()
+
+
+async def get_sector_performance() -> Dict[str, Any]:
+    table = await market_snapshot.current()
+    if table is None:
+        return {"sectors": [], "version": 0, "as_of": None}
+    return table.sectors()
+
+
+async def get_universe_quotes(symbols: List[str]) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    """Quotes for `symbols`: universe members from the snapshot, the rest fetched.
+
+    Also returns the version of the snapshot that served them (0 if none).
+    """
+    table = await market_snapshot.current()
+    quotes = table.quotes_for(symbols) if table else {}
+    missing = [s for s in symbols if s not in quotes and (table is None or s not in table.index)]
+    if missing:
+        quotes.update(await get_batch_quotes(missing))
+    return quotes, table.version if table else 0
@@ -0,0 +1,81 @@
+"""Concurrent multi-symbol pattern scans shared by the scan API and the scanner task."""
+
+import asyncio
+import logging
+import time
+from typing import List, Dict, Optional, AsyncIterator, NamedTuple
+
+from app.services.market_data import get_history
+from app.services.cpu_executor import cpu_executor
+from app.ai.pipeline import analyze_patterns
+
+logger = logging.getLogger(__name__)
+
+# History period used for each pattern timeframe
+PERIOD_MAP = {
+    "1d": "6mo",
+    "1h": "1mo",
+    "15m": "5d",
+    "5m": "5d",
+    "1wk": "2y",
+}
+
+
+class ScanResult(NamedTuple):
+    symbol: str
+    patterns: Optional[List[Dict]]
+    error: Optional[str] = None
+
+
+async def _scan_symbol(symbol: str, period: str, interval: str, min_candles: int,
+                       fetch_slots: asyncio.Semaphore) -> ScanResult:
+    # The fetch slot is released before detection, so later fetches overlap
+    # with this symbol's analysis
+    async with fetch_slots:
+        candles = await get_history(symbol, period=period, interval=interval)
+    if not candles or len(candles) < min_candles:
+        return ScanResult(symbol, None, "no data")
+    patterns = await cpu_executor.run(analyze_patterns, candles, wait=True)
+    return ScanResult(symbol, patterns)
+
+
+async def scan_symbols(
+    symbols: List[str],
+    interval: str = "1d",
+    period: Optional[str] = None,
+    concurrency: int = 8,
+    time_budget: Optional[float] = None,
+    min_candles: int = 1,
+) -> AsyncIterator[ScanResult]:
+    """Yield a ScanResult per symbol in completion order.
+
+    Histories are fetched `concurrency` at a time and analysed on the CPU
+    executor. Symbols still pending when `time_budget` seconds have passed
+    are cancelled and reported with error "timeout".
+    """
+    period = period or PERIOD_MAP.get(interval, "6mo")
+    fetch_slots = asyncio.Semaphore(max(concurrency, 1))
+    tasks = {
+        asyncio.ensure_future(_scan_symbol(s, period, interval, min_candles, fetch_slots)): s
+        for s in symbols
+    }
+    deadline = time.monotonic() + time_budget if time_budget else None
+    pending = set(tasks)
+    try:
+        while pending:
+            timeout = max(deadline - time.monotonic(), 0) if deadline else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                symbol = tasks[task]
+                try:
+                    yield task.result()
+                except Exception as e:
+                    logger.warning(f"Pattern scan error for {symbol}: {e}")
+                    yield ScanResult(symbol, None, str(e) or type(e).__name__)
+        for task in pending:
+            yield ScanResult(tasks[task], None, "timeout")
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,146 @@
+"""Demand-driven scheduling of live quote polls.
+
+Every subscribed symbol gets a score: its subscriber count, weighted up by
+recent volatility (an EWMA of absolute % moves between polls). Symbols are
+ranked by score into tiers: the top POLL_HOT_SYMBOLS are "hot", the next
+POLL_WARM_SYMBOLS "warm", the rest "cold". Hot symbols are polled every
+PRICE_POLL_INTERVAL seconds, warm and cold ones every POLL_WARM_INTERVAL
+and POLL_COLD_INTERVAL, and every interval is stretched by
+POLL_OFF_HOURS_FACTOR outside NSE trading hours.
+
+Upstream quote requests are limited to POLL_BUDGET_PER_MINUTE symbols
+through a token bucket. When the budget runs short, due symbols are
+served hot first and, within a tier, stalest first; the rest wait, and
+that shows up as freshness lag in `stats()`.
+"""
+
+import time
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.utils.timeframes import is_market_open
+
+TIERS = ("hot", "warm", "cold")
+
+
+class _SymbolState:
+    __slots__ = ("subscribers", "volatility", "last_price", "last_polled", "tier")
+
+    def __init__(self):
+        self.subscribers = 0
+        self.volatility = 0.0
+        self.last_price: Optional[float] = None
+        self.last_polled = 0.0
+        self.tier = "cold"
+
+
+class PollScheduler:
+    def __init__(self, budget_per_minute: int, intervals: List[float], hot: int, warm: int,
+                 off_hours_factor: float = 12.0, volatility_alpha: float = 0.2,
+                 volatility_weight: float = 10.0):
+        self.budget_per_minute = budget_per_minute
+        self.intervals = dict(zip(TIERS, intervals))
+        self.hot = hot
+        self.warm = warm
+        self.off_hours_factor = off_hours_factor
+        self.volatility_alpha = volatility_alpha
+        self.volatility_weight = volatility_weight
+        self._symbols: Dict[str, _SymbolState] = {}
+        self._tokens = float(budget_per_minute)
+        self._refilled: Optional[float] = None
+        self.market_open = True
+        self.upstream_calls = {t: 0 for t in TIERS}
+        self.deferred = 0
+        # Lag = how late a poll was versus its tier's interval
+        self._lag_total = {t: 0.0 for t in TIERS}
+        self._lag_max = {t: 0.0 for t in TIERS}
+
+    def score(self, state: _SymbolState) -> float:
+        return state.subscribers * (1.0 + self.volatility_weight * state.volatility)
+
+    def update_demand(self, subscriber_counts: Dict[str, int]):
+        """Sync with the current subscriptions and re-rank symbols into tiers."""
+        for symbol in set(self._symbols) - set(subscriber_counts):
+            del self._symbols[symbol]
+        for symbol, count in subscriber_counts.items():
+            self._symbols.setdefault(symbol, _SymbolState()).subscribers = count
+        ranked = sorted(self._symbols.values(), key=self.score, reverse=True)
+        for i, state in enumerate(ranked):
+            state.tier = "hot" if i < self.hot else "warm" if i < self.hot + self.warm else "cold"
+
+    def interval(self, tier: str) -> float:
+        factor = 1.0 if self.market_open else self.off_hours_factor
+        return self.intervals[tier] * factor
+
+    def _refill(self, now: float):
+        if self._refilled is not None:
+            self._tokens = min(float(self.budget_per_minute),
+                               self._tokens + (now - self._refilled) * self.budget_per_minute / 60.0)
+        self._refilled = now
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        """Symbols to poll now, highest priority first, within the remaining budget."""
+        now = now if now is not None else time.time()
+        self.market_open = is_market_open(int(now))
+        self._refill(now)
+        due = [(TIERS.index(s.tier), s.last_polled, symbol) for symbol, s in self._symbols.items()
+               if now - s.last_polled >= self.interval(s.tier)]
+        due.sort()
+        allowed = int(self._tokens)
+        if len(due) > allowed:
+            self.deferred += len(due) - allowed
+            due = due[:allowed]
+        self._tokens -= len(due)
+        return [symbol for _, _, symbol in due]
+
+    def record(self, symbols: List[str], quotes: Dict[str, Dict], now: Optional[float] = None):
+        """Account for a poll of `symbols` and fold the returned prices into volatility."""
+        now = now if now is not None else time.time()
+        for symbol in symbols:
+            state = self._symbols.get(symbol)
+            if state is None:
+                continue
+            self.upstream_calls[state.tier] += 1
+            if state.last_polled:
+                lag = max(now - state.last_polled - self.interval(state.tier), 0.0)
+                self._lag_total[state.tier] += lag
+                self._lag_max[state.tier] = max(self._lag_max[state.tier], lag)
+            state.last_polled = now
+            price = (quotes.get(symbol) or {}).get("last_price")
+            if price:
+                if state.last_price:
+                    move = abs(price / state.last_price - 1.0) * 100.0
+                    state.volatility += self.volatility_alpha * (move - state.volatility)
+                state.last_price = price
+
+    def stats(self) -> dict:
+        now = time.time()
+        tiers = {}
+        for tier in TIERS:
+            states = [s for s in self._symbols.values() if s.tier == tier]
+            ages = [now - s.last_polled for s in states if s.last_polled]
+            calls = self.upstream_calls[tier]
+            tiers[tier] = {
+                "symbols": len(states),
+                "interval": self.interval(tier),
+                "upstream_calls": calls,
+                "avg_lag": round(self._lag_total[tier] / calls, 3) if calls else 0.0,
+                "max_lag": round(self._lag_max[tier], 3),
+                "max_age": round(max(ages), 3) if ages else None,
+            }
+        return {
+            "market_open": self.market_open,
+            "budget_per_minute": self.budget_per_minute,
+            "tokens": round(self._tokens, 1),
+            "deferred": self.deferred,
+            "tiers": tiers,
+        }
+
+
+poll_scheduler = PollScheduler(
+    settings.POLL_BUDGET_PER_MINUTE,
+    [settings.PRICE_POLL_INTERVAL, settings.POLL_WARM_INTERVAL, settings.POLL_COLD_INTERVAL],
+    settings.POLL_HOT_SYMBOLS,
+    settings.POLL_WARM_SYMBOLS,
+    settings.POLL_OFF_HOURS_FACTOR,
+)
@@ -0,0 +1,39 @@
+"""Market data providers, selected by Settings.MARKET_DATA_PROVIDER."""
+
+from typing import Optional
+
+from app.config import settings
+from app.services.providers.base import MarketDataProvider
+
+_provider: Optional[MarketDataProvider] = None
+
+
+def create_provider(name: str) -> MarketDataProvider:
+    if name == "yfinance":
+        from app.services.providers.yfinance_provider import YFinanceProvider
+        return YFinanceProvider()
+    if name == "replay":
+        from app.services.providers.replay_provider import ReplayProvider
+        return ReplayProvider(
+            data_dir=settings.REPLAY_DATA_DIR,
+            latency_ms=settings.REPLAY_LATENCY_MS,
+            failure_rate=settings.REPLAY_FAILURE_RATE,
+            seed=settings.REPLAY_SEED,
+        )
+    raise ValueError(f"Unknown market data provider: {name}")
+
+
+def get_provider() -> MarketDataProvider:
+    global _provider
+    if _provider is None:
+        _provider = create_provider(settings.MARKET_DATA_PROVIDER)
+    return _provider
+
+
+def set_provider(provider: MarketDataProvider):
+    """Swap the active provider (benchmarks and load tests)."""
+    global _provider
+    _provider = provider
+
+
+__all__ = ["MarketDataProvider", "create_provider", "get_provider", "set_provider"]
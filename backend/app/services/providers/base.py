@@ -0,0 +1,54 @@
+"""Market data provider interface."""
+
+from abc import ABC, abstractmethod
+from typing import Optional, List, Dict, Any
+
+from app.utils.candles import CandleFrame
+
+
+class MarketDataProvider(ABC):
+    """Source of quotes, OHLCV history, fundamentals and index levels.
+
+    Methods are synchronous and may block; market_data runs them on its
+    thread pool. Failures are logged and reported as None / empty results,
+    never raised.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def fetch_quote(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Full quote for one symbol (StockQuote shape)."""
+
+    @abstractmethod
+    def fetch_batch_quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Compact quotes keyed by symbol; missing symbols are omitted."""
+
+    @abstractmethod
+    def fetch_history(self, symbol: str, period: str = "1mo", interval: str = "1d",
+                      start: Optional[int] = None) -> Optional[CandleFrame]:
+        """OHLCV candles for a yfinance-style period/interval.
+
+        With `start` (epoch seconds) the period is ignored and bars from
+        `start` up to now are returned; used for incremental tail fetches.
+        """
+
+    @abstractmethod
+    def fetch_stock_info(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Company profile and fundamentals (StockInfo shape)."""
+
+    def fetch_stock_infos(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """fetch_stock_info for several symbols; failed symbols are omitted.
+
+        Providers with a bulk fundamentals endpoint should override this.
+        """
+        results = {}
+        for symbol in symbols:
+            info = self.fetch_stock_info(symbol)
+            if info:
+                results[symbol] = info
+        return results
+
+    @abstractmethod
+    def fetch_index_data(self) -> List[Dict[str, Any]]:
+        """Levels for every index in INDEX_SYMBOLS (IndexData shape)."""
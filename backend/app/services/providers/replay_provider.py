@@ -0,0 +1,339 @@
+"""Deterministic offline provider for load tests and benchmarks.
+
+Serves OHLCV from local files when present, otherwise from a seeded
+synthetic random walk, with optional injected latency and failures.
+
+File layout under REPLAY_DATA_DIR: `<SYMBOL>_<interval>.parquet` or
+`<SYMBOL>_<interval>.csv` with columns time, open, high, low, close,
+volume (time as epoch seconds or an ISO timestamp). For file-backed
+series the last bar is treated as "now" when slicing periods and building
+quotes.
+
+The synthetic walk is stable across calls and processes: daily closes are
+a random walk from a fixed epoch seeded by (seed, symbol), and intraday
+bars for a session are drawn from a generator seeded by (seed, symbol,
+interval, day) so the same request always returns the same candles.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+import zlib
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.providers.base import MarketDataProvider
+from app.utils.candles import CandleFrame
+from app.utils.nse_symbols import NIFTY_50_SYMBOLS, INDEX_SYMBOLS, SYMBOL_SECTOR
+from app.utils.timeframes import (
+    IST_OFFSET, SESSION_OPEN, SESSION_CLOSE, INTERVAL_SECONDS,
+    period_seconds, is_intraday, ist_day, ist_midnight,
+)
+
+logger = logging.getLogger(__name__)
+
+# Synthetic walks start here (2015-01-01 IST)
+SYNTHETIC_EPOCH_DAY = ist_day(1420050600)
+
+
+def _stable_hash(*parts) -> int:
+    return zlib.crc32("|".join(str(p) for p in parts).encode())
+
+
+@lru_cache(maxsize=256)
+def _daily_walk(seed: int, symbol: str, last_day: int) -> CandleFrame:
+    """Weekday daily bars from SYNTHETIC_EPOCH_DAY through last_day."""
+    days = np.arange(SYNTHETIC_EPOCH_DAY, last_day + 1)
+    days = days[(days + 3) % 7 < 5]  # day 0 (1970-01-01) was a Thursday
+    rng = np.random.default_rng(_stable_hash(seed, symbol))
+    start = 100 + rng.random() * 4900
+    # Draw a fixed-length stream so earlier days never change as time advances
+    horizon = max(len(days), 8000)
+    returns = rng.normal(0.0003, 0.015, horizon)[:len(days)]
+    spreads = np.abs(rng.normal(0, 0.008, (horizon, 3)))[:len(days)]
+    volumes = rng.lognormal(14, 0.5, horizon)[:len(days)]
+
+    close = start * np.exp(np.cumsum(returns))
+    open_ = np.concatenate(([start], close[:-1])) * (1 + spreads[:, 0] - spreads[:, 1])
+    high = np.maximum(open_, close) * (1 + spreads[:, 1])
+    low = np.minimum(open_, close) * (1 - spreads[:, 2])
+    return CandleFrame(
+        time=ist_midnight(days),
+        open=np.round(open_, 2), high=np.round(high, 2),
+        low=np.round(low, 2), close=np.round(close, 2),
+        volume=volumes.astype(np.int64),
+    )
+
+
+class ReplayProvider(MarketDataProvider):
+    """Serve market data from local files or a synthetic random walk."""
+
+    name = "replay"
+
+    def __init__(self, data_dir: str = "", latency_ms: int = 0, failure_rate: float = 0.0, seed: int = 42):
+        self.data_dir = data_dir
+        self.latency = latency_ms / 1000
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._files: Dict[Tuple[str, str], Optional[CandleFrame]] = {}
+
+    # --- latency / failure injection ---
+
+    def _simulate_upstream(self, what: str):
+        """Sleep for the configured latency; raise on an injected failure."""
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate:
+            with self._rng_lock:
+                failed = self._rng.random() < self.failure_rate
+            if failed:
+                raise ConnectionError(f"injected replay failure ({what})")
+
+    # --- file-backed series ---
+
+    def _load_file(self, symbol: str, interval: str) -> Optional[CandleFrame]:
+        key = (symbol, interval)
+        if key in self._files:
+            return self._files[key]
+
+        frame = None
+        if self.data_dir:
+            base = os.path.join(self.data_dir, f"{symbol}_{interval}")
+            df = None
+            if os.path.exists(base + ".parquet"):
+                df = pd.read_parquet(base + ".parquet")
+            elif os.path.exists(base + ".csv"):
+                df = pd.read_csv(base + ".csv")
+            if df is not None and not df.empty:
+                times = df["time"]
+                if not pd.api.types.is_numeric_dtype(times):
+                    times = pd.to_datetime(times, utc=True).astype("int64") // 10**9
+                df = df.assign(time=times).sort_values("time")
+                frame = CandleFrame(*(df[c].to_numpy() for c in CandleFrame.COLUMNS))
+        self._files[key] = frame
+        return frame
+
+    # --- synthetic series ---
+
+    def _daily_walk(self, symbol: str, last_day: int) -> CandleFrame:
+        return _daily_walk(self.seed, symbol, last_day)
+
+    def _session_bars(self, symbol: str, day: int, interval: str, prev_close: float, day_close: float) -> CandleFrame:
+        """Intraday bars for one session, bridged from prev_close to day_close."""
+        step = INTERVAL_SECONDS[interval]
+        starts = np.arange(SESSION_OPEN, SESSION_CLOSE, step)
+        n = len(starts)
+        rng = np.random.default_rng(_stable_hash(self.seed, symbol, interval, day))
+
+        walk = np.cumsum(rng.normal(0, 1, n))
+        bridge = walk - np.arange(1, n + 1) / n * walk[-1]
+        scale = abs(day_close - prev_close) / 2 + prev_close * 0.002
+        close = prev_close + (day_close - prev_close) * np.arange(1, n + 1) / n + bridge * scale / np.sqrt(n)
+        open_ = np.concatenate(([prev_close], close[:-1]))
+        wick = np.abs(rng.normal(0, prev_close * 0.0008, (n, 2)))
+        return CandleFrame(
+            time=ist_midnight(day) + starts,
+            open=np.round(open_, 2),
+            high=np.round(np.maximum(open_, close) + wick[:, 0], 2),
+            low=np.round(np.minimum(open_, close) - wick[:, 1], 2),
+            close=np.round(close, 2),
+            volume=rng.lognormal(10, 0.6, n).astype(np.int64),
+        )
+
+    @staticmethod
+    def _last_trading_moment(now: int) -> int:
+        """Clamp `now` into the latest weekday session, like a closed market."""
+        day = ist_day(now)
+        if now < ist_midnight(day) + SESSION_OPEN:
+            day -= 1
+        while (day + 3) % 7 >= 5:
+            day -= 1
+        return min(now, ist_midnight(day) + SESSION_CLOSE)
+
+    def _synthetic_history(self, symbol: str, start: int, now: int, interval: str) -> CandleFrame:
+        last_day = ist_day(now)
+        daily = self._daily_walk(symbol, last_day)
+        if not is_intraday(interval):
+            daily = daily[int(np.searchsorted(daily.time, start)):]
+            if interval in ("1d", "5d"):
+                return daily
+            rule = "W-MON" if interval == "1wk" else "MS"
+            return _aggregate(daily, rule)
+
+        first = int(np.searchsorted(daily.time, ist_midnight(ist_day(start))))
+        sessions = []
+        for i in range(max(first, 1), len(daily)):
+            bars = self._session_bars(
+                symbol, ist_day(int(daily.time[i])), interval,
+                float(daily.close[i - 1]), float(daily.close[i]),
+            )
+            sessions.append(bars[:int(np.searchsorted(bars.time, now, side="right"))])
+        return _concat(sessions)
+
+    # --- MarketDataProvider ---
+
+    def _history(self, symbol: str, period: str, interval: str, start: Optional[int] = None) -> Optional[CandleFrame]:
+        frame = self._load_file(symbol, interval)
+        if frame is not None and len(frame):
+            now = int(frame.time[-1])
+        else:
+            now = self._last_trading_moment(int(time.time()))
+        if start is None:
+            span = period_seconds(period)
+            start = now - span if span is not None else 0
+        if frame is None:
+            start = max(start, ist_midnight(SYNTHETIC_EPOCH_DAY))
+            frame = self._synthetic_history(symbol, start, now, interval)
+        return frame[int(np.searchsorted(frame.time, start)):]
+
+    def fetch_history(self, symbol: str, period: str = "1mo", interval: str = "1d",
+                      start: Optional[int] = None) -> Optional[CandleFrame]:
+        try:
+            self._simulate_upstream(f"history {symbol}")
+            frame = self._history(symbol, period, interval, start)
+            return frame if frame is not None and len(frame) else None
+        except Exception as e:
+            logger.error(f"Error fetching history for {symbol}: {e}")
+            return None
+
+    def _quote(self, symbol: str) -> Optional[Dict[str, Any]]:
+        daily = self._history(symbol, "1mo", "1d")
+        if daily is None or len(daily) < 2:
+            return None
+        intraday = self._history(symbol, "1d", "1m")
+        last_day = ist_day(int(daily.time[-1]))
+        today = None
+        if intraday:
+            lo, hi = np.searchsorted(intraday.time, [ist_midnight(last_day), ist_midnight(last_day + 1)])
+            today = intraday[int(lo):int(hi)]
+
+        if today is not None and len(today):
+            last_price = float(today.close[-1])
+            open_price, high, low = float(today.open[0]), float(today.high.max()), float(today.low.min())
+            volume = int(today.volume.sum())
+        else:
+            last_price = float(daily.close[-1])
+            open_price, high, low = float(daily.open[-1]), float(daily.high[-1]), float(daily.low[-1])
+            volume = int(daily.volume[-1])
+        prev_close = float(daily.close[-2])
+        year = self._history(symbol, "1y", "1d")
+        change = last_price - prev_close
+        return {
+            "symbol": symbol,
+            "name": NIFTY_50_SYMBOLS.get(symbol, symbol),
+            "exchange": "NSE",
+            "last_price": round(last_price, 2),
+            "prev_close": round(prev_close, 2),
+            "open": round(open_price, 2),
+            "high": round(high, 2),
+            "low": round(low, 2),
+            "volume": volume,
+            "day_change": round(change, 2),
+            "day_change_pct": round(change / prev_close * 100, 2),
+            "market_cap": None,
+            "pe_ratio": None,
+            "week_52_high": float(year.high.max()),
+            "week_52_low": float(year.low.min()),
+            "timestamp": datetime.now().isoformat(),
+        }
+
+    def fetch_quote(self, symbol: str) -> Optional[Dict[str, Any]]:
+        try:
+            self._simulate_upstream(f"quote {symbol}")
+            return self._quote(symbol)
+        except Exception as e:
+            logger.error(f"Error fetching quote for {symbol}: {e}")
+            return None
+
+    def fetch_batch_quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        try:
+            self._simulate_upstream("batch quotes")
+            for symbol in symbols:
+                quote = self._quote(symbol)
+                if quote:
+                    results[symbol] = {k: quote[k] for k in (
+                        "symbol", "name", "last_price", "prev_close",
+                        "day_change", "day_change_pct", "volume", "timestamp",
+                    )}
+        except Exception as e:
+            logger.error(f"Batch quote error: {e}")
+        return results
+
+    def fetch_stock_info(self, symbol: str) -> Optional[Dict[str, Any]]:
+        try:
+            self._simulate_upstream(f"info {symbol}")
+            quote = self._quote(symbol)
+            if quote is None:
+                return None
+            rng = np.random.default_rng(_stable_hash(self.seed, symbol, "info"))
+            eps = round(quote["last_price"] / rng.uniform(8, 60), 2)
+            book_value = round(quote["last_price"] / rng.uniform(1, 12), 2)
+            shares = float(rng.uniform(5e8, 6e9))
+            return {
+                "symbol": symbol,
+                "name": NIFTY_50_SYMBOLS.get(symbol, symbol),
+                "exchange": "NSE",
+                "sector": SYMBOL_SECTOR.get(symbol),
+                "industry": None,
+                "market_cap": round(quote["last_price"] * shares),
+                "pe_ratio": round(quote["last_price"] / eps, 2),
+                "pb_ratio": round(quote["last_price"] / book_value, 2),
+                "dividend_yield": round(float(rng.uniform(0, 0.04)), 4),
+                "roe": round(float(rng.uniform(-0.05, 0.35)), 4),
+                "debt_to_equity": round(float(rng.uniform(0, 250)), 2),
+                "eps": eps,
+                "book_value": book_value,
+                "face_value": float(rng.choice([1, 2, 5, 10])),
+                "week_52_high": quote["week_52_high"],
+                "week_52_low": quote["week_52_low"],
+            }
+        except Exception as e:
+            logger.error(f"Error fetching info for {symbol}: {e}")
+            return None
+
+    def fetch_index_data(self) -> List[Dict[str, Any]]:
+        results = []
+        for name, yf_sym in INDEX_SYMBOLS.items():
+            try:
+                self._simulate_upstream(f"index {name}")
+                quote = self._quote(yf_sym)
+                if quote:
+                    results.append({
+                        "name": name,
+                        "value": quote["last_price"],
+                        "change": quote["day_change"],
+                        "change_pct": quote["day_change_pct"],
+                        "open": quote["open"],
+                        "high": quote["high"],
+                        "low": quote["low"],
+                        "prev_close": quote["prev_close"],
+                    })
+            except Exception as e:
+                logger.warning(f"Error fetching index {name}: {e}")
+        return results
+
+
+def _concat(frames: List[CandleFrame]) -> CandleFrame:
+    if not frames:
+        return CandleFrame([], [], [], [], [], [])
+    return CandleFrame(*(np.concatenate([getattr(f, c) for f in frames]) for c in CandleFrame.COLUMNS))
+
+
+def _aggregate(daily: CandleFrame, rule: str) -> CandleFrame:
+    """Roll daily bars up to weekly/monthly bars with pandas resample."""
+    df = pd.DataFrame({c: getattr(daily, c) for c in CandleFrame.COLUMNS[1:]},
+                      index=pd.to_datetime(daily.time + IST_OFFSET, unit="s"))
+    out = df.resample(rule, label="left", closed="left").agg({
+        "open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum",
+    }).dropna()
+    times = out.index.values.astype("datetime64[s]").astype(np.int64) - IST_OFFSET
+    return CandleFrame(times, out["open"], out["high"], out["low"], out["close"], out["volume"])
@@ -0,0 +1,206 @@
+"""yfinance-backed market data provider."""
+
+import yfinance as yf
+import numpy as np
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any
+import logging
+
+from app.services.providers.base import MarketDataProvider
+from app.utils.candles import CandleFrame
+from app.utils.nse_symbols import (
+    get_yfinance_symbol, NIFTY_50_SYMBOLS, INDEX_SYMBOLS, SYMBOL_SECTOR
+)
+
+logger = logging.getLogger(__name__)
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Live data from Yahoo Finance (NSE symbols as <SYMBOL>.NS)."""
+
+    name = "yfinance"
+
+    def fetch_quote(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Fetch real-time quote for a symbol (runs in thread)."""
+        try:
+            yf_symbol = get_yfinance_symbol(symbol)
+            ticker = yf.Ticker(yf_symbol)
+            info = ticker.fast_info
+
+            last_price = float(info.get("lastPrice", 0) or info.get("last_price", 0) or 0)
+            prev_close = float(info.get("previousClose", 0) or info.get("previous_close", 0) or 0)
+
+            if last_price == 0:
+                hist = ticker.history(period="2d")
+                if not hist.empty:
+                    last_price = float(hist["Close"].iloc[-1])
+                    if len(hist) > 1:
+                        prev_close = float(hist["Close"].iloc[-2])
+
+            if last_price == 0:
+                return None
+
+            change = last_price - prev_close if prev_close else 0
+            change_pct = (change / prev_close * 100) if prev_close else 0
+
+            open_price = float(info.get("open", 0) or 0)
+            day_high = float(info.get("dayHigh", 0) or info.get("day_high", 0) or 0)
+            day_low = float(info.get("dayLow", 0) or info.get("day_low", 0) or 0)
+            volume = int(info.get("lastVolume", 0) or info.get("last_volume", 0) or 0)
+            market_cap = float(info.get("marketCap", 0) or info.get("market_cap", 0) or 0)
+
+            name = NIFTY_50_SYMBOLS.get(symbol, symbol)
+
+            result = {
+                "symbol": symbol,
+                "name": name,
+                "exchange": "NSE",
+                "last_price": round(last_price, 2),
+                "prev_close": round(prev_close, 2),
+                "open": round(open_price, 2),
+                "high": round(day_high, 2),
+                "low": round(day_low, 2),
+                "volume": volume,
+                "day_change": round(change, 2),
+                "day_change_pct": round(change_pct, 2),
+                "market_cap": market_cap if market_cap else None,
+                "pe_ratio": None,
+                "week_52_high": float(info.get("yearHigh", 0) or info.get("year_high", 0) or 0) or None,
+                "week_52_low": float(info.get("yearLow", 0) or info.get("year_low", 0) or 0) or None,
+                "timestamp": datetime.now().isoformat(),
+            }
+            return result
+        except Exception as e:
+            logger.error(f"Error fetching quote for {symbol}: {e}")
+            return None
+
+    def fetch_batch_quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch quotes for multiple symbols at once."""
+        results = {}
+        try:
+            yf_symbols = [get_yfinance_symbol(s) for s in symbols]
+            tickers = yf.Tickers(" ".join(yf_symbols))
+
+            for symbol, yf_sym in zip(symbols, yf_symbols):
+                try:
+                    ticker = tickers.tickers.get(yf_sym)
+                    if not ticker:
+                        continue
+                    info = ticker.fast_info
+                    last_price = float(info.get("lastPrice", 0) or info.get("last_price", 0) or 0)
+                    prev_close = float(info.get("previousClose", 0) or info.get("previous_close", 0) or 0)
+
+                    if last_price == 0:
+                        continue
+
+                    change = last_price - prev_close if prev_close else 0
+                    change_pct = (change / prev_close * 100) if prev_close else 0
+
+                    results[symbol] = {
+                        "symbol": symbol,
+                        "name": NIFTY_50_SYMBOLS.get(symbol, symbol),
+                        "last_price": round(last_price, 2),
+                        "prev_close": round(prev_close, 2),
+                        "day_change": round(change, 2),
+                        "day_change_pct": round(change_pct, 2),
+                        "volume": int(info.get("lastVolume", 0) or info.get("last_volume", 0) or 0),
+                        "timestamp": datetime.now().isoformat(),
+                    }
+                except Exception as e:
+                    logger.warning(f"Error in batch quote for {symbol}: {e}")
+        except Exception as e:
+            logger.error(f"Batch quote error: {e}")
+        return results
+
+    def fetch_history(self, symbol: str, period: str = "1mo", interval: str = "1d",
+                      start: Optional[int] = None) -> Optional[CandleFrame]:
+        """Fetch historical OHLCV data."""
+        try:
+            yf_symbol = get_yfinance_symbol(symbol)
+            ticker = yf.Ticker(yf_symbol)
+            if start is not None:
+                hist = ticker.history(start=datetime.fromtimestamp(start, tz=timezone.utc), interval=interval)
+            else:
+                hist = ticker.history(period=period, interval=interval)
+
+            if hist.empty:
+                return None
+
+            index = hist.index
+            if index.tz is not None:
+                index = index.tz_convert("UTC").tz_localize(None)
+
+            return CandleFrame(
+                time=index.values.astype("datetime64[s]").astype(np.int64),
+                open=np.round(hist["Open"].to_numpy(dtype=float), 2),
+                high=np.round(hist["High"].to_numpy(dtype=float), 2),
+                low=np.round(hist["Low"].to_numpy(dtype=float), 2),
+                close=np.round(hist["Close"].to_numpy(dtype=float), 2),
+                volume=hist["Volume"].fillna(0).to_numpy(dtype=np.int64),
+            )
+        except Exception as e:
+            logger.error(f"Error fetching history for {symbol}: {e}")
+            return None
+
+    def fetch_stock_info(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Fetch detailed stock information."""
+        try:
+            yf_symbol = get_yfinance_symbol(symbol)
+            ticker = yf.Ticker(yf_symbol)
+            info = ticker.info
+
+            return {
+                "symbol": symbol,
+                "name": info.get("longName", NIFTY_50_SYMBOLS.get(symbol, symbol)),
+                "exchange": "NSE",
+                "sector": info.get("sector", SYMBOL_SECTOR.get(symbol)),
+                "industry": info.get("industry"),
+                "market_cap": info.get("marketCap"),
+                "pe_ratio": info.get("trailingPE"),
+                "pb_ratio": info.get("priceToBook"),
+                "dividend_yield": info.get("dividendYield"),
+                "roe": info.get("returnOnEquity"),
+                "debt_to_equity": info.get("debtToEquity"),
+                "eps": info.get("trailingEps"),
+                "book_value": info.get("bookValue"),
+                "face_value": info.get("faceValue"),
+                "week_52_high": info.get("fiftyTwoWeekHigh"),
+                "week_52_low": info.get("fiftyTwoWeekLow"),
+            }
+        except Exception as e:
+            logger.error(f"Error fetching info for {symbol}: {e}")
+            return None
+
+    def fetch_index_data(self) -> List[Dict[str, Any]]:
+        """Fetch index data."""
+        results = []
+        for name, yf_sym in INDEX_SYMBOLS.items():
+            try:
+                ticker = yf.Ticker(yf_sym)
+                info = ticker.fast_info
+                last = float(info.get("lastPrice", 0) or info.get("last_price", 0) or 0)
+                prev = float(info.get("previousClose", 0) or info.get("previous_close", 0) or 0)
+
+                if last == 0:
+                    hist = ticker.history(period="2d")
+                    if not hist.empty:
+                        last = float(hist["Close"].iloc[-1])
+                        if len(hist) > 1:
+                            prev = float(hist["Close"].iloc[-2])
+
+                if last > 0:
+                    change = last - prev if prev else 0
+                    change_pct = (change / prev * 100) if prev else 0
+                    results.append({
+                        "name": name,
+                        "value": round(last, 2),
+                        "change": round(change, 2),
+                        "change_pct": round(change_pct, 2),
+                        "open": float(info.get("open", 0) or 0),
+                        "high": float(info.get("dayHigh", 0) or info.get("day_high", 0) or 0),
+                        "low": float(info.get("dayLow", 0) or info.get("day_low", 0) or 0),
+                        "prev_close": round(prev, 2),
+                    })
+            except Exception as e:
+                logger.warning(f"Error fetching index {name}: {e}")
+        return results
@@ -0,0 +1,149 @@
+"""Derive coarser intraday bars from finer base data.
+
+Flipping a chart between 5m, 15m and 1h used to make one upstream fetch
+per interval. Intraday intervals are now built from a single base series
+(1m for the 1d/5d periods yfinance serves at that granularity, 5m up to its
+60-day limit), so the variants share one fetch and one cache entry.
+
+Buckets are anchored at the NSE open (09:15 IST) and bars outside the
+09:15-15:30 session are dropped, so hourly bars run 09:15, 10:15, ...,
+15:15 (a 15-minute last bar) like the exchange's own. Aggregation is a
+single reduceat per column.
+
+Results are cached per (symbol, interval, period). When the base series
+only grew at the end, or its still-forming last bar was revised in place,
+just the buckets from the previous last one onward are re-aggregated.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Optional, NamedTuple
+
+import numpy as np
+
+from app.utils.candles import CandleFrame
+from app.utils.timeframes import (
+    IST_OFFSET, DAY, SESSION_OPEN, SESSION_CLOSE, INTERVAL_SECONDS, period_seconds,
+)
+
+# Base interval -> longest period (seconds) the upstream serves at that granularity
+BASE_LIMITS = {
+    "1m": 7 * DAY,
+    "5m": 60 * DAY,
+}
+
+DERIVED_INTERVALS = ("2m", "5m", "15m", "30m", "60m", "90m", "1h")
+
+
+def base_interval(interval: str, period: str) -> Optional[str]:
+    """Finest base the interval can be derived from for this period, if any."""
+    if interval not in DERIVED_INTERVALS:
+        return None
+    span = period_seconds(period)
+    if span is None:
+        return None
+    step = INTERVAL_SECONDS[interval]
+    for base, limit in BASE_LIMITS.items():
+        base_step = INTERVAL_SECONDS[base]
+        if base_step < step and step % base_step == 0 and span <= limit:
+            return base
+    return None
+
+
+def session_buckets(times: np.ndarray, step: int) -> np.ndarray:
+    """Start time of the session-anchored `step`-second bucket of each bar."""
+    local = times + IST_OFFSET
+    day_start = local - local % DAY
+    offset = (local - day_start - SESSION_OPEN) // step * step
+    return day_start + SESSION_OPEN + offset - IST_OFFSET
+
+
+def in_session(times: np.ndarray) -> np.ndarray:
+    sec = (times + IST_OFFSET) % DAY
+    return (sec >= SESSION_OPEN) & (sec < SESSION_CLOSE)
+
+
+def aggregate(base: CandleFrame, step: int) -> CandleFrame:
+    """OHLCV bars of `step` seconds from in-session base bars."""
+    mask = in_session(base.time)
+    if not mask.all():
+        base = CandleFrame(*(getattr(base, c)[mask] for c in CandleFrame.COLUMNS))
+    if not len(base):
+        return CandleFrame([], [], [], [], [], [])
+
+    buckets = session_buckets(base.time, step)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    return CandleFrame(
+        time=buckets[starts],
+        open=base.open[starts],
+        high=np.maximum.reduceat(base.high, starts),
+        low=np.minimum.reduceat(base.low, starts),
+        close=base.close[ends],
+        volume=np.add.reduceat(base.volume, starts),
+    )
+
+
+def _concat(head: CandleFrame, tail: CandleFrame) -> CandleFrame:
+    return CandleFrame(*(np.concatenate((getattr(head, c), getattr(tail, c))) for c in CandleFrame.COLUMNS))
+
+
+def _row(frame: CandleFrame, i: int) -> tuple:
+    return tuple(getattr(frame, c)[i].item() for c in CandleFrame.COLUMNS)
+
+
+class _Entry(NamedTuple):
+    base_first: int
+    base_len: int
+    base_last: tuple  # the last base bar, all columns
+    last_start: int  # base row where the last output bucket begins
+    frame: CandleFrame
+
+
+class Resampler:
+    def __init__(self, max_entries: int = 256):
+        self._cache: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+        self.hits = 0
+        self.incremental = 0
+        self.full = 0
+
+    def resample(self, symbol: str, base: CandleFrame, interval: str, period: str) -> CandleFrame:
+        key = (symbol, interval, period)
+        step = INTERVAL_SECONDS[interval]
+        n = len(base)
+        if not n:
+            return CandleFrame([], [], [], [], [], [])
+
+        with self._lock:
+            entry = self._cache.get(key)
+        if (entry is not None and entry.base_first == int(base.time[0])
+                and n >= entry.base_len and int(base.time[entry.base_len - 1]) == entry.base_last[0]):
+            if n == entry.base_len and _row(base, n - 1) == entry.base_last:
+                self.hits += 1
+                return entry.frame
+            # Base grew or its last bar was revised: re-aggregate from the start of the last bucket
+            tail = aggregate(base[entry.last_start:], step)
+            frame = _concat(entry.frame[:-1], tail) if len(entry.frame) else tail
+            self.incremental += 1
+        else:
+            frame = aggregate(base, step)
+            self.full += 1
+
+        last_start = n
+        if len(frame):
+            last_start = int(np.searchsorted(base.time, frame.time[-1]))
+        entry = _Entry(int(base.time[0]), n, _row(base, n - 1), last_start, frame)
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            if len(self._cache) > self._max_entries:
+                self._cache.popitem(last=False)
+        return frame
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "incremental": self.incremental, "full": self.full, "size": len(self._cache)}
+
+
+resampler = Resampler()
@@ -0,0 +1,452 @@
+"""Vectorized cross-sectional screening.
+
+The universe's histories are loaded into one right-aligned 2-D array per
+field (symbols x time): row i holds symbol i's bars ending in the last
+column, with NaN (or 0 volume) padding on the left of shorter histories.
+Indicators are computed for every symbol at once along the time axis, and
+filters are boolean masks over the symbol axis.
+
+The kernels step along the time axis with whole-column numpy operations
+(one Python iteration per bar, not per symbol x bar) and mirror the float
+operations of the pandas kernels app.services.indicator_service uses for a
+single symbol, so values are bit-identical to the per-symbol path. Each
+row's recursion starts at its own first bar, so padding never leaks in.
+"""
+
+import asyncio
+import logging
+import warnings
+from collections.abc import Mapping
+from functools import cached_property
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.services.market_data import get_history
+from app.utils.candles import CandleFrame
+
+logger = logging.getLogger(__name__)
+
+MIN_BARS = 21  # technical filters need more than 20 bars, as before
+
+
+class UniverseMatrix:
+    """Right-aligned OHLCV matrices for a list of symbols, with memoized indicators."""
+
+    def __init__(self, symbols: Sequence[str], frames: Dict[str, CandleFrame]):
+        self.symbols = list(symbols)
+        n = len(self.symbols)
+        self._frames = [frames.get(s) for s in self.symbols]
+        self.lengths = np.array([len(f) if f is not None else 0 for f in self._frames], dtype=np.int64)
+        self.width = int(self.lengths.max()) if n else 0
+        self.start = self.width - self.lengths  # first real column per row
+        self.row = {s: i for i, s in enumerate(self.symbols)}
+        self._nodes: Dict[tuple, np.ndarray] = {}
+
+    def _pad(self, field: str, fill, dtype, tail: Optional[int] = None) -> np.ndarray:
+        """Right-aligned (symbols x width) matrix of a CandleFrame field.
+
+        With `tail`, only the last `tail` columns (or fewer, if narrower).
+        """
+        width = self.width if tail is None else min(self.width, tail)
+        out = np.full((len(self.symbols), width), fill, dtype=dtype)
+        counts = np.minimum(self.lengths, width)
+        present = np.flatnonzero(counts)
+        if not len(present):
+            return out
+        counts = counts[present]
+        flat = np.concatenate([getattr(self._frames[i], field)[-k:] for i, k in zip(present, counts)])
+        rows = np.repeat(present, counts)
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        cols = np.repeat(width - counts, counts) + np.arange(len(flat)) - first
+        out[rows, cols] = flat
+        return out
+
+    def _build_volume_tail(self, period: int) -> np.ndarray:
+        return self._pad("volume", 0, np.int64, tail=period)
+
+    # Field matrices are padded on first use, so a screen only builds the ones it reads
+
+    @cached_property
+    def close(self) -> np.ndarray:
+        return self._pad("close", np.nan, float)
+
+    @cached_property
+    def high(self) -> np.ndarray:
+        return self._pad("high", np.nan, float)
+
+    @cached_property
+    def low(self) -> np.ndarray:
+        return self._pad("low", np.nan, float)
+
+    @cached_property
+    def volume(self) -> np.ndarray:
+        return self._pad("volume", 0, np.int64)
+
+    @cached_property
+    def last_time(self) -> np.ndarray:
+        return np.array([int(f.time[-1]) if k else 0 for f, k in zip(self._frames, self.lengths)],
+                        dtype=np.int64)
+
+    def get(self, kind: str, *params) -> np.ndarray:
+        key = (kind, *params)
+        if key not in self._nodes:
+            self._nodes[key] = getattr(self, f"_build_{kind}")(*params)
+        return self._nodes[key]
+
+    def _build_ema(self, span: int) -> np.ndarray:
+        return ewm_mean(self.close, span)
+
+    def _build_macd(self, fast: int, slow: int) -> np.ndarray:
+        return self.get("ema", fast) - self.get("ema", slow)
+
+    def _build_macd_signal(self, fast: int, slow: int, signal: int) -> np.ndarray:
+        return ewm_mean(self.get("macd", fast, slow), signal)
+
+    def _build_wilder(self, side: str, period: int) -> np.ndarray:
+        """Wilder-smoothed gains or losses, seeded per row at its own first window."""
+        delta = np.diff(self.close, axis=1, prepend=np.nan)
+        x = np.where(delta > 0, delta, 0.0) if side == "gain" else np.where(delta < 0, -delta, 0.0)
+        n, width = x.shape
+        avg = np.full((n, width), np.nan)
+        seed = self.start + period - 1
+        rows = np.flatnonzero(seed < width)
+        if not len(rows):
+            return avg
+        window = x[rows[:, None], self.start[rows, None] + np.arange(period)]
+        avg[rows, seed[rows]] = window_mean(window)
+        for j in range(int(seed[rows].min()) + 1, width):
+            avg[:, j] = np.where(seed < j, (avg[:, j - 1] * (period - 1) + x[:, j]) / period, avg[:, j])
+        return avg
+
+    def _build_rsi(self, period: int) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = self.get("wilder", "gain", period) / self.get("wilder", "loss", period)
+            return 100 - (100 / (1 + rs))
+
+    def _build_true_range(self) -> np.ndarray:
+        prev_close = np.concatenate((np.full((len(self.close), 1), np.nan), self.close[:, :-1]), axis=1)
+        with np.errstate(invalid="ignore"):
+            return np.fmax(self.high - self.low,
+                           np.fmax(np.abs(self.high - prev_close), np.abs(self.low - prev_close)))
+
+    def _column(self, values: np.ndarray, back: int = 1) -> np.ndarray:
+        """Column `back` bars from the end (NaN if the matrix is narrower)."""
+        if self.width < back:
+            return np.full(len(self.symbols), np.nan)
+        return values[:, -back].astype(float)
+
+    def _last_mean(self, values: np.ndarray, period: int) -> np.ndarray:
+        """Mean of each row's last `period` values; NaN if the row is shorter."""
+        if self.width < period:
+            return np.full(len(self.symbols), np.nan)
+        out = values[:, -period:].sum(axis=1) / period
+        return np.where(self.lengths >= period, out, np.nan)
+
+    def latest(self) -> "LatestColumns":
+        """Latest indicator values per symbol, as columns aligned with `symbols`.
+
+        These are the inputs of ScreenerEngine.technicals and the columns of
+        the indicator snapshot table. Windowed values need a full window.
+        Each column is computed on first access, so a screen only pays for
+        the indicators its filters read.
+        """
+        return LatestColumns(self)
+
+    def _build_latest(self, name: str) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN rows
+            return getattr(self, f"_latest_{name}")()
+
+    def _nan(self) -> np.ndarray:
+        return np.full(len(self.symbols), np.nan)
+
+    def _latest_bars(self) -> np.ndarray:
+        return self.lengths
+
+    def _latest_close(self) -> np.ndarray:
+        return self._column(self.close)
+
+    def _latest_rsi(self) -> np.ndarray:
+        return last_valid(self.get("rsi", 14))
+
+    def _latest_macd(self) -> np.ndarray:
+        return self._column(self.get("macd", 12, 26))
+
+    def _latest_macd_prev(self) -> np.ndarray:
+        return self._column(self.get("macd", 12, 26), 2)
+
+    def _latest_macd_signal(self) -> np.ndarray:
+        return self._column(self.get("macd_signal", 12, 26, 9))
+
+    def _latest_macd_signal_prev(self) -> np.ndarray:
+        return self._column(self.get("macd_signal", 12, 26, 9), 2)
+
+    def _latest_sma20(self) -> np.ndarray:
+        return self._last_mean(self.close, 20)
+
+    def _latest_sma50(self) -> np.ndarray:
+        return self._last_mean(self.close, 50)
+
+    def _latest_sma200(self) -> np.ndarray:
+        return self._last_mean(self.close, 200)
+
+    def _latest_volume(self) -> np.ndarray:
+        return self._column(self.get("volume_tail", 20))
+
+    def _latest_avg_volume_20(self) -> np.ndarray:
+        return self._last_mean(self.get("volume_tail", 20), 20)
+
+    def _latest_volume_ratio(self) -> np.ndarray:
+        return self.get("volume_ratio", 20)
+
+    def _latest_atr(self) -> np.ndarray:
+        if self.width <= 1:
+            return self._nan()
+        return self._last_mean(self.get("true_range")[:, 1:], 14)
+
+    def _latest_high_52w(self) -> np.ndarray:
+        year = min(self.width, 252)
+        return np.nanmax(self.high[:, -year:], axis=1) if year else self._nan()
+
+    def _latest_low_52w(self) -> np.ndarray:
+        year = min(self.width, 252)
+        return np.nanmin(self.low[:, -year:], axis=1) if year else self._nan()
+
+    def _latest_pct_from_52w_high(self) -> np.ndarray:
+        high_52w = self.get("latest", "high_52w")
+        return (high_52w - self.get("latest", "close")) / high_52w * 100
+
+    def _latest_pct_from_52w_low(self) -> np.ndarray:
+        low_52w = self.get("latest", "low_52w")
+        return (self.get("latest", "close") - low_52w) / low_52w * 100
+
+    def _build_volume_ratio(self, period: int) -> np.ndarray:
+        """Last bar's volume over the mean volume of the last `period` bars (1-D)."""
+        volume = self.get("volume_tail", period)
+        avg = volume.sum(axis=1) / period
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = volume[:, -1] / avg
+        return np.where(avg > 0, ratio, 0.0)
+
+
+class LatestColumns(Mapping):
+    """Read-only mapping of UniverseMatrix.latest() columns, built on access."""
+
+    NAMES = (
+        "bars", "close", "rsi", "macd", "macd_prev", "macd_signal", "macd_signal_prev",
+        "sma20", "sma50", "sma200", "volume", "avg_volume_20", "volume_ratio", "atr",
+        "high_52w", "low_52w", "pct_from_52w_high", "pct_from_52w_low",
+    )
+
+    def __init__(self, matrix: UniverseMatrix):
+        self._matrix = matrix
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name not in self.NAMES:
+            raise KeyError(name)
+        return self._matrix.get("latest", name)
+
+    def __iter__(self):
+        return iter(self.NAMES)
+
+    def __len__(self) -> int:
+        return len(self.NAMES)
+
+
+def ewm_mean(values: np.ndarray, span: int) -> np.ndarray:
+    """Row-wise `Series.ewm(span=span, adjust=False).mean()`.
+
+    Same recurrence as pandas' kernel: a row starts at its first non-NaN
+    value, then w = (f * w + a * x) / (f + a), skipped when x == w.
+    """
+    alpha = 1.0 / (1.0 + float((span - 1) / 2))
+    f = 1.0 - alpha
+    denom = f + alpha
+    out = np.empty_like(values, dtype=float)
+    if not values.shape[1]:
+        return out
+    w = values[:, 0].astype(float)
+    out[:, 0] = w
+    for j in range(1, values.shape[1]):
+        x = values[:, j]
+        stepped = np.where(w != x, (f * w + alpha * x) / denom, w)
+        w = np.where(np.isnan(w), x, np.where(np.isnan(x), w, stepped))
+        out[:, j] = w
+    return out
+
+
+def window_mean(window: np.ndarray) -> np.ndarray:
+    """Row means as pandas' rolling mean yields for a first full window.
+
+    pandas adds values with Kahan compensation and returns the repeated
+    value itself when the whole window is one value; both are mirrored.
+    """
+    total = np.zeros(len(window))
+    comp = np.zeros(len(window))
+    for k in range(window.shape[1]):
+        y = window[:, k] - comp
+        t = total + y
+        comp = (t - total) - y
+        total = t
+    mean = total / window.shape[1]
+    same = (window == window[:, :1]).all(axis=1)
+    return np.where(same, window[:, 0], mean)
+
+
+def last_valid(values: np.ndarray) -> np.ndarray:
+    """Last non-NaN value of each row (NaN if none)."""
+    if not values.shape[1]:
+        return np.full(values.shape[0], np.nan)
+    valid = ~np.isnan(values)
+    idx = values.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    out = values[np.arange(len(values)), idx]
+    out[~valid.any(axis=1)] = np.nan
+    return out
+
+
+def _rounded(values: np.ndarray) -> List[Optional[float]]:
+    """Python round(v, 2) per value, None for NaN (the indicator point shape)."""
+    return [None if v != v else round(v, 2) for v in values.tolist()]
+
+
+class ScreenerEngine:
+    """Loads universe matrices and evaluates screens over them.
+
+    The last matrix per (symbols, period) is kept; it is reused while every
+    symbol's history is the same cached frame, so repeated screens skip
+    both loading and indicator computation.
+    """
+
+    def __init__(self, period: str = "3mo", interval: str = "1d"):
+        self.period = period
+        self.interval = interval
+        self._matrices: Dict[tuple, tuple] = {}
+
+    async def load(self, symbols: Sequence[str], concurrency: Optional[int] = None) -> UniverseMatrix:
+        sem = asyncio.Semaphore(concurrency or settings.SCAN_CONCURRENCY)
+
+        async def fetch(symbol: str):
+            async with sem:
+                try:
+                    return await get_history(symbol, period=self.period, interval=self.interval)
+                except Exception as e:
+                    logger.warning(f"Screener history error for {symbol}: {e}")
+                    return None
+
+        histories = await asyncio.gather(*(fetch(s) for s in symbols))
+        frames = dict(zip(symbols, histories))
+        key = tuple(symbols)
+        signature = tuple(id(f) for f in histories)
+        cached = self._matrices.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[2]
+        matrix = UniverseMatrix(symbols, frames)
+        # Frames are held so their ids stay unique while the signature is cached
+        self._matrices = {key: (signature, histories, matrix)}
+        return matrix
+
+    def technicals(self, columns: Dict[str, np.ndarray], min_rsi: Optional[float] = None,
+                   max_rsi: Optional[float] = None, macd_cross: Optional[str] = None,
+                   min_volume_ratio: Optional[float] = None, near_52w_high_pct: Optional[float] = None,
+                   near_52w_low_pct: Optional[float] = None) -> Dict[str, object]:
+        """Evaluate the technical filters over `latest()`-shaped columns.
+
+        Returns "keep" (bool mask), "passed" (per-symbol filter labels) and
+        the per-symbol "rsi"/"volume_ratio" values to report (None where not
+        computed), with the same semantics as the old per-symbol loop:
+        symbols with too little history skip technical filters, and an
+        undefined MACD neither passes nor fails the cross filter.
+        """
+        n = len(columns["bars"])
+        keep = np.ones(n, dtype=bool)
+        has_bars = columns["bars"] >= MIN_BARS
+        passed = [[] for _ in range(n)]
+        rsi_out: List[Optional[float]] = [None] * n
+        ratio_out: List[Optional[float]] = [None] * n
+
+        if min_rsi is not None or max_rsi is not None:
+            rsi = np.array(_rounded(columns["rsi"]), dtype=float)
+            defined = has_bars & ~np.isnan(rsi)
+            ok = defined.copy()
+            if min_rsi:
+                ok &= ~(rsi < min_rsi)
+            if max_rsi:
+                ok &= ~(rsi > max_rsi)
+            keep &= ~(defined & ~ok)
+            for i in np.flatnonzero(defined):
+                rsi_out[i] = float(rsi[i])
+            for i in np.flatnonzero(ok):
+                passed[i].append("RSI")
+
+        if macd_cross in ("bullish", "bearish"):
+            m1, m2, s1, s2 = (np.array(_rounded(columns[k]), dtype=float)
+                              for k in ("macd", "macd_prev", "macd_signal", "macd_signal_prev"))
+            defined = has_bars & ~(np.isnan(m1) | np.isnan(m2) | np.isnan(s1) | np.isnan(s2))
+            if macd_cross == "bullish":
+                cross, label = (m2 < s2) & (m1 > s1), "MACD Bullish Cross"
+            else:
+                cross, label = (m2 > s2) & (m1 < s1), "MACD Bearish Cross"
+            keep &= ~(defined & ~cross)
+            for i in np.flatnonzero(defined & cross & keep):
+                passed[i].append(label)
+
+        if min_volume_ratio:
+            ratio = columns["volume_ratio"]
+            live = has_bars & keep
+            rows = np.flatnonzero(live)
+            for i, value in zip(rows.tolist(), ratio[rows].tolist()):
+                ratio_out[i] = round(value, 2)
+            ok = live & ~(ratio < min_volume_ratio)
+            keep &= ~(live & ~ok)
+            for i in np.flatnonzero(ok):
+                passed[i].append("High Volume")
+
+        for limit, key, label in ((near_52w_high_pct, "pct_from_52w_high", "Near 52W High"),
+                                  (near_52w_low_pct, "pct_from_52w_low", "Near 52W Low")):
+            if limit is None:
+                continue
+            distance = columns[key]
+            defined = has_bars & ~np.isnan(distance)
+            with np.errstate(invalid="ignore"):
+                ok = defined & (distance <= limit)
+            keep &= ~(defined & ~ok)
+            for i in np.flatnonzero(ok & keep):
+                passed[i].append(label)
+
+        return {"keep": keep, "passed": passed, "rsi": rsi_out, "volume_ratio": ratio_out}
+
+    def fundamentals(self, columns: Dict[str, np.ndarray], min_pe: Optional[float] = None,
+                     max_pe: Optional[float] = None, min_market_cap: Optional[float] = None,
+                     max_market_cap: Optional[float] = None, min_roe: Optional[float] = None,
+                     max_debt_to_equity: Optional[float] = None) -> Dict[str, object]:
+        """Evaluate fundamental filters over app.services.fundamentals columns.
+
+        Bounds are inclusive and in the columns' units (market cap in
+        crores, ROE in percent). A symbol with no value for a filtered
+        field fails that filter. Returns "keep" and "passed" as technicals().
+        """
+        n = len(columns["pe"])
+        keep = np.ones(n, dtype=bool)
+        checks = []
+        for label, key, low, high in (("PE", "pe", min_pe, max_pe),
+                                      ("Market Cap", "market_cap", min_market_cap, max_market_cap),
+                                      ("ROE", "roe", min_roe, None),
+                                      ("Debt/Equity", "debt_to_equity", None, max_debt_to_equity)):
+            if low is None and high is None:
+                continue
+            values = columns[key]
+            ok = ~np.isnan(values)
+            with np.errstate(invalid="ignore"):
+                if low is not None:
+                    ok &= values >= low
+                if high is not None:
+                    ok &= values <= high
+            keep &= ok
+            checks.append(label)
+        passed = [list(checks) if k else [] for k in keep.tolist()]
+        return {"keep": keep, "passed": passed}
+
+
+screener_engine = ScreenerEngine()
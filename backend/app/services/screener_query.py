@@ -0,0 +1,325 @@
+"""Screener query language, compiled to vectorized predicates.
+
+A query is a boolean expression over per-symbol fields, for example
+
+    rsi14 < 30 and close > sma200 and vol / avg_vol20 > 2
+
+Grammar (lowest precedence first):
+
+    or_expr    := and_expr ("or" and_expr)*
+    and_expr   := not_expr ("and" not_expr)*
+    not_expr   := "not" not_expr | comparison
+    comparison := sum (("<" | "<=" | ">" | ">=" | "==" | "!=") sum)?
+    sum        := product (("+" | "-") product)*
+    product    := unary (("*" | "/") unary)*
+    unary      := "-" unary | atom
+    atom       := NUMBER | FIELD | FUNC "(" sum ("," sum)* ")" | "(" or_expr ")"
+
+A query is parsed once into a tree of closures that each evaluate to a
+numpy array over the symbol axis, so a screen costs a handful of column
+operations however many symbols it covers. Compiled plans are cached by
+query string.
+
+Fields come from the indicator snapshot table
+(app.services.indicator_snapshot), the fundamentals table
+(app.services.fundamentals) or the live quote. Missing values are NaN and
+propagate through arithmetic and functions, and any comparison with NaN
+is false, so a symbol without enough history never matches `rsi < 30`
+(but does match `not rsi < 30`). Names and keywords are case-insensitive.
+"""
+
+import re
+from functools import lru_cache, reduce
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+MAX_QUERY_LENGTH = 1000
+
+# Field name -> (source, column). "snapshot" columns are IndicatorTable
+# columns, "fundamentals" columns come from app.services.fundamentals
+# (market cap in crores, ROE in percent) and "quote" columns are built
+# from the live quotes.
+FIELDS: Dict[str, Tuple[str, str]] = {
+    "bars": ("snapshot", "bars"),
+    "close": ("snapshot", "close"),
+    "rsi": ("snapshot", "rsi"),
+    "macd": ("snapshot", "macd"),
+    "macd_prev": ("snapshot", "macd_prev"),
+    "macd_signal": ("snapshot", "macd_signal"),
+    "macd_signal_prev": ("snapshot", "macd_signal_prev"),
+    "sma20": ("snapshot", "sma20"),
+    "sma50": ("snapshot", "sma50"),
+    "sma200": ("snapshot", "sma200"),
+    "volume": ("snapshot", "volume"),
+    "avg_volume_20": ("snapshot", "avg_volume_20"),
+    "volume_ratio": ("snapshot", "volume_ratio"),
+    "atr": ("snapshot", "atr"),
+    "high_52w": ("snapshot", "high_52w"),
+    "low_52w": ("snapshot", "low_52w"),
+    "pct_from_52w_high": ("snapshot", "pct_from_52w_high"),
+    "pct_from_52w_low": ("snapshot", "pct_from_52w_low"),
+    "pe": ("fundamentals", "pe"),
+    "pb": ("fundamentals", "pb"),
+    "market_cap": ("fundamentals", "market_cap"),
+    "roe": ("fundamentals", "roe"),
+    "debt_to_equity": ("fundamentals", "debt_to_equity"),
+    "eps": ("fundamentals", "eps"),
+    "price": ("quote", "last_price"),
+    "change": ("quote", "day_change"),
+    "change_pct": ("quote", "day_change_pct"),
+    "day_volume": ("quote", "volume"),
+}
+
+ALIASES = {
+    "rsi14": "rsi",
+    "signal": "macd_signal",
+    "vol": "volume",
+    "avg_vol20": "avg_volume_20",
+    "atr14": "atr",
+    "last_price": "price",
+    "pe_ratio": "pe",
+    "pb_ratio": "pb",
+    "mcap": "market_cap",
+    "de": "debt_to_equity",
+}
+
+FUNCTIONS: Dict[str, Tuple[int, Callable]] = {
+    "abs": (1, np.abs),
+    "min": (2, np.minimum),
+    "max": (2, np.maximum),
+}
+
+_KEYWORDS = {"and", "or", "not"}
+_COMPARE = {
+    "<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+    "==": np.equal, "!=": np.not_equal,
+}
+_ARITH = {"+": np.add, "-": np.subtract, "*": np.multiply, "/": np.divide}
+
+_TOKEN = re.compile(
+    r"\s*(?:(?P<num>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+)"
+    r"|(?P<name>[A-Za-z_][A-Za-z0-9_]*)"
+    r"|(?P<op><=|>=|==|!=|[<>+\-*/(),]))"
+)
+
+Columns = Dict[str, np.ndarray]
+Node = Callable[[Columns], np.ndarray]
+
+
+class QueryError(ValueError):
+    """A query that doesn't parse or type-check; `pos` is the offending offset."""
+
+    def __init__(self, message: str, pos: int):
+        super().__init__(f"{message} at position {pos}")
+        self.pos = pos
+
+
+class Token(NamedTuple):
+    kind: str  # "num", "name", "op" or "end"
+    text: str
+    pos: int
+
+
+def tokenize(query: str) -> List[Token]:
+    tokens = []
+    pos = 0
+    end = len(query.rstrip())
+    while pos < end:
+        m = _TOKEN.match(query, pos)
+        if m is None or m.end() == pos:
+            pos += len(query[pos:]) - len(query[pos:].lstrip())
+            raise QueryError(f"Unexpected character {query[pos]!r}", pos)
+        kind = m.lastgroup
+        text = m.group(kind)
+        if kind == "name" and text.lower() in _KEYWORDS:
+            text = text.lower()
+        tokens.append(Token(kind, text, m.start(kind)))
+        pos = m.end()
+    tokens.append(Token("end", "", end))
+    return tokens
+
+
+class Plan:
+    """A compiled query: `evaluate(columns, n)` returns the boolean match mask."""
+
+    def __init__(self, query: str, root: Node, fields: Tuple[str, ...]):
+        self.query = query
+        self._root = root
+        self.fields = fields
+        self.sources = {FIELDS[f][0] for f in fields}
+
+    def evaluate(self, columns: Columns, n: int) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = self._root(columns)
+        return np.broadcast_to(np.asarray(result, dtype=bool), (n,)).copy()
+
+
+class _Compiler:
+    """Recursive-descent parser that emits closures instead of an AST."""
+
+    def __init__(self, query: str):
+        self.tokens = tokenize(query)
+        self.i = 0
+        self.fields: Dict[str, None] = {}  # insertion-ordered set
+
+    # --- token helpers ---
+
+    @property
+    def tok(self) -> Token:
+        return self.tokens[self.i]
+
+    def accept(self, *texts: str) -> bool:
+        if self.tok.kind in ("op", "name") and self.tok.text in texts:
+            self.i += 1
+            return True
+        return False
+
+    def expect(self, text: str):
+        if not self.accept(text):
+            raise QueryError(f"Expected {text!r}", self.tok.pos)
+
+    # --- grammar; each rule returns (closure, kind) with kind "num" or "bool" ---
+
+    def compile(self) -> Node:
+        pos = self.tok.pos
+        node, kind = self.or_expr()
+        if self.tok.kind != "end":
+            raise QueryError(f"Unexpected {self.tok.text!r}", self.tok.pos)
+        if kind != "bool":
+            raise QueryError("Query must be a condition, e.g. rsi < 30", pos)
+        return node
+
+    def _boolean(self, item, pos: int) -> Node:
+        node, kind = item
+        if kind != "bool":
+            raise QueryError("Expected a condition", pos)
+        return node
+
+    def _numeric(self, item, pos: int) -> Node:
+        node, kind = item
+        if kind != "num":
+            raise QueryError("Expected a value, not a condition", pos)
+        return node
+
+    def or_expr(self):
+        pos = self.tok.pos
+        left = self.and_expr()
+        if self.tok.text != "or":
+            return left
+        parts = [self._boolean(left, pos)]
+        while self.accept("or"):
+            pos = self.tok.pos
+            parts.append(self._boolean(self.and_expr(), pos))
+        return (lambda c: reduce(np.logical_or, [p(c) for p in parts])), "bool"
+
+    def and_expr(self):
+        pos = self.tok.pos
+        left = self.not_expr()
+        if self.tok.text != "and":
+            return left
+        parts = [self._boolean(left, pos)]
+        while self.accept("and"):
+            pos = self.tok.pos
+            parts.append(self._boolean(self.not_expr(), pos))
+        return (lambda c: reduce(np.logical_and, [p(c) for p in parts])), "bool"
+
+    def not_expr(self):
+        if self.accept("not"):
+            pos = self.tok.pos
+            inner = self._boolean(self.not_expr(), pos)
+            return (lambda c: np.logical_not(inner(c))), "bool"
+        return self.comparison()
+
+    def comparison(self):
+        pos = self.tok.pos
+        left = self.sum()
+        op = self.tok.text
+        if self.tok.kind != "op" or op not in _COMPARE:
+            return left
+        self.i += 1
+        rpos = self.tok.pos
+        a = self._numeric(left, pos)
+        b = self._numeric(self.sum(), rpos)
+        fn = _COMPARE[op]
+        return (lambda c: fn(a(c), b(c))), "bool"
+
+    def _binary(self, operand, ops: str):
+        pos = self.tok.pos
+        left = operand()
+        while self.tok.kind == "op" and self.tok.text in ops:
+            fn = _ARITH[self.tok.text]
+            self.i += 1
+            rpos = self.tok.pos
+            a = self._numeric(left, pos)
+            b = self._numeric(operand(), rpos)
+            left = (lambda c, a=a, b=b, fn=fn: fn(a(c), b(c))), "num"
+        return left
+
+    def sum(self):
+        return self._binary(self.product, "+-")
+
+    def product(self):
+        return self._binary(self.unary, "*/")
+
+    def unary(self):
+        if self.accept("-"):
+            pos = self.tok.pos
+            inner = self._numeric(self.unary(), pos)
+            return (lambda c: np.negative(inner(c))), "num"
+        return self.atom()
+
+    def atom(self):
+        tok = self.tok
+        if tok.kind == "num":
+            self.i += 1
+            value = float(tok.text)
+            return (lambda c: value), "num"
+        if self.accept("("):
+            inner = self.or_expr()
+            self.expect(")")
+            return inner
+        if tok.kind == "name" and tok.text not in _KEYWORDS:
+            self.i += 1
+            name = tok.text.lower()
+            if name in FUNCTIONS:
+                return self.call(name, tok.pos)
+            field = ALIASES.get(name, name)
+            if field not in FIELDS:
+                raise QueryError(f"Unknown field {tok.text!r}", tok.pos)
+            self.fields[field] = None
+            return (lambda c: c[field]), "num"
+        if tok.kind == "end":
+            raise QueryError("Unexpected end of query", tok.pos)
+        raise QueryError(f"Unexpected {tok.text!r}", tok.pos)
+
+    def call(self, name: str, pos: int):
+        arity, fn = FUNCTIONS[name]
+        self.expect("(")
+        args = []
+        while True:
+            apos = self.tok.pos
+            args.append(self._numeric(self.sum(), apos))
+            if not self.accept(","):
+                break
+        self.expect(")")
+        if len(args) != arity:
+            raise QueryError(f"{name}() takes {arity} argument{'s' if arity > 1 else ''}", pos)
+        if arity == 1:
+            a, = args
+            return (lambda c: fn(a(c))), "num"
+        a, b = args
+        return (lambda c: fn(a(c), b(c))), "num"
+
+
+@lru_cache(maxsize=256)
+def compile_query(query: str) -> Plan:
+    """Parse and compile `query`; raises QueryError. Plans are cached by query string."""
+    if len(query) > MAX_QUERY_LENGTH:
+        raise QueryError(f"Query longer than {MAX_QUERY_LENGTH} characters", MAX_QUERY_LENGTH)
+    compiler = _Compiler(query)
+    try:
+        root = compiler.compile()
+    except RecursionError:
+        raise QueryError("Query nested too deeply", 0) from None
+    return Plan(query, root, tuple(compiler.fields))
@@ -1,8 +1,15 @@
 """Stock screener service with fundamental and technical filters."""
 
-from typing import List, Dict, Optional
-from app.services.market_data import get_batch_quotes, get_stock_info, get_history
-from app.services.indicator_service import calculate_rsi, calculate_macd, calculate_sma
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.services.market_data import get_stock_info
+from app.services.market_snapshot import get_universe_quotes
+from app.services.screener_engine import screener_engine
+from app.services.indicator_snapshot import indicator_snapshot
+from app.services.fundamentals import fundamentals
+from app.services.screener_query import FIELDS, compile_query
 from app.utils.nse_symbols import NIFTY_50_SYMBOLS
 import logging
 import asyncio
@@ -63,88 +70,120 @@ async def run_screen(
     near_52w_low_pct: Optional[float] = None,
     min_roe: Optional[float] = None,
     max_debt_to_equity: Optional[float] = None,
-) -> List[Dict]:
-    """Run screener with given filters."""
+) -> Tuple[List[Dict], int]:
+    """Run screener with given filters; returns the matches and the market snapshot version.
+
+    Filters are evaluated for the whole universe at once by
+    app.services.screener_engine: technical ones over the precomputed
+    indicator snapshot (app.services.indicator_snapshot), fundamental ones
+    over app.services.fundamentals (market cap in crores, ROE in percent).
+    """
     if not symbols:
         symbols = list(NIFTY_50_SYMBOLS.keys())
 
+    quotes, version = await get_universe_quotes(symbols)
+    quoted = [s for s in symbols if quotes.get(s)]
+
+    # Technical filters, answered from the indicator snapshot table
+    need_technicals = any([min_rsi, max_rsi, macd_cross, min_volume_ratio]) or \
+        near_52w_high_pct is not None or near_52w_low_pct is not None
+    technicals = None
+    if need_technicals and quoted:
+        columns = await indicator_snapshot.columns_for(quoted)
+        technicals = screener_engine.technicals(
+            columns, min_rsi=min_rsi, max_rsi=max_rsi,
+            macd_cross=macd_cross, min_volume_ratio=min_volume_ratio,
+            near_52w_high_pct=near_52w_high_pct, near_52w_low_pct=near_52w_low_pct,
+        )
+
+    fundamental_filters = {
+        "min_pe": min_pe, "max_pe": max_pe,
+        "min_market_cap": min_market_cap, "max_market_cap": max_market_cap,
+        "min_roe": min_roe, "max_debt_to_equity": max_debt_to_equity,
+    }
+    fundamental = None
+    funda_columns = None
+    if any(v is not None for v in fundamental_filters.values()) and quoted:
+        funda_columns = await fundamentals.columns_for(quoted)
+        fundamental = screener_engine.fundamentals(funda_columns, **fundamental_filters)
+
     results = []
-    quotes = await get_batch_quotes(symbols)
-
-    for symbol in symbols:
-        try:
-            quote = quotes.get(symbol)
-            if not quote:
-                continue
-
-            stock_data = {
-                "symbol": symbol,
-                "name": quote.get("name", symbol),
-                "last_price": quote.get("last_price", 0),
-                "day_change": quote.get("day_change", 0),
-                "day_change_pct": quote.get("day_change_pct", 0),
-                "volume": quote.get("volume", 0),
-                "passed_filters": [],
-            }
-
-            # Technical filters that need historical data
-            need_technicals = any([min_rsi, max_rsi, macd_cross, min_volume_ratio])
-
-            if need_technicals:
-                candles = await get_history(symbol, period="3mo", interval="1d")
-                if candles and len(candles) > 20:
-                    # RSI filter
-                    if min_rsi is not None or max_rsi is not None:
-                        rsi_data = calculate_rsi(candles)
-                        current_rsi = None
-                        for r in reversed(rsi_data):
-                            if r["value"] is not None:
-                                current_rsi = r["value"]
-                                break
-                        if current_rsi is not None:
-                            stock_data["rsi"] = round(current_rsi, 2)
-                            if min_rsi and current_rsi < min_rsi:
-                                continue
-                            if max_rsi and current_rsi > max_rsi:
-                                continue
-                            stock_data["passed_filters"].append("RSI")
-
-                    # MACD filter
-                    if macd_cross:
-                        macd_data = calculate_macd(candles)
-                        macd_vals = macd_data["macd"]
-                        signal_vals = macd_data["signal"]
-                        if len(macd_vals) >= 2:
-                            m1 = macd_vals[-1]["value"]
-                            m2 = macd_vals[-2]["value"]
-                            s1 = signal_vals[-1]["value"]
-                            s2 = signal_vals[-2]["value"]
-                            if m1 is not None and m2 is not None and s1 is not None and s2 is not None:
-                                if macd_cross == "bullish" and m2 < s2 and m1 > s1:
-                                    stock_data["passed_filters"].append("MACD Bullish Cross")
-                                elif macd_cross == "bearish" and m2 > s2 and m1 < s1:
-                                    stock_data["passed_filters"].append("MACD Bearish Cross")
-                                elif macd_cross == "bullish" and not (m2 < s2 and m1 > s1):
-                                    continue
-                                elif macd_cross == "bearish" and not (m2 > s2 and m1 < s1):
-                                    continue
-
-                    # Volume filter
-                    if min_volume_ratio:
-                        volumes = [c["volume"] for c in candles[-20:]]
-                        avg_vol = sum(volumes) / len(volumes) if volumes else 0
-                        current_vol = candles[-1]["volume"]
-                        ratio = current_vol / avg_vol if avg_vol > 0 else 0
-                        stock_data["volume_ratio"] = round(ratio, 2)
-                        if ratio < min_volume_ratio:
-                            continue
-                        stock_data["passed_filters"].append("High Volume")
-
-            results.append(stock_data)
-
-        except Exception as e:
-            logger.warning(f"Screener error for {symbol}: {e}")
+    for i, symbol in enumerate(quoted):
+        if technicals is not None and not technicals["keep"][i]:
+            continue
+        if fundamental is not None and not fundamental["keep"][i]:
             continue
+        quote = quotes[symbol]
+        stock_data = {
+            "symbol": symbol,
+            "name": quote.get("name", symbol),
+            "last_price": quote.get("last_price", 0),
+            "day_change": quote.get("day_change", 0),
+            "day_change_pct": quote.get("day_change_pct", 0),
+            "volume": quote.get("volume", 0),
+            "passed_filters": (fundamental["passed"][i] if fundamental is not None else [])
+            + (technicals["passed"][i] if technicals is not None else []),
+        }
+        if fundamental is not None:
+            pe, market_cap = funda_columns["pe"][i].item(), funda_columns["market_cap"][i].item()
+            stock_data["pe_ratio"] = None if pe != pe else round(pe, 2)
+            stock_data["market_cap"] = None if market_cap != market_cap else round(market_cap, 2)
+        if technicals is not None:
+            if technicals["rsi"][i] is not None:
+                stock_data["rsi"] = technicals["rsi"][i]
+            if technicals["volume_ratio"][i] is not None:
+                stock_data["volume_ratio"] = technicals["volume_ratio"][i]
+        results.append(stock_data)
+
+    results.sort(key=lambda x: abs(x.get("day_change_pct", 0)), reverse=True)
+    return results, version
+
+
+async def run_query(query: str, symbols: Optional[List[str]] = None) -> Tuple[List[Dict], int]:
+    """Run a screener query (app.services.screener_query); raises QueryError.
+
+    Each match carries the values of the fields the query references.
+    Returns the matches and the market snapshot version.
+    """
+    plan = compile_query(query)
+    if not symbols:
+        symbols = list(NIFTY_50_SYMBOLS.keys())
+
+    quotes, version = await get_universe_quotes(symbols)
+    quoted = [s for s in symbols if quotes.get(s)]
+    if not quoted:
+        return [], version
+
+    columns: Dict[str, np.ndarray] = {}
+    snapshot = await indicator_snapshot.columns_for(quoted) if "snapshot" in plan.sources else {}
+    funda = await fundamentals.columns_for(quoted) if "fundamentals" in plan.sources else {}
+    for field in plan.fields:
+        source, key = FIELDS[field]
+        if source == "snapshot":
+            columns[field] = snapshot[key].astype(float)
+        elif source == "fundamentals":
+            columns[field] = funda[key]
+        else:
+            columns[field] = np.array([quotes[s].get(key) for s in quoted], dtype=float)
+    keep = plan.evaluate(columns, len(quoted))
+
+    results = []
+    for i in np.flatnonzero(keep):
+        symbol = quoted[i]
+        quote = quotes[symbol]
+        values = {}
+        for field in plan.fields:
+            v = columns[field][i].item()
+            values[field] = None if v != v else round(v, 2)
+        results.append({
+            "symbol": symbol,
+            "name": quote.get("name", symbol),
+            "last_price": quote.get("last_price", 0),
+            "day_change": quote.get("day_change", 0),
+            "day_change_pct": quote.get("day_change_pct", 0),
+            "volume": quote.get("volume", 0),
+            "values": values,
+        })
 
     results.sort(key=lambda x: abs(x.get("day_change_pct", 0)), reverse=True)
-    return results
+    return results, version
@@ -0,0 +1,132 @@
+"""Live OHLCV bars built from polled quotes.
+
+The price poller feeds every quote here. For each (symbol, interval) a
+forming bar tracks open/high/low/close and the volume traded since the bar
+opened (the delta of the quote's cumulative day volume). When a quote
+lands in a new interval bucket the forming bar is closed and a new one
+opened. Each quote yields `candle` events for the WebSocket, and closed
+bars are written to the history store as provisional rows that the next
+upstream fetch overwrites.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Any, Iterable
+
+import numpy as np
+
+from app.config import settings
+from app.utils.candles import CandleFrame
+from app.utils.timeframes import bar_start, ist_day
+
+logger = logging.getLogger(__name__)
+
+
+class TickAggregator:
+    def __init__(self, intervals: Iterable[str]):
+        self.intervals = list(intervals)
+        self._bars: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # symbol -> (IST day, cumulative day volume) of the last quote
+        self._last_volume: Dict[str, tuple] = {}
+
+    def _volume_delta(self, symbol: str, day: int, cumulative: int) -> int:
+        last = self._last_volume.get(symbol)
+        self._last_volume[symbol] = (day, cumulative)
+        if last is None:
+            # Volume before the first quote we saw can't be placed in a bar
+            return 0
+        last_day, last_cumulative = last
+        if day != last_day:
+            return cumulative
+        return max(cumulative - last_cumulative, 0)
+
+    def on_quote(self, symbol: str, quote: Dict[str, Any], now: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Fold a quote into every interval; return the resulting candle events.
+
+        An event is {"interval", "closed", "bar"}; a bar that closes is
+        reported once with closed=True before the new bar's first update.
+        """
+        price = quote.get("last_price")
+        if not price:
+            return []
+        now = int(now if now is not None else time.time())
+        delta = self._volume_delta(symbol, ist_day(now), int(quote.get("volume") or 0))
+        bars = self._bars.setdefault(symbol, {})
+
+        events = []
+        for interval in self.intervals:
+            start = bar_start(now, interval)
+            if start is None:
+                continue
+            bar = bars.get(interval)
+            if bar is not None and bar["time"] == start:
+                bar["high"] = max(bar["high"], price)
+                bar["low"] = min(bar["low"], price)
+                bar["close"] = price
+                bar["volume"] += delta
+            elif bar is None or start > bar["time"]:
+                if bar is not None:
+                    events.append({"interval": interval, "closed": True, "bar": dict(bar)})
+                bar = {"time": start, "open": price, "high": price, "low": price,
+                       "close": price, "volume": delta}
+                bars[interval] = bar
+            else:
+                continue  # out-of-order quote
+            events.append({"interval": interval, "closed": False, "bar": dict(bar)})
+        return events
+
+    def forming(self, symbol: str, interval: str) -> Optional[Dict[str, Any]]:
+        bar = self._bars.get(symbol, {}).get(interval)
+        return dict(bar) if bar else None
+
+    def merge(self, symbol: str, interval: str, candles: CandleFrame) -> CandleFrame:
+        """Overlay the live forming bar on a history frame.
+
+        A newer bar is appended. For the same bucket, the history's open and
+        volume are kept (it saw the whole bar) and high/low/close are
+        extended with the live prices.
+        """
+        bar = self.forming(symbol, interval)
+        if bar is None or not len(candles) or bar["time"] < int(candles.time[-1]):
+            return candles
+        cols = {c: getattr(candles, c) for c in CandleFrame.COLUMNS}
+        if bar["time"] == int(candles.time[-1]):
+            cols = {c: v.copy() for c, v in cols.items()}
+            cols["high"][-1] = max(cols["high"][-1], bar["high"])
+            cols["low"][-1] = min(cols["low"][-1], bar["low"])
+            cols["close"][-1] = bar["close"]
+        else:
+            cols = {c: np.append(v, bar[c]) for c, v in cols.items()}
+        return CandleFrame(*(cols[c] for c in CandleFrame.COLUMNS))
+
+    def drop(self, symbols: Iterable[str]):
+        """Forget bars for symbols nobody watches any more."""
+        for symbol in symbols:
+            self._bars.pop(symbol, None)
+            self._last_volume.pop(symbol, None)
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._bars)
+
+
+tick_aggregator = TickAggregator(settings.live_candle_intervals_list)
+
+
+async def persist_closed(symbol: str, events: List[Dict[str, Any]]):
+    """Write closed bars to the history store as provisional rows."""
+    from app.services.market_data import executor
+    from app.services.history_store import get_history_store
+
+    store = get_history_store()
+    closed = [e for e in events if e["closed"]]
+    if store is None or not closed:
+        return
+    loop = asyncio.get_event_loop()
+    for event in closed:
+        frame = CandleFrame.from_records([event["bar"]])
+        try:
+            await loop.run_in_executor(executor, store.write_provisional, symbol, event["interval"], frame)
+        except Exception as e:
+            logger.warning(f"Could not store live {event['interval']} bar for {symbol}: {e}")
@@ -0,0 +1,23 @@
+"""Background task to keep universe fundamentals fresh."""
+
+import asyncio
+import logging
+from app.services.fundamentals import fundamentals
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def fundamentals_poller():
+    """Load stored fundamentals, then refetch stale rows once per interval."""
+    logger.info("Fundamentals poller started")
+    await fundamentals.load()
+    while True:
+        try:
+            fetched = await fundamentals.refresh()
+            if fetched:
+                logger.info(f"Fundamentals refreshed for {fetched} symbols")
+        except Exception as e:
+            logger.error(f"Fundamentals poller error: {e}")
+
+        await asyncio.sleep(settings.FUNDAMENTALS_REFRESH_INTERVAL)
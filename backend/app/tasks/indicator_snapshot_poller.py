@@ -0,0 +1,21 @@
+"""Background task to keep the indicator snapshot table current."""
+
+import asyncio
+import logging
+from app.services.indicator_snapshot import indicator_snapshot
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def indicator_snapshot_poller():
+    """Load the stored snapshot, then rebuild it whenever daily bars change."""
+    logger.info("Indicator snapshot poller started")
+    await indicator_snapshot.load()
+    while True:
+        try:
+            await indicator_snapshot.refresh()
+        except Exception as e:
+            logger.error(f"Indicator snapshot poller error: {e}")
+
+        await asyncio.sleep(settings.INDICATOR_SNAPSHOT_INTERVAL)
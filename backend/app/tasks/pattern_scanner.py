@@ -2,57 +2,60 @@
 
 import asyncio
 import logging
+import time
+from collections import OrderedDict
+from typing import List
+
 from app.websocket.manager import ws_manager
-from app.services.market_data import get_history
-from app.ai.candlestick_patterns import detect_patterns as detect_candlestick
-from app.ai.chart_patterns import detect_all_chart_patterns
-from app.ai.confidence import adjust_confidence
+from app.services.pattern_service import scan_symbols
 from app.utils.nse_symbols import NIFTY_50_SYMBOLS
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
-# Track recently detected patterns to avoid spam
-_recent_alerts = set()
+# Recently alerted patterns (LRU), to avoid re-broadcasting the same detection
+_recent_alerts: "OrderedDict[str, None]" = OrderedDict()
+
+
+def _is_new_alert(key: str) -> bool:
+    if key in _recent_alerts:
+        _recent_alerts.move_to_end(key)
+        return False
+    _recent_alerts[key] = None
+    if len(_recent_alerts) > settings.PATTERN_ALERT_CACHE_SIZE:
+        _recent_alerts.popitem(last=False)
+    return True
+
+
+async def scan_once(symbols: List[str]) -> int:
+    """Scan `symbols` once and broadcast new high-confidence patterns."""
+    alerts = 0
+    async for result in scan_symbols(
+        symbols, interval="1d", period="3mo",
+        concurrency=settings.PATTERN_SCAN_FETCH_CONCURRENCY, min_candles=10,
+    ):
+        # Only alert on high-confidence recent patterns
+        for p in result.patterns or []:
+            if p.get("confidence", 0) >= 0.75:
+                alert_key = f"{result.symbol}:{p['pattern_name']}:{p.get('time', '')}"
+                if _is_new_alert(alert_key):
+                    p["symbol"] = result.symbol
+                    await ws_manager.broadcast_pattern(p)
+                    alerts += 1
+    return alerts
 
 
 async def pattern_scanner():
-    """Scan popular stocks for high-confidence patterns."""
+    """Scan the configured universe for high-confidence patterns."""
     logger.info("Pattern scanner started")
-    symbols = list(NIFTY_50_SYMBOLS.keys())[:20]  # Top 20
+    symbols = settings.pattern_scan_symbols_list or list(NIFTY_50_SYMBOLS.keys())
 
     while True:
         try:
-            for symbol in symbols:
-                try:
-                    candles = await get_history(symbol, period="3mo", interval="1d")
-                    if not candles or len(candles) < 10:
-                        continue
-
-                    candlestick = detect_candlestick(candles)
-                    chart = detect_all_chart_patterns(candles)
-
-                    all_patterns = candlestick + chart
-                    all_patterns = adjust_confidence(all_patterns, candles)
-
-                    # Only alert on high-confidence recent patterns
-                    for p in all_patterns:
-                        if p.get("confidence", 0) >= 0.75:
-                            alert_key = f"{symbol}:{p['pattern_name']}:{p.get('time', '')}"
-                            if alert_key not in _recent_alerts:
-                                _recent_alerts.add(alert_key)
-                                p["symbol"] = symbol
-                                await ws_manager.broadcast_pattern(p)
-
-                    # Keep alert cache manageable
-                    if len(_recent_alerts) > 500:
-                        _recent_alerts.clear()
-
-                except Exception as e:
-                    logger.warning(f"Pattern scan error for {symbol}: {e}")
-
-                await asyncio.sleep(1)  # Rate limit
-
+            start = time.perf_counter()
+            alerts = await scan_once(symbols)
+            elapsed = (time.perf_counter() - start) * 1000
+            logger.info(f"Pattern scan: {len(symbols)} symbols, {alerts} new alerts in {elapsed:.0f} ms")
         except Exception as e:
             logger.error(f"Pattern scanner error: {e}")
 
@@ -4,26 +4,47 @@ import asyncio
 import logging
 from app.websocket.manager import ws_manager
 from app.services.market_data import get_batch_quotes
-from app.config import settings
+from app.services.incremental_indicators import indicator_hub
+from app.services.tick_aggregator import tick_aggregator, persist_closed
+from app.services.poll_scheduler import poll_scheduler
 
 logger = logging.getLogger(__name__)
 
+TICK = 1.0  # seconds between scheduler checks
+
 
 async def price_poller():
-    """Poll prices for all subscribed symbols and broadcast via WebSocket."""
+    """Poll prices for due subscribed symbols and broadcast via WebSocket.
+
+    Which symbols are due, and how often, is decided by poll_scheduler.
+    """
     logger.info("Price poller started")
     while True:
         try:
-            symbols = ws_manager.get_all_subscribed_symbols()
-            if symbols:
-                symbol_list = list(symbols)
+            subscriber_counts = ws_manager.get_subscriber_counts()
+            indicator_requests = ws_manager.get_indicator_requests()
+            indicator_hub.drop(set(indicator_hub.symbols) - set(indicator_requests))
+            tick_aggregator.drop(set(tick_aggregator.symbols) - set(subscriber_counts))
+            poll_scheduler.update_demand(subscriber_counts)
+            symbol_list = poll_scheduler.due()
+            if symbol_list:
                 # Process in batches of 10
                 for i in range(0, len(symbol_list), 10):
                     batch = symbol_list[i:i+10]
                     quotes = await get_batch_quotes(batch)
+                    poll_scheduler.record(batch, quotes)
                     for symbol, data in quotes.items():
                         await ws_manager.broadcast_price(symbol, data)
+                        candles = tick_aggregator.on_quote(symbol, data)
+                        if candles:
+                            await ws_manager.broadcast_candles(symbol, candles)
+                            await persist_closed(symbol, candles)
+                        if symbol in indicator_requests:
+                            live = await indicator_hub.on_quote(symbol, data, indicator_requests[symbol])
+                            if live:
+                                await ws_manager.broadcast_indicators(symbol, live)
+                await ws_manager.flush_batches()
         except Exception as e:
             logger.error(f"Price poller error: {e}")
 
-        await asyncio.sleep(settings.PRICE_POLL_INTERVAL)
+        await asyncio.sleep(TICK)
@@ -0,0 +1,20 @@
+"""Background task to refresh the NIFTY 50 market snapshot."""
+
+import asyncio
+import logging
+from app.services.market_snapshot import market_snapshot
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def snapshot_poller():
+    """Refresh the market snapshot once per interval."""
+    logger.info("Snapshot poller started")
+    while True:
+        try:
+            await market_snapshot.refresh()
+        except Exception as e:
+            logger.error(f"Snapshot poller error: {e}")
+
+        await asyncio.sleep(settings.SNAPSHOT_REFRESH_INTERVAL)
@@ -1,41 +1,83 @@
 """Simple in-memory TTL cache for market data."""
 
 import time
-from typing import Any, Optional
+from typing import Any, Optional, Tuple
 from collections import OrderedDict
 
 
 class TTLCache:
-    def __init__(self, default_ttl: int = 60, max_size: int = 1000):
-        self._cache: OrderedDict[str, tuple[Any, float]] = OrderedDict()
-        self._stale: dict[str, Any] = {}
+    """LRU cache with a soft and a hard TTL per entry.
+
+    Before the soft TTL an entry is fresh. Between the soft and hard TTL it is
+    still served by `peek()`, flagged as stale so the caller can refresh it
+    in the background (stale-while-revalidate); `get()` only returns fresh
+    entries. After the hard TTL the entry is dropped. The last value of every
+    key is also kept in a bounded LRU stale tier for `get_stale()` fallbacks
+    when an upstream fetch fails.
+    """
+
+    def __init__(self, default_ttl: int = 60, max_size: int = 1000,
+                 hard_ttl: Optional[int] = None, stale_size: Optional[int] = None):
+        self._cache: OrderedDict[str, tuple[Any, float, float]] = OrderedDict()
+        self._stale: OrderedDict[str, Any] = OrderedDict()
         self._default_ttl = default_ttl
+        self._hard_ttl = hard_ttl
         self._max_size = max_size
+        self._stale_size = stale_size or max_size
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
 
-    def get(self, key: str) -> Optional[Any]:
+    def _lookup(self, key: str) -> Tuple[Optional[Any], bool]:
         if key in self._cache:
-            value, expiry = self._cache[key]
-            if time.time() < expiry:
+            value, soft_expiry, hard_expiry = self._cache[key]
+            now = time.time()
+            if now < hard_expiry:
                 self._cache.move_to_end(key)
-                return value
-            else:
-                del self._cache[key]
+                return value, now < soft_expiry
+            del self._cache[key]
+        return None, False
+
+    def get(self, key: str) -> Optional[Any]:
+        value, fresh = self._lookup(key)
+        if fresh:
+            self.hits += 1
+            return value
+        self.misses += 1
         return None
 
+    def peek(self, key: str) -> Tuple[Optional[Any], bool]:
+        """Return (value, fresh) for entries within their hard TTL, else (None, False)."""
+        value, fresh = self._lookup(key)
+        if value is None:
+            self.misses += 1
+        elif fresh:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return value, fresh
+
     def get_stale(self, key: str) -> Optional[Any]:
         """Return cached value even if expired (fallback for failed fetches)."""
         if key in self._stale:
+            self._stale.move_to_end(key)
             return self._stale[key]
         return None
 
-    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, hard_ttl: Optional[int] = None):
         if key in self._cache:
             del self._cache[key]
         if len(self._cache) >= self._max_size:
             self._cache.popitem(last=False)
-        self._cache[key] = (value, time.time() + (ttl or self._default_ttl))
+        now = time.time()
+        ttl = ttl or self._default_ttl
+        hard_ttl = max(hard_ttl or self._hard_ttl or ttl, ttl)
+        self._cache[key] = (value, now + ttl, now + hard_ttl)
         # Keep a stale copy for fallback
         self._stale[key] = value
+        self._stale.move_to_end(key)
+        if len(self._stale) > self._stale_size:
+            self._stale.popitem(last=False)
 
     def delete(self, key: str):
         self._cache.pop(key, None)
@@ -43,13 +85,19 @@ class TTLCache:
     def clear(self):
         self._cache.clear()
 
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "size": len(self._cache),
+            "stale_size": len(self._stale),
+        }
+
 
 # Global cache instances
-quote_cache = TTLCache(default_ttl=5, max_size=200)
-history_cache = TTLCache(default_ttl=300, max_size=100)
-info_cache = TTLCache(default_ttl=3600, max_size=200)
-# Long-lived fallback caches for market-wide data
-index_cache = TTLCache(default_ttl=30, max_size=10)
-gainers_losers_cache = TTLCache(default_ttl=30, max_size=10)
-breadth_cache = TTLCache(default_ttl=30, max_size=10)
-sectors_cache = TTLCache(default_ttl=30, max_size=10)
+quote_cache = TTLCache(default_ttl=5, max_size=200, hard_ttl=30)
+history_cache = TTLCache(default_ttl=300, max_size=100, hard_ttl=1800)
+info_cache = TTLCache(default_ttl=3600, max_size=200, hard_ttl=86400)
+# Long-lived fallback cache for index data (breadth/sectors/gainers come from market_snapshot)
+index_cache = TTLCache(default_ttl=30, max_size=10, hard_ttl=3600)
@@ -0,0 +1,73 @@
+"""Columnar OHLCV container shared by market data, indicators and detectors."""
+
+import numpy as np
+from typing import List, Dict, Optional, Tuple
+
+
+class CandleFrame:
+    """OHLCV history stored as one contiguous array per field.
+
+    time and volume are int64 (epoch seconds / shares), prices are float64.
+    Slicing returns views, so tails and windows are free. Convert to the
+    list-of-dicts JSON shape with `to_records()` only at the HTTP/WebSocket
+    boundary.
+
+    Frames mapped from a column file (app.utils.columnar) remember their
+    `source` as (path, start, stop) rows; they pickle as that reference, so
+    worker processes map the same page-cached file instead of copying data.
+    """
+
+    __slots__ = ("time", "open", "high", "low", "close", "volume", "source")
+
+    COLUMNS = ("time", "open", "high", "low", "close", "volume")
+
+    def __init__(self, time, open, high, low, close, volume):
+        self.time = np.ascontiguousarray(time, dtype=np.int64)
+        self.open = np.ascontiguousarray(open, dtype=np.float64)
+        self.high = np.ascontiguousarray(high, dtype=np.float64)
+        self.low = np.ascontiguousarray(low, dtype=np.float64)
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        self.volume = np.ascontiguousarray(volume, dtype=np.int64)
+        self.source: Optional[Tuple[str, int, int]] = None
+
+    @classmethod
+    def from_records(cls, candles: List[Dict]) -> "CandleFrame":
+        """Build from the legacy list-of-dicts candle shape."""
+        return cls(*([c[k] for c in candles] for k in cls.COLUMNS))
+
+    def to_records(self) -> List[Dict]:
+        """Convert to the JSON list-of-dicts shape used by the API."""
+        keys = self.COLUMNS
+        return [dict(zip(keys, row)) for row in zip(
+            self.time.tolist(), self.open.tolist(), self.high.tolist(),
+            self.low.tolist(), self.close.tolist(), self.volume.tolist(),
+        )]
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def __getitem__(self, key) -> "CandleFrame":
+        if not isinstance(key, slice):
+            raise TypeError("CandleFrame only supports slicing")
+        frame = CandleFrame(*(getattr(self, k)[key] for k in self.COLUMNS))
+        if self.source is not None and key.step in (None, 1):
+            path, base, _ = self.source
+            start, stop, _ = key.indices(len(self))
+            frame.source = (path, base + start, base + max(stop, start))
+        return frame
+
+    def __reduce__(self):
+        if self.source is not None:
+            from app.utils.columnar import load_slice
+            return load_slice, self.source
+        return CandleFrame, tuple(getattr(self, k) for k in self.COLUMNS)
+
+    def tail(self, n: int) -> "CandleFrame":
+        return self[max(len(self) - n, 0):]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, k).nbytes for k in self.COLUMNS)
+
+    def __repr__(self) -> str:
+        return f"CandleFrame(len={len(self)})"
@@ -0,0 +1,255 @@
+"""Memory-mapped columnar OHLCV files.
+
+Layout: a 64-byte header (magic, format version, row count, row capacity,
+creation time) followed by one contiguous little-endian block of
+`capacity` rows per CandleFrame column, in COLUMNS order: time int64,
+open/high/low/close float64, volume int64. Mapping a file gives
+CandleFrame columns that are views into the page cache, so readers in
+several processes share a single copy and nothing is parsed.
+
+Files are written with APPEND_SLACK spare rows. A tail update (new bars,
+or a revised still-forming bar) is appended in place: rows from the first
+changed one onward are rewritten into the slack and the header's row count
+is bumped last, so rows before the tail never change under a reader. When
+the slack runs out, or older rows changed, a new generation file
+(`<name>.<gen>.col`) is written instead. A superseded generation is
+deleted only once its successor is older than GENERATION_GRACE seconds,
+so a frame pickled by reference still unpickles in a worker even if
+several rewrites land in between; a delete that fails (a file still
+mapped, on Windows) is retried at later writes.
+"""
+
+import glob
+import logging
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.utils.candles import CandleFrame
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"OHLCVCOL"
+VERSION = 2
+HEADER = struct.Struct("<8sIQQd")
+HEADER_SIZE = 64
+_DTYPES = {"time": "<i8", "open": "<f8", "high": "<f8", "low": "<f8", "close": "<f8", "volume": "<i8"}
+
+# Open maps per process, so repeated reads of a file don't re-map it
+_maps: "OrderedDict[str, CandleFrame]" = OrderedDict()
+_maps_lock = threading.Lock()
+_MAX_OPEN = 512
+
+# Seconds a superseded generation outlives its successor
+GENERATION_GRACE = 300
+
+# Spare rows per file, as a fraction of its rows (at least MIN_SLACK)
+APPEND_SLACK = 0.25
+MIN_SLACK = 256
+
+
+def _header(n: int, capacity: int, created: float) -> bytes:
+    return HEADER.pack(MAGIC, VERSION, n, capacity, created).ljust(HEADER_SIZE, b"\0")
+
+
+def read_header(path: str) -> Tuple[int, int, float]:
+    """(rows, capacity, creation time) of a column file; ValueError if it isn't one."""
+    with open(path, "rb") as f:
+        raw = f.read(HEADER.size)
+    if len(raw) < HEADER.size:
+        raise ValueError(f"Not a column file: {path}")
+    magic, version, n, capacity, created = HEADER.unpack(raw)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a column file: {path}")
+    return n, capacity, created
+
+
+def _write_rows(f, frame: CandleFrame, at: int, capacity: int):
+    for k, col in enumerate(CandleFrame.COLUMNS):
+        f.seek(HEADER_SIZE + (k * capacity + at) * 8)
+        f.write(np.ascontiguousarray(getattr(frame, col), dtype=_DTYPES[col]).tobytes())
+
+
+def write_columns(path: str, frame: CandleFrame, capacity: int = 0):
+    """Write `frame` to `path` atomically (temp file + rename), with room for `capacity` rows."""
+    n = len(frame)
+    capacity = max(n, capacity)
+    tmp = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+    with open(tmp, "wb") as f:
+        f.write(_header(n, capacity, time.time()))
+        _write_rows(f, frame, 0, capacity)
+        f.truncate(HEADER_SIZE + len(CandleFrame.COLUMNS) * capacity * 8)
+    os.replace(tmp, path)
+
+
+def append_columns(path: str, tail: CandleFrame) -> bool:
+    """Replace the rows from `tail`'s first time onward with `tail`, in place.
+
+    Returns False, leaving the file untouched, when the result would not
+    fit the file's capacity or would drop rows; the caller then rewrites.
+    """
+    n, capacity, created = read_header(path)
+    times = map_columns(path).time
+    if len(times) != n:  # mapped before another append
+        forget(path)
+        times = map_columns(path).time
+    at = int(np.searchsorted(times, tail.time[0]))
+    if at + len(tail) < n or at + len(tail) > capacity:
+        return False
+    with open(path, "r+b") as f:
+        _write_rows(f, tail, at, capacity)
+        f.flush()
+        f.seek(0)
+        f.write(_header(at + len(tail), capacity, created))
+    forget(path)
+    return True
+
+
+def map_columns(path: str) -> CandleFrame:
+    """Map a column file read-only; the frame's columns are zero-copy views."""
+    with _maps_lock:
+        frame = _maps.get(path)
+        if frame is not None:
+            _maps.move_to_end(path)
+            return frame
+
+    buf = np.memmap(path, dtype=np.uint8, mode="r")
+    magic, version, n, capacity, _ = HEADER.unpack_from(buf[:HEADER.size].tobytes())
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a column file: {path}")
+    cols = []
+    for k, col in enumerate(CandleFrame.COLUMNS):
+        start = HEADER_SIZE + k * capacity * 8
+        cols.append(buf[start:start + n * 8].view(_DTYPES[col]))
+    frame = CandleFrame(*cols)
+    frame.source = (path, 0, n)
+
+    with _maps_lock:
+        _maps[path] = frame
+        if len(_maps) > _MAX_OPEN:
+            _maps.popitem(last=False)
+    return frame
+
+
+def forget(path: str):
+    """Drop this process's cached map of `path` (after the file is superseded)."""
+    with _maps_lock:
+        _maps.pop(path, None)
+
+
+def load_slice(path: str, start: int, stop: int) -> CandleFrame:
+    """Rebuild a file-backed frame from (path, rows); used when unpickling."""
+    frame = map_columns(path)
+    if stop > len(frame):  # appended to since this process mapped it
+        forget(path)
+        frame = map_columns(path)
+    return frame[start:stop]
+
+
+class ColumnFiles:
+    """Generation-numbered column files for each symbol/interval in one directory."""
+
+    def __init__(self, directory: str, grace: float = GENERATION_GRACE):
+        self.directory = directory
+        self.grace = grace
+        self._generations: dict = {}
+        self._unremoved: set = set()  # superseded files whose delete failed
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _base(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.directory, f"{symbol}_{interval}")
+
+    def _existing(self, symbol: str, interval: str) -> Tuple[int, ...]:
+        gens = []
+        for p in glob.glob(glob.escape(self._base(symbol, interval)) + ".*.col"):
+            try:
+                gens.append(int(p.rsplit(".", 2)[1]))
+            except ValueError:
+                continue
+        return tuple(sorted(gens))
+
+    def _generation(self, symbol: str, interval: str) -> Optional[int]:
+        key = (symbol, interval)
+        if key not in self._generations:
+            gens = self._existing(symbol, interval)
+            self._generations[key] = gens[-1] if gens else None
+        return self._generations[key]
+
+    def write(self, symbol: str, interval: str, frame: CandleFrame):
+        """Write `frame` as a new generation."""
+        with self._lock:
+            gen = (self._generation(symbol, interval) or 0) + 1
+            n = len(frame)
+            write_columns(f"{self._base(symbol, interval)}.{gen}.col", frame,
+                          n + max(MIN_SLACK, int(n * APPEND_SLACK)))
+            self._generations[(symbol, interval)] = gen
+            self._prune(symbol, interval)
+            self._retry_removals()
+
+    def append(self, symbol: str, interval: str, tail: CandleFrame) -> bool:
+        """Append `tail` to the current generation in place (see append_columns).
+
+        Returns False when that isn't possible and `write` is needed.
+        """
+        if not len(tail):
+            return False
+        with self._lock:
+            gen = self._generation(symbol, interval)
+            if gen is None:
+                return False
+            try:
+                appended = append_columns(f"{self._base(symbol, interval)}.{gen}.col", tail)
+            except (OSError, ValueError):
+                return False
+            self._retry_removals()
+            return appended
+
+    def _prune(self, symbol: str, interval: str):
+        """Delete generations whose successor has existed for longer than `grace`."""
+        base = self._base(symbol, interval)
+        gens = self._existing(symbol, interval)
+        now = time.time()
+        for old, successor in zip(gens, gens[1:]):
+            path = f"{base}.{successor}.col"
+            try:
+                try:
+                    created = read_header(path)[2]
+                except ValueError:  # older format, never appended to
+                    created = os.path.getmtime(path)
+            except OSError:
+                continue
+            if now - created > self.grace:
+                self._remove(f"{base}.{old}.col")
+
+    def _remove(self, path: str):
+        forget(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            self._unremoved.discard(path)
+        except OSError as e:
+            if path not in self._unremoved:
+                logger.debug(f"Could not delete {path}, will retry: {e}")
+            self._unremoved.add(path)
+        else:
+            self._unremoved.discard(path)
+
+    def _retry_removals(self):
+        for path in list(self._unremoved):
+            self._remove(path)
+
+    def open(self, symbol: str, interval: str) -> Optional[CandleFrame]:
+        with self._lock:
+            gen = self._generation(symbol, interval)
+        if gen is None:
+            return None
+        try:
+            return map_columns(f"{self._base(symbol, interval)}.{gen}.col")
+        except ValueError:  # written by an older format version
+            return None
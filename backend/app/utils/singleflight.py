@@ -0,0 +1,54 @@
+"""Single-flight coalescing of concurrent async fetches for the same key."""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Run at most one fetch per key at a time.
+
+    The first caller for a key starts the fetch; callers arriving while it is
+    in flight await the same task instead of starting their own. The fetch
+    runs as its own task, so a cancelled caller does not cancel it for the
+    others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.flights = 0
+        self.coalesced = 0
+        self.refreshes = 0
+
+    def _start(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = asyncio.ensure_future(fetch())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+        self.flights += 1
+        return task
+
+    async def do(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._start(key, fetch)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def spawn(self, key: str, fetch: Callable[[], Awaitable[Any]]):
+        """Start a background fetch for `key` unless one is already running."""
+        if key in self._inflight:
+            return
+        self.refreshes += 1
+        self._start(key, fetch).add_done_callback(_log_failure)
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+
+def _log_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Background refresh failed: {task.exception()}")
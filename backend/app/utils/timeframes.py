@@ -0,0 +1,78 @@
+"""Period/interval arithmetic and NSE session constants."""
+
+from typing import Optional
+
+IST_OFFSET = 19800  # +05:30, no DST
+DAY = 86400
+
+# NSE cash session 09:15-15:30 IST, as seconds after IST midnight
+SESSION_OPEN = 9 * 3600 + 15 * 60
+SESSION_CLOSE = 15 * 3600 + 30 * 60
+
+INTERVAL_SECONDS = {
+    "1m": 60,
+    "2m": 120,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "60m": 3600,
+    "90m": 5400,
+    "1h": 3600,
+    "1d": DAY,
+    "5d": 5 * DAY,
+    "1wk": 7 * DAY,
+    "1mo": 30 * DAY,
+}
+
+PERIOD_SECONDS = {
+    "1d": DAY,
+    "5d": 5 * DAY,
+    "1mo": 31 * DAY,
+    "3mo": 92 * DAY,
+    "6mo": 183 * DAY,
+    "1y": 366 * DAY,
+    "2y": 731 * DAY,
+    "5y": 1827 * DAY,
+}
+
+
+def period_seconds(period: str) -> Optional[int]:
+    """Length of a yfinance-style period, or None for 'max'/unknown."""
+    return PERIOD_SECONDS.get(period)
+
+
+def is_intraday(interval: str) -> bool:
+    return INTERVAL_SECONDS.get(interval, DAY) < DAY
+
+
+def ist_day(ts: int) -> int:
+    """Day number (days since epoch) of a UTC timestamp in IST."""
+    return (ts + IST_OFFSET) // DAY
+
+
+def ist_midnight(day: int) -> int:
+    """UTC timestamp of 00:00 IST on the given IST day number."""
+    return day * DAY - IST_OFFSET
+
+
+def bar_start(ts: int, interval: str) -> Optional[int]:
+    """Start of the bar containing `ts`, or None outside the session for intraday.
+
+    Intraday bars are anchored at the session open (09:15 IST); daily bars
+    start at IST midnight, matching the upstream daily timestamps.
+    """
+    day = ist_day(ts)
+    if not is_intraday(interval):
+        return ist_midnight(day)
+    sec = ts + IST_OFFSET - day * DAY
+    if not SESSION_OPEN <= sec < SESSION_CLOSE:
+        return None
+    step = INTERVAL_SECONDS[interval]
+    return ist_midnight(day) + SESSION_OPEN + (sec - SESSION_OPEN) // step * step
+
+
+def is_market_open(ts: int) -> bool:
+    """Whether `ts` falls in a weekday NSE session (exchange holidays aren't known)."""
+    day = ist_day(ts)
+    sec = ts + IST_OFFSET - day * DAY
+    return (day + 3) % 7 < 5 and SESSION_OPEN <= sec < SESSION_CLOSE
@@ -0,0 +1,116 @@
+"""WebSocket message encodings, chosen per connection with ?encoding=.
+
+- "json" (default): text frames. Uses orjson when installed, which is
+  several times faster than the stdlib encoder.
+- "msgpack": every message is a MessagePack map in a binary frame. Needs
+  the optional msgpack package.
+- "packed": `price` and `candle` messages, the bulk of the traffic, are
+  fixed-layout binary frames (little-endian, float32 prices, int64
+  times/volumes); everything else stays JSON text.
+
+Packed layouts, after a one-byte kind and a length-prefixed ASCII symbol
+(u8 length + bytes):
+
+    b"P" price:  f32 last_price, f32 prev_close, f32 day_change,
+                 f32 day_change_pct, i64 volume, i64 server time (ms)
+    b"C" candle: u8-length-prefixed interval, u8 closed,
+                 i64 time, f32 open, f32 high, f32 low, f32 close, i64 volume
+
+float32 keeps about 7 significant digits, so prices are exact to the
+paisa below 1,00,000.
+"""
+
+import json
+import logging
+import struct
+import time
+from typing import Any, Dict, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional encoding
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+Payload = Union[str, bytes]
+
+_PRICE = struct.Struct("<ffffqq")
+_CANDLE = struct.Struct("<qffffq")
+
+
+def _plain(obj: Any) -> Any:
+    """Fallback for numpy scalars and other values the encoders don't know."""
+    if hasattr(obj, "item"):
+        return obj.item()
+    return str(obj)
+
+
+def dumps(obj: Any) -> str:
+    """JSON text via orjson when available, else the stdlib."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_plain, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+        except TypeError:
+            pass  # e.g. non-str dict keys; the stdlib copes
+    return json.dumps(obj, default=_plain)
+
+
+class Codec:
+    name = "json"
+    binary = False
+
+    def encode(self, message: Dict[str, Any]) -> Payload:
+        return dumps(message)
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+    binary = True
+
+    def encode(self, message: Dict[str, Any]) -> Payload:
+        return msgpack.packb(message, default=_plain)
+
+
+def _short(text: str) -> bytes:
+    raw = text.encode()
+    return bytes((len(raw),)) + raw
+
+
+class PackedCodec(Codec):
+    name = "packed"
+    binary = True
+
+    def encode(self, message: Dict[str, Any]) -> Payload:
+        kind = message.get("type")
+        if kind == "price":
+            q = message["data"]
+            return b"P" + _short(message["symbol"]) + _PRICE.pack(
+                q.get("last_price") or 0.0, q.get("prev_close") or 0.0,
+                q.get("day_change") or 0.0, q.get("day_change_pct") or 0.0,
+                int(q.get("volume") or 0), int(time.time() * 1000),
+            )
+        if kind == "candle":
+            bar = message["data"]
+            return (b"C" + _short(message["symbol"]) + _short(message["interval"])
+                    + bytes((1 if message["closed"] else 0,))
+                    + _CANDLE.pack(int(bar["time"]), bar["open"], bar["high"], bar["low"],
+                                   bar["close"], int(bar["volume"])))
+        return dumps(message)
+
+
+CODECS = {"json": Codec(), "packed": PackedCodec()}
+if msgpack is not None:
+    CODECS["msgpack"] = MsgpackCodec()
+
+DEFAULT_CODEC = CODECS["json"]
+
+
+def get_codec(name: Optional[str]) -> Optional[Codec]:
+    """Codec for an ?encoding= value; None if unknown or not installed."""
+    return CODECS.get(name or "json")
@@ -1,93 +1,425 @@
-"""WebSocket connection manager for real-time data push."""
+"""WebSocket connection manager for real-time data push.
 
-import json
+Broadcasts never await a socket. Each connection has a bounded outbound
+queue drained by its own writer task, so a slow client only delays itself.
+A symbol -> subscribers index means a price update touches only the
+connections that watch that symbol, and each message is serialized once.
+
+When a client falls behind, WS_SLOW_CLIENT_POLICY decides what happens:
+"conflate" (default) replaces a queued update of the same kind (say, the
+price of one symbol) with the newer one, so a slow client skips
+intermediate ticks. "drop_oldest" queues every update and drops from the
+front once WS_SEND_QUEUE_SIZE messages are waiting. A client whose send
+has not finished after WS_SEND_TIMEOUT is disconnected at the next
+broadcast to it: it is unregistered and its socket closed (code 1013, "try
+again later"), so the endpoint loop exits and the client knows to
+reconnect.
+
+Price clients may opt into batch mode ("mode": "batch" when subscribing):
+instead of one message per symbol they get a single `prices` frame per
+poll, holding for each symbol only the quote fields that changed since
+their previous frame. A full frame is sent every WS_BATCH_FULL_EVERY
+frames, after a {"action": "resync"} and whenever an earlier frame was
+still unsent (frames replace each other, so a slow client is resynced
+rather than left with a gap).
+
+Each connection picks an encoding at connect time (app.websocket.codecs);
+a message is serialized once per encoding in use, not once per client.
+"""
+
+import asyncio
+import itertools
 import logging
-from typing import Dict, Set, List, Any
+import time
+from collections import OrderedDict
+from typing import Dict, Set, List, Any, Optional, Hashable
 from fastapi import WebSocket
 
+from app.config import settings
+from app.websocket.codecs import Codec, Payload, DEFAULT_CODEC
+
 logger = logging.getLogger(__name__)
 
+_unique = itertools.count()
+
+
+class _Encoded:
+    """A message serialized lazily, at most once per codec."""
+
+    __slots__ = ("message", "payloads")
+
+    def __init__(self, message: Dict[str, Any]):
+        self.message = message
+        self.payloads: Dict[str, Payload] = {}
+
+    def __call__(self, codec: Codec) -> Payload:
+        payload = self.payloads.get(codec.name)
+        if payload is None:
+            payload = self.payloads[codec.name] = codec.encode(self.message)
+        return payload
+
+
+class _Client:
+    """One connection's outbound queue and writer task."""
+
+    __slots__ = ("ws", "codec", "on_close", "max_queue", "conflate", "send_timeout",
+                 "pending", "batch_frame", "wakeup", "task", "sending_since", "sent", "dropped", "conflated")
+
+    def __init__(self, ws: WebSocket, codec: Codec, on_close, max_queue: int, conflate: bool,
+                 send_timeout: float):
+        self.ws = ws
+        self.codec = codec
+        self.on_close = on_close
+        self.max_queue = max_queue
+        self.conflate = conflate
+        self.send_timeout = send_timeout
+        self.pending: "OrderedDict[Hashable, Payload]" = OrderedDict()
+        self.batch_frame: Optional[Payload] = None
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.sending_since = 0.0
+        self.sent = 0
+        self.dropped = 0
+        self.conflated = 0
+
+    def start(self):
+        self.task = asyncio.create_task(self._writer())
+
+    def stop(self):
+        if self.task is not None and self.task is not asyncio.current_task():
+            self.task.cancel()
+
+    def push(self, message: Payload, key: Optional[Hashable] = None):
+        """Queue a message; a `key` lets a newer message replace a queued one."""
+        if self._stalled():
+            self._close_stalled()
+            return
+        if key is None or not self.conflate:
+            key = next(_unique)
+        elif key in self.pending:
+            self.conflated += 1
+            del self.pending[key]  # re-queue at the back so ordering stays causal
+        self.pending[key] = message
+        while len(self.pending) > self.max_queue:
+            self.pending.popitem(last=False)
+            self.dropped += 1
+        self.wakeup.set()
+
+    def push_batch(self, message: Payload):
+        """Set the next batch frame; it supersedes any frame not yet sent."""
+        if self._stalled():
+            self._close_stalled()
+            return
+        self.batch_frame = message
+        self.wakeup.set()
+
+    def _stalled(self) -> bool:
+        return bool(self.sending_since) and time.monotonic() - self.sending_since > self.send_timeout
+
+    def _close_stalled(self):
+        logger.info("WS send stalled, closing slow connection")
+        self.sending_since = 0.0
+        # Deferred: the caller may be iterating over the subscriber set
+        asyncio.get_running_loop().call_soon(self._abort)
+
+    def _abort(self):
+        """Unregister the connection and close its socket."""
+        self.on_close(self.ws)
+        asyncio.create_task(self._close_socket())
+
+    async def _close_socket(self):
+        try:
+            # A stalled transport may never flush the close frame
+            await asyncio.wait_for(self.ws.close(code=1013), self.send_timeout)
+        except Exception:
+            pass
+
+    async def _writer(self):
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                while self.pending or self.batch_frame is not None:
+                    if self.pending:
+                        _, message = self.pending.popitem(last=False)
+                    else:
+                        message, self.batch_frame = self.batch_frame, None
+                    # Checked by push(); a per-send wait_for would cost a task per message
+                    self.sending_since = time.monotonic()
+                    if isinstance(message, bytes):
+                        await self.ws.send_bytes(message)
+                    else:
+                        await self.ws.send_text(message)
+                    self.sending_since = 0.0
+                    self.sent += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.debug(f"WS send failed, closing connection: {e}")
+            self._abort()
+
+
+class _BatchState:
+    """What a batch-mode client was last sent, per symbol."""
+
+    __slots__ = ("last", "seq", "since_full", "needs_full")
 
-class ConnectionManager:
     def __init__(self):
+        self.last: Dict[str, Dict[str, Any]] = {}
+        self.seq = 0
+        self.since_full = 0
+        self.needs_full = True
+
+
+class ConnectionManager:
+    def __init__(self, max_queue: Optional[int] = None, policy: Optional[str] = None,
+                 send_timeout: Optional[float] = None):
+        self.max_queue = max_queue or settings.WS_SEND_QUEUE_SIZE
+        self.conflate = (policy or settings.WS_SLOW_CLIENT_POLICY) == "conflate"
+        self.send_timeout = send_timeout or settings.WS_SEND_TIMEOUT
+        self._clients: Dict[WebSocket, _Client] = {}
         self._price_connections: Dict[WebSocket, Set[str]] = {}
+        self._subscribers: Dict[str, Set[WebSocket]] = {}
+        self._indicator_names: Dict[WebSocket, Set[str]] = {}
+        self._candle_intervals: Dict[WebSocket, Set[str]] = {}
+        self._batch: Dict[WebSocket, _BatchState] = {}
+        self._latest: Dict[str, Dict[str, Any]] = {}  # last quote per symbol
+        self._updated: Set[str] = set()  # symbols quoted since the last flush
+        self.batch_full_every = settings.WS_BATCH_FULL_EVERY
         self._market_connections: Set[WebSocket] = set()
         self._pattern_connections: Set[WebSocket] = set()
+        self._closed_sent = 0
+        self._closed_dropped = 0
+        self._closed_conflated = 0
+
+    def _attach(self, websocket: WebSocket, codec: Codec, on_close):
+        client = _Client(websocket, codec, on_close, self.max_queue, self.conflate, self.send_timeout)
+        self._clients[websocket] = client
+        client.start()
+
+    def _detach(self, websocket: WebSocket):
+        client = self._clients.pop(websocket, None)
+        if client is not None:
+            client.stop()
+            self._closed_sent += client.sent
+            self._closed_dropped += client.dropped
+            self._closed_conflated += client.conflated
+
+    def send(self, websocket: WebSocket, message: Dict[str, Any], key: Optional[Hashable] = None):
+        """Queue a message for one connection (replies go through here too, to keep order)."""
+        client = self._clients.get(websocket)
+        if client is not None:
+            client.push(client.codec.encode(message), key)
 
-    async def connect_prices(self, websocket: WebSocket):
+    async def connect_prices(self, websocket: WebSocket, codec: Codec = DEFAULT_CODEC):
         await websocket.accept()
         self._price_connections[websocket] = set()
+        self._attach(websocket, codec, self.disconnect_prices)
         logger.info(f"Price WS connected. Total: {len(self._price_connections)}")
 
-    async def connect_market(self, websocket: WebSocket):
+    async def connect_market(self, websocket: WebSocket, codec: Codec = DEFAULT_CODEC):
         await websocket.accept()
         self._market_connections.add(websocket)
+        self._attach(websocket, codec, self.disconnect_market)
         logger.info(f"Market WS connected. Total: {len(self._market_connections)}")
 
-    async def connect_patterns(self, websocket: WebSocket):
+    async def connect_patterns(self, websocket: WebSocket, codec: Codec = DEFAULT_CODEC):
         await websocket.accept()
         self._pattern_connections.add(websocket)
+        self._attach(websocket, codec, self.disconnect_patterns)
         logger.info(f"Pattern WS connected. Total: {len(self._pattern_connections)}")
 
     def disconnect_prices(self, websocket: WebSocket):
-        self._price_connections.pop(websocket, None)
+        symbols = self._price_connections.pop(websocket, None)
+        if symbols is None:
+            return
+        self._unindex(websocket, symbols)
+        self._indicator_names.pop(websocket, None)
+        self._candle_intervals.pop(websocket, None)
+        self._batch.pop(websocket, None)
+        self._detach(websocket)
         logger.info(f"Price WS disconnected. Total: {len(self._price_connections)}")
 
     def disconnect_market(self, websocket: WebSocket):
-        self._market_connections.discard(websocket)
-        logger.info(f"Market WS disconnected. Total: {len(self._market_connections)}")
+        if websocket in self._market_connections:
+            self._market_connections.discard(websocket)
+            self._detach(websocket)
+            logger.info(f"Market WS disconnected. Total: {len(self._market_connections)}")
 
     def disconnect_patterns(self, websocket: WebSocket):
         self._pattern_connections.discard(websocket)
+        self._detach(websocket)
 
-    def subscribe(self, websocket: WebSocket, symbols: List[str]):
+    def _unindex(self, websocket: WebSocket, symbols):
+        for s in symbols:
+            subscribers = self._subscribers.get(s)
+            if subscribers is not None:
+                subscribers.discard(websocket)
+                if not subscribers:
+                    del self._subscribers[s]
+                    self._latest.pop(s, None)
+
+    def subscribe(self, websocket: WebSocket, symbols: List[str], indicators: Optional[List[str]] = None,
+                  candles: Optional[List[str]] = None, mode: Optional[str] = None):
         if websocket in self._price_connections:
-            self._price_connections[websocket].update(s.upper() for s in symbols)
+            if mode == "batch":
+                self._batch.setdefault(websocket, _BatchState())
+            elif mode == "stream":
+                self._batch.pop(websocket, None)
+            for s in symbols:
+                s = s.upper()
+                self._price_connections[websocket].add(s)
+                self._subscribers.setdefault(s, set()).add(websocket)
+            if indicators:
+                self._indicator_names.setdefault(websocket, set()).update(indicators)
+            if candles:
+                self._candle_intervals.setdefault(websocket, set()).update(candles)
 
     def unsubscribe(self, websocket: WebSocket, symbols: List[str]):
         if websocket in self._price_connections:
-            for s in symbols:
-                self._price_connections[websocket].discard(s.upper())
+            upper = [s.upper() for s in symbols]
+            self._price_connections[websocket].difference_update(upper)
+            self._unindex(websocket, upper)
+            state = self._batch.get(websocket)
+            if state is not None:
+                for s in upper:
+                    state.last.pop(s, None)
+
+    def mode(self, websocket: WebSocket) -> str:
+        return "batch" if websocket in self._batch else "stream"
+
+    def resync(self, websocket: WebSocket):
+        """Make the next batch frame for this client a full snapshot."""
+        state = self._batch.get(websocket)
+        if state is not None:
+            state.needs_full = True
 
     def get_all_subscribed_symbols(self) -> Set[str]:
-        all_symbols = set()
-        for symbols in self._price_connections.values():
-            all_symbols.update(symbols)
-        return all_symbols
+        return set(self._subscribers)
+
+    def get_subscriber_counts(self) -> Dict[str, int]:
+        return {symbol: len(subscribers) for symbol, subscribers in self._subscribers.items()}
+
+    def get_indicator_requests(self) -> Dict[str, Set[str]]:
+        """Map each symbol to the union of live indicators its subscribers want."""
+        requests: Dict[str, Set[str]] = {}
+        for ws, names in self._indicator_names.items():
+            for symbol in self._price_connections.get(ws, ()):
+                requests.setdefault(symbol, set()).update(names)
+        return requests
 
     async def broadcast_price(self, symbol: str, data: Dict[str, Any]):
-        message = json.dumps({"type": "price", "symbol": symbol, "data": data})
-        dead = []
-        for ws, symbols in self._price_connections.items():
-            if symbol in symbols:
-                try:
-                    await ws.send_text(message)
-                except Exception:
-                    dead.append(ws)
-        for ws in dead:
-            self.disconnect_prices(ws)
+        message = _Encoded({"type": "price", "symbol": symbol, "data": data})
+        key = ("price", symbol)
+        batch = self._batch
+        for ws in self._subscribers.get(symbol, ()):
+            if ws not in batch:
+                client = self._clients[ws]
+                client.push(message(client.codec), key)
+        if batch:
+            self._latest[symbol] = data
+            self._updated.add(symbol)
+
+    async def flush_batches(self):
+        """Send each batch-mode client one frame with this poll's changes."""
+        updated, self._updated = self._updated, set()
+        # Clients that were last sent the same quote object get the same delta
+        deltas: Dict[tuple, Dict[str, Any]] = {}
+        for ws, state in self._batch.items():
+            client = self._clients[ws]
+            symbols = self._price_connections[ws]
+            full = (state.needs_full or client.batch_frame is not None
+                    or state.since_full + 1 >= self.batch_full_every)
+            data = {}
+            for s in (symbols if full else symbols & updated):
+                quote = self._latest.get(s)
+                if quote is None:
+                    continue
+                if full:
+                    data[s] = quote
+                else:
+                    prev = state.last.get(s)
+                    dk = (s, id(prev))
+                    delta = deltas.get(dk)
+                    if delta is None:
+                        delta = deltas[dk] = quote if prev is None else {
+                            k: v for k, v in quote.items() if prev.get(k) != v
+                        }
+                    if delta:
+                        data[s] = delta
+                state.last[s] = quote
+            if not data and not full:
+                continue
+            state.seq += 1
+            state.since_full = 0 if full else state.since_full + 1
+            state.needs_full = False
+            client.push_batch(client.codec.encode({"type": "prices", "seq": state.seq, "full": full, "data": data}))
+
+    async def broadcast_indicators(self, symbol: str, live: Dict[str, Any]):
+        """Send live indicator values, filtered to what each client asked for."""
+        values = live["values"]
+        key = ("indicators", symbol)
+        encoded: Dict[frozenset, _Encoded] = {}
+        for ws in self._subscribers.get(symbol, ()):
+            names = self._indicator_names.get(ws)
+            if not names:
+                continue
+            wanted = frozenset(n for n in names if n in values)
+            if not wanted:
+                continue
+            message = encoded.get(wanted)
+            if message is None:
+                message = encoded[wanted] = _Encoded({
+                    "type": "indicators", "symbol": symbol, "time": live["time"],
+                    "data": {n: values[n] for n in wanted},
+                })
+            client = self._clients[ws]
+            client.push(message(client.codec), key)
+
+    async def broadcast_candles(self, symbol: str, events: List[Dict[str, Any]]):
+        """Send live candle updates for the intervals each client asked for."""
+        messages = [
+            (event["interval"], _Encoded({
+                "type": "candle", "symbol": symbol, "interval": event["interval"],
+                "closed": event["closed"], "data": event["bar"],
+            }), None if event["closed"] else ("candle", symbol, event["interval"]))
+            for event in events
+        ]
+        for ws in self._subscribers.get(symbol, ()):
+            intervals = self._candle_intervals.get(ws)
+            if not intervals:
+                continue
+            client = self._clients[ws]
+            for interval, message, key in messages:
+                if interval in intervals:
+                    client.push(message(client.codec), key)
 
     async def broadcast_market(self, data: Dict[str, Any]):
-        message = json.dumps({"type": "market", "data": data})
-        dead = []
+        message = _Encoded({"type": "market", "data": data})
         for ws in self._market_connections:
-            try:
-                await ws.send_text(message)
-            except Exception:
-                dead.append(ws)
-        for ws in dead:
-            self.disconnect_market(ws)
+            client = self._clients[ws]
+            client.push(message(client.codec), "market")
 
     async def broadcast_pattern(self, data: Dict[str, Any]):
-        message = json.dumps({"type": "pattern", "data": data})
-        dead = []
+        message = _Encoded({"type": "pattern", "data": data})
         for ws in self._pattern_connections:
-            try:
-                await ws.send_text(message)
-            except Exception:
-                dead.append(ws)
-        for ws in dead:
-            self.disconnect_patterns(ws)
+            client = self._clients[ws]
+            client.push(message(client.codec))
+
+    def stats(self) -> Dict[str, Any]:
+        clients = self._clients.values()
+        return {
+            "price_connections": len(self._price_connections),
+            "market_connections": len(self._market_connections),
+            "pattern_connections": len(self._pattern_connections),
+            "batch_connections": len(self._batch),
+            "symbols": len(self._subscribers),
+            "policy": "conflate" if self.conflate else "drop_oldest",
+            "queued": sum(len(c.pending) for c in clients),
+            "sent": self._closed_sent + sum(c.sent for c in clients),
+            "dropped": self._closed_dropped + sum(c.dropped for c in clients),
+            "conflated": self._closed_conflated + sum(c.conflated for c in clients),
+        }
 
 
 ws_manager = ConnectionManager()
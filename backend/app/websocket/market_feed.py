@@ -3,13 +3,20 @@
 import logging
 from fastapi import WebSocket, WebSocketDisconnect
 from app.websocket.manager import ws_manager
+from app.websocket.price_feed import accept_codec
 
 logger = logging.getLogger(__name__)
 
 
 async def market_ws_endpoint(websocket: WebSocket):
-    """Handle market WebSocket connections. Broadcasts index updates."""
-    await ws_manager.connect_market(websocket)
+    """Handle market WebSocket connections. Broadcasts index updates.
+
+    Accepts the same ?encoding= values as /ws/prices.
+    """
+    codec = await accept_codec(websocket)
+    if codec is None:
+        return
+    await ws_manager.connect_market(websocket, codec)
     try:
         while True:
             await websocket.receive_text()  # Keep alive
@@ -4,13 +4,46 @@ import json
 import logging
 from fastapi import WebSocket, WebSocketDisconnect
 from app.websocket.manager import ws_manager
+from app.websocket.codecs import get_codec
+from app.services.indicator_service import parse_indicator
 
 logger = logging.getLogger(__name__)
 
 
+async def accept_codec(websocket: WebSocket):
+    """Codec for the ?encoding= query; unknown encodings are refused and closed."""
+    encoding = websocket.query_params.get("encoding")
+    codec = get_codec(encoding)
+    if codec is None:
+        await websocket.accept()
+        await websocket.send_text(json.dumps({"type": "error", "message": f"Unsupported encoding: {encoding}"}))
+        await websocket.close(code=1003)
+    return codec
+
+
 async def price_ws_endpoint(websocket: WebSocket):
-    """Handle price WebSocket connections. Clients send subscribe/unsubscribe messages."""
-    await ws_manager.connect_prices(websocket)
+    """Handle price WebSocket connections. Clients send subscribe/unsubscribe messages.
+
+    A subscribe message may carry "indicators" (e.g. ["rsi", "ema20"]) to
+    also receive live daily indicator values for those symbols every poll
+    (unknown names are dropped and reported in an `error` message),
+    and "candles" (e.g. ["1m", "5m"]) to receive the forming bar of those
+    intervals as `candle` messages; a bar that completes is sent once more
+    with "closed": true.
+
+    "mode": "batch" switches the connection to one `prices` frame per poll
+    ({"seq", "full", "data": {symbol: changed fields}}) instead of a `price`
+    message per symbol; merge each frame into the previous state, replacing
+    it when "full" is true. {"action": "resync"} requests a full frame.
+    "mode": "stream" switches back.
+
+    ?encoding=json|msgpack|packed selects how server messages are encoded
+    (see app.websocket.codecs); client messages are always JSON text.
+    """
+    codec = await accept_codec(websocket)
+    if codec is None:
+        return
+    await ws_manager.connect_prices(websocket, codec)
     try:
         while True:
             raw = await websocket.receive_text()
@@ -20,19 +53,34 @@ async def price_ws_endpoint(websocket: WebSocket):
                 symbols = msg.get("symbols", [])
 
                 if action == "subscribe" and symbols:
-                    ws_manager.subscribe(websocket, symbols)
-                    await websocket.send_text(json.dumps({
+                    requested = msg.get("indicators") or []
+                    indicators = [n for n in requested if isinstance(n, str) and parse_indicator(n)]
+                    unknown = [n for n in requested if n not in indicators]
+                    if unknown:
+                        ws_manager.send(websocket, {
+                            "type": "error",
+                            "message": f"Unknown indicators: {unknown}",
+                        })
+                    candles = msg.get("candles", [])
+                    mode = msg.get("mode")
+                    ws_manager.subscribe(websocket, symbols, indicators, candles, mode)
+                    ws_manager.send(websocket, {
                         "type": "subscribed",
-                        "symbols": symbols
-                    }))
+                        "symbols": symbols,
+                        "indicators": indicators,
+                        "candles": candles,
+                        "mode": ws_manager.mode(websocket),
+                    })
                 elif action == "unsubscribe" and symbols:
                     ws_manager.unsubscribe(websocket, symbols)
-                    await websocket.send_text(json.dumps({
+                    ws_manager.send(websocket, {
                         "type": "unsubscribed",
                         "symbols": symbols
-                    }))
+                    })
+                elif action == "resync":
+                    ws_manager.resync(websocket)
             except json.JSONDecodeError:
-                await websocket.send_text(json.dumps({"type": "error", "message": "Invalid JSON"}))
+                ws_manager.send(websocket, {"type": "error", "message": "Invalid JSON"})
     except WebSocketDisconnect:
         ws_manager.disconnect_prices(websocket)
     except Exception as e:
@@ -0,0 +1,26 @@
+"""Candlestick engine: per-candle loop vs. vectorized masks.
+
+Run from backend/:  python -m benchmarks.bench_candlestick
+"""
+
+from app.ai.candlestick_patterns import detect_patterns
+from app.utils.candles import CandleFrame
+from benchmarks import legacy
+from benchmarks.common import SIZES, synthetic_candles, best_of, report
+
+
+def main():
+    rows = []
+    for n in SIZES:
+        candles = synthetic_candles(n)
+        frame = CandleFrame.from_records(candles)
+        expected = legacy.detect_candlestick_patterns(candles)
+        actual = detect_patterns(frame)
+        assert actual == expected, f"output mismatch at n={n}"
+        rows.append((n, best_of(legacy.detect_candlestick_patterns, candles),
+                     best_of(detect_patterns, frame)))
+    report("detect_patterns", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Chart patterns: extrema per detector and per-pair/triple loops vs. shared
+extrema and vectorized candidate tests.
+
+Outputs are asserted identical for every series.
+
+Run from backend/:  python -m benchmarks.bench_chart_patterns
+"""
+
+from app.ai.chart_patterns import detect_all_chart_patterns
+from app.utils.candles import CandleFrame
+from benchmarks import legacy
+from benchmarks.common import SIZES, synthetic_candles, best_of, report
+
+UNIVERSE = 200  # symbols
+UNIVERSE_BARS = 2_000
+
+
+def scan(fn, frames):
+    for frame in frames:
+        fn(frame)
+
+
+def main():
+    rows = []
+    for n in SIZES:
+        frame = CandleFrame.from_records(synthetic_candles(n))
+        expected = legacy.detect_all_chart_patterns(frame)
+        assert detect_all_chart_patterns(frame) == expected, f"output mismatch at n={n}"
+        rows.append((n, best_of(legacy.detect_all_chart_patterns, frame),
+                     best_of(detect_all_chart_patterns, frame)))
+    report("detect_all_chart_patterns", rows)
+
+    frames = [CandleFrame.from_records(synthetic_candles(UNIVERSE_BARS, seed=s)) for s in range(UNIVERSE)]
+    found = 0
+    for frame in frames:
+        expected = legacy.detect_all_chart_patterns(frame)
+        assert detect_all_chart_patterns(frame) == expected, "output mismatch in universe scan"
+        found += len(expected)
+    report(f"{UNIVERSE} symbols x {UNIVERSE_BARS} bars ({found} patterns)",
+           [(UNIVERSE * UNIVERSE_BARS, best_of(scan, legacy.detect_all_chart_patterns, frames),
+             best_of(scan, detect_all_chart_patterns, frames))])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""Indicator kernels: iloc-in-loop RSI/Supertrend vs. array kernels.
+
+Run from backend/:  python -m benchmarks.bench_indicators
+"""
+
+from app.services.indicator_service import calculate_rsi, calculate_supertrend
+from app.utils.candles import CandleFrame
+from benchmarks import legacy
+from benchmarks.common import SIZES, synthetic_candles, best_of, report
+
+
+def main():
+    for name, old_fn, new_fn in [
+        ("calculate_rsi", legacy.calculate_rsi, calculate_rsi),
+        ("calculate_supertrend", legacy.calculate_supertrend, calculate_supertrend),
+    ]:
+        rows = []
+        for n in SIZES:
+            candles = synthetic_candles(n, step=86400)
+            frame = CandleFrame.from_records(candles)
+            assert new_fn(frame) == old_fn(candles), f"{name}: output mismatch at n={n}"
+            rows.append((n, best_of(old_fn, candles, repeat=3), best_of(new_fn, frame)))
+        report(name, rows)
+
+
+if __name__ == "__main__":
+    main()
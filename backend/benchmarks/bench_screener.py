@@ -0,0 +1,87 @@
+"""Technical screens: per-symbol loop vs. the vectorized universe matrix.
+
+Histories are in memory for both, so this times the screening itself.
+Outputs are asserted identical for every screen.
+
+Run from backend/:  python -m benchmarks.bench_screener
+"""
+
+import numpy as np
+
+from app.services.screener_engine import UniverseMatrix, ScreenerEngine
+from app.utils.candles import CandleFrame
+from benchmarks import legacy
+from benchmarks.common import synthetic_candles, best_of, report
+
+UNIVERSES = [50, 500, 2_000]
+
+SCREENS = [
+    {"max_rsi": 40},
+    {"min_rsi": 60},
+    {"macd_cross": "bullish"},
+    {"macd_cross": "bearish"},
+    {"min_volume_ratio": 1.2},
+    {"min_rsi": 30, "max_rsi": 70, "macd_cross": "bullish", "min_volume_ratio": 0.5},
+]
+
+
+def synthetic_universe(n: int):
+    rng = np.random.default_rng(11)
+    symbols = [f"SYM{i}" for i in range(n)]
+    histories, quotes = {}, {}
+    for i, s in enumerate(symbols):
+        # Mostly ~3 months of bars, some short or fresh listings
+        length = int(rng.choice([63, 62, 61, 40, 20, 15]))
+        frame = CandleFrame.from_records(synthetic_candles(length, seed=i, step=86400))
+        histories[s] = frame
+        change = float(frame.close[-1] - frame.close[-2]) if length > 1 else 0.0
+        quotes[s] = {
+            "symbol": s, "name": s, "last_price": float(frame.close[-1]),
+            "day_change": round(change, 2), "day_change_pct": round(float(change / frame.close[-1] * 100), 2),
+            "volume": int(frame.volume[-1]),
+        }
+    return symbols, quotes, histories
+
+
+def engine_screen(engine, symbols, quotes, histories, filters):
+    """The vectorized half of run_screen, from a fresh matrix."""
+    matrix = UniverseMatrix(symbols, histories)
+    tech = engine.technicals(matrix.latest(), **filters)
+    results = []
+    for i, s in enumerate(symbols):
+        if not tech["keep"][i]:
+            continue
+        q = quotes[s]
+        row = {
+            "symbol": s, "name": q.get("name", s), "last_price": q.get("last_price", 0),
+            "day_change": q.get("day_change", 0), "day_change_pct": q.get("day_change_pct", 0),
+            "volume": q.get("volume", 0), "passed_filters": tech["passed"][i],
+        }
+        if tech["rsi"][i] is not None:
+            row["rsi"] = tech["rsi"][i]
+        if tech["volume_ratio"][i] is not None:
+            row["volume_ratio"] = tech["volume_ratio"][i]
+        results.append(row)
+    results.sort(key=lambda x: abs(x.get("day_change_pct", 0)), reverse=True)
+    return results
+
+
+def main():
+    engine = ScreenerEngine()
+    for filters in SCREENS:
+        rows = []
+        for n in UNIVERSES:
+            symbols, quotes, histories = synthetic_universe(n)
+            old = legacy.run_screen(symbols, quotes, histories, **filters)
+            new = engine_screen(engine, symbols, quotes, histories, filters)
+            assert old == new, f"{filters}: output mismatch at n={n}"
+            rows.append((
+                n,
+                best_of(lambda: legacy.run_screen(symbols, quotes, histories, **filters), repeat=3),
+                best_of(engine_screen, engine, symbols, quotes, histories, filters),
+            ))
+        report(f"screen {filters}", rows)
+
+
+if __name__ == "__main__":
+    main()
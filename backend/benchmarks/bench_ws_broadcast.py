@@ -0,0 +1,90 @@
+"""Price fan-out: scan-and-await broadcast vs. indexed per-connection queues.
+
+Simulated clients run in-process: each fake socket's send yields to the
+event loop like a transport write, and a few clients are slow (every send
+takes SLOW_SEND_MS). One poll broadcasts a quote for each of SYMBOLS
+symbols; latency is measured from the start of the poll to each delivery.
+
+Run from backend/:  python -m benchmarks.bench_ws_broadcast
+"""
+
+import asyncio
+import time
+
+import numpy as np
+
+from app.websocket.manager import ConnectionManager
+from benchmarks import legacy
+
+CLIENTS = [1_000, 5_000, 10_000]
+SYMBOLS = 50
+PER_CLIENT = 10
+SLOW_FRACTION = 0.005
+SLOW_SEND_MS = 20
+
+
+class FakeSocket:
+    def __init__(self, slow: bool, latencies: list):
+        self.slow = slow
+        self.latencies = latencies
+        self.t0 = 0.0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        await asyncio.sleep(SLOW_SEND_MS / 1e3 if self.slow else 0)
+        if not self.slow:
+            self.latencies.append(time.perf_counter() - self.t0)
+
+
+async def run(manager, n_clients: int, drain) -> tuple:
+    rng = np.random.default_rng(3)
+    symbols = [f"SYM{i}" for i in range(SYMBOLS)]
+    latencies: list = []
+    sockets = []
+    for _ in range(n_clients):
+        ws = FakeSocket(rng.random() < SLOW_FRACTION, latencies)
+        await manager.connect_prices(ws)
+        manager.subscribe(ws, list(rng.choice(symbols, PER_CLIENT, replace=False)))
+        sockets.append(ws)
+    expected = sum(PER_CLIENT for ws in sockets if not ws.slow)
+
+    quote = {"last_price": 2500.5, "change": 12.3, "change_percent": 0.49, "volume": 1234567}
+    t0 = time.perf_counter()
+    for ws in sockets:
+        ws.t0 = t0
+    for s in symbols:
+        await manager.broadcast_price(s, quote)
+    broadcast = time.perf_counter() - t0
+    await drain(latencies, expected)
+    for ws in sockets:
+        manager.disconnect_prices(ws)
+    await asyncio.sleep(0.05)  # let cancelled writer tasks finish
+    lat = np.array(latencies) * 1e3
+    return broadcast * 1e3, np.percentile(lat, 50), np.percentile(lat, 99)
+
+
+async def _sequential_drain(latencies, expected):
+    pass  # the legacy broadcast has delivered everything when it returns
+
+
+async def _queue_drain(latencies, expected):
+    while len(latencies) < expected:
+        await asyncio.sleep(0)
+
+
+async def main():
+    print(f"{SYMBOLS} symbols, {PER_CLIENT} per client, {SLOW_FRACTION:.1%} slow clients ({SLOW_SEND_MS} ms/send)")
+    print(f"{'clients':>8} {'impl':>8} {'poll ms':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for n in CLIENTS:
+        for name, manager, drain in [
+            ("old", legacy.ConnectionManager(), _sequential_drain),
+            ("new", ConnectionManager(), _queue_drain),
+        ]:
+            poll, p50, p99 = await run(manager, n, drain)
+            print(f"{n:>8} {name:>8} {poll:>10.1f} {p50:>10.1f} {p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
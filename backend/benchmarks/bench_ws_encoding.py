@@ -0,0 +1,52 @@
+"""WebSocket message encodings: encode time and payload size per mode.
+
+stdlib json is the old encoder; json (orjson when installed), msgpack
+(skipped if not installed) and packed are the per-connection options.
+
+Run from backend/:  python -m benchmarks.bench_ws_encoding
+"""
+
+import json
+
+from app.websocket.codecs import CODECS, orjson
+from benchmarks.common import best_of
+
+N = 10_000
+
+
+def sample_messages():
+    quote = {
+        "symbol": "RELIANCE", "name": "Reliance Industries Ltd", "last_price": 2945.35,
+        "prev_close": 2931.1, "day_change": 14.25, "day_change_pct": 0.49,
+        "volume": 5123456, "timestamp": "2024-05-02T11:32:05.123456",
+    }
+    bar = {"time": 1714629900, "open": 2941.0, "high": 2946.5, "low": 2940.2, "close": 2945.35, "volume": 18250}
+    batch = {f"SYM{i}": {**quote, "symbol": f"SYM{i}"} for i in range(40)}
+    return {
+        "price": {"type": "price", "symbol": "RELIANCE", "data": quote},
+        "candle": {"type": "candle", "symbol": "RELIANCE", "interval": "1m", "closed": False, "data": bar},
+        "prices (40, full)": {"type": "prices", "seq": 1, "full": True, "data": batch},
+    }
+
+
+def main():
+    encoders = {"stdlib json": json.dumps}
+    for name, codec in CODECS.items():
+        label = "orjson" if name == "json" and orjson is not None else name
+        encoders[label] = codec.encode
+    if "msgpack" not in CODECS:
+        print("msgpack not installed; skipping it\n")
+
+    for title, message in sample_messages().items():
+        print(title)
+        print(f"{'encoding':>12} {'us/msg':>10} {'bytes':>8}")
+        for name, encode in encoders.items():
+            payload = encode(message)
+            size = len(payload.encode() if isinstance(payload, str) else payload)
+            t = best_of(lambda: [encode(message) for _ in range(N)], repeat=3)
+            print(f"{name:>12} {t / N * 1e6:>10.2f} {size:>8}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
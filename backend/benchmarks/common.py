@@ -0,0 +1,58 @@
+"""Shared helpers for the offline benchmark scripts."""
+
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+SIZES = [100, 1_000, 10_000, 100_000]
+
+
+def synthetic_candles(n: int, seed: int = 7, start: int = 1_700_000_000, step: int = 300) -> List[Dict]:
+    """Random-walk OHLCV candles rounded like `_fetch_history` output.
+
+    A slice of candles is forced flat (open == close) so doji-type and
+    equal-level branches are exercised as well.
+    """
+    rng = np.random.default_rng(seed)
+    close = 1000 + np.cumsum(rng.normal(0, 4, n))
+    open_ = close + rng.normal(0, 3, n)
+    flat = rng.random(n) < 0.05
+    open_[flat] = close[flat]
+    high = np.maximum(open_, close) + np.abs(rng.normal(0, 2.5, n))
+    low = np.minimum(open_, close) - np.abs(rng.normal(0, 2.5, n))
+    volume = rng.integers(10_000, 1_000_000, n)
+
+    return [
+        {
+            "time": start + i * step,
+            "open": round(float(open_[i]), 2),
+            "high": round(float(high[i]), 2),
+            "low": round(float(low[i]), 2),
+            "close": round(float(close[i]), 2),
+            "volume": int(volume[i]),
+        }
+        for i in range(n)
+    ]
+
+
+def best_of(fn: Callable, *args, repeat: int = 5, budget: float = 2.0) -> float:
+    """Best wall time in seconds over up to `repeat` runs within `budget`."""
+    best = float("inf")
+    deadline = time.perf_counter() + budget
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+        if time.perf_counter() > deadline:
+            break
+    return best
+
+
+def report(title: str, rows: List[tuple]):
+    """Print an old/new timing table: rows are (size, old_s, new_s)."""
+    print(title)
+    print(f"{'candles':>10} {'old ms':>12} {'new ms':>12} {'speedup':>9}")
+    for size, old, new in rows:
+        print(f"{size:>10} {old * 1e3:>12.3f} {new * 1e3:>12.3f} {old / new:>8.1f}x")
+    print()
@@ -0,0 +1,710 @@
+"""Reference copies of superseded implementations.
+
+The benchmarks time these against the current code and assert that both
+produce identical output, so they must stay byte-for-byte faithful to the
+versions they replaced (only a function name is changed where it would
+clash).
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+from scipy.signal import argrelextrema
+from typing import List, Dict, Optional
+
+from app.utils.candles import CandleFrame
+
+
+# --- app/ai/candlestick_patterns.detect_patterns (per-candle loop) ---
+
+def _body(o, c):
+    return abs(c - o)
+
+
+def _upper_shadow(h, o, c):
+    return h - max(o, c)
+
+
+def _lower_shadow(o, c, l):
+    return min(o, c) - l
+
+
+def _is_bullish(o, c):
+    return c > o
+
+
+def _is_bearish(o, c):
+    return c < o
+
+
+def detect_candlestick_patterns(candles: List[Dict]) -> List[Dict]:
+    """Detect candlestick patterns from OHLCV data."""
+    if len(candles) < 5:
+        return []
+
+    df = pd.DataFrame(candles)
+    patterns = []
+
+    o = df["open"].values
+    h = df["high"].values
+    l = df["low"].values
+    c = df["close"].values
+    v = df["volume"].values
+    times = df["time"].values
+
+    avg_body = pd.Series(abs(c - o)).rolling(20).mean().values
+
+    for i in range(2, len(df)):
+        body_i = _body(o[i], c[i])
+        upper_i = _upper_shadow(h[i], o[i], c[i])
+        lower_i = _lower_shadow(o[i], c[i], l[i])
+        avg = avg_body[i] if not np.isnan(avg_body[i]) else body_i
+
+        if avg == 0:
+            avg = 0.01
+
+        # --- Single candle patterns ---
+
+        # Doji
+        if body_i < avg * 0.1:
+            patterns.append({
+                "time": int(times[i]),
+                "pattern_name": "Doji",
+                "direction": "NEUTRAL",
+                "confidence": 0.6,
+                "description": "Indecision candle - open and close nearly equal",
+            })
+
+        # Hammer (bullish reversal)
+        if (lower_i > body_i * 2 and upper_i < body_i * 0.3 and
+                body_i > avg * 0.3 and _is_bullish(o[i], c[i])):
+            patterns.append({
+                "time": int(times[i]),
+                "pattern_name": "Hammer",
+                "direction": "BULLISH",
+                "confidence": 0.7,
+                "description": "Bullish reversal - long lower shadow with small body at top",
+            })
+
+        # Inverted Hammer
+        if (upper_i > body_i * 2 and lower_i < body_i * 0.3 and
+                body_i > avg * 0.3 and _is_bullish(o[i], c[i])):
+            patterns.append({
+                "time": int(times[i]),
+                "pattern_name": "Inverted Hammer",
+                "direction": "BULLISH",
+                "confidence": 0.65,
+                "description": "Potential bullish reversal - long upper shadow",
+            })
+
+        # Shooting Star (bearish)
+        if (upper_i > body_i * 2 and lower_i < body_i * 0.3 and
+                body_i > avg * 0.3 and _is_bearish(o[i], c[i])):
+            patterns.append({
+                "time": int(times[i]),
+                "pattern_name": "Shooting Star",
+                "direction": "BEARISH",
+                "confidence": 0.7,
+                "description": "Bearish reversal - long upper shadow with small body at bottom",
+            })
+
+        # Hanging Man
+        if (lower_i > body_i * 2 and upper_i < body_i * 0.3 and
+                body_i > avg * 0.3 and _is_bearish(o[i], c[i])):
+            patterns.append({
+                "time": int(times[i]),
+                "pattern_name": "Hanging Man",
+                "direction": "BEARISH",
+                "confidence": 0.65,
+                "description": "Bearish reversal - long lower shadow at top of uptrend",
+            })
+
+        # Marubozu (Bullish)
+        if (_is_bullish(o[i], c[i]) and body_i > avg * 1.5 and
+                upper_i < body_i * 0.05 and lower_i < body_i * 0.05):
+            patterns.append({
+                "time": int(times[i]),
+                "pattern_name": "Bullish Marubozu",
+                "direction": "BULLISH",
+                "confidence": 0.75,
+                "description": "Strong bullish candle with no shadows",
+            })
+
+        # Marubozu (Bearish)
+        if (_is_bearish(o[i], c[i]) and body_i > avg * 1.5 and
+                upper_i < body_i * 0.05 and lower_i < body_i * 0.05):
+            patterns.append({
+                "time": int(times[i]),
+                "pattern_name": "Bearish Marubozu",
+                "direction": "BEARISH",
+                "confidence": 0.75,
+                "description": "Strong bearish candle with no shadows",
+            })
+
+        # Spinning Top
+        if (body_i < avg * 0.3 and upper_i > body_i and lower_i > body_i):
+            if body_i > avg * 0.05:  # Not a doji
+                patterns.append({
+                    "time": int(times[i]),
+                    "pattern_name": "Spinning Top",
+                    "direction": "NEUTRAL",
+                    "confidence": 0.55,
+                    "description": "Indecision - small body with shadows on both sides",
+                })
+
+        if i < 1:
+            continue
+
+        # --- Two candle patterns ---
+        body_prev = _body(o[i-1], c[i-1])
+
+        # Bullish Engulfing
+        if (_is_bearish(o[i-1], c[i-1]) and _is_bullish(o[i], c[i]) and
+                o[i] <= c[i-1] and c[i] >= o[i-1] and body_i > body_prev):
+            patterns.append({
+                "time": int(times[i]),
+                "pattern_name": "Bullish Engulfing",
+                "direction": "BULLISH",
+                "confidence": 0.8,
+                "description": "Strong bullish reversal - bullish candle completely engulfs previous bearish candle",
+            })
+
+        # Bearish Engulfing
+        if (_is_bullish(o[i-1], c[i-1]) and _is_bearish(o[i], c[i]) and
+                o[i] >= c[i-1] and c[i] <= o[i-1] and body_i > body_prev):
+            patterns.append({
+                "time": int(times[i]),
+                "pattern_name": "Bearish Engulfing",
+                "direction": "BEARISH",
+                "confidence": 0.8,
+                "description": "Strong bearish reversal - bearish candle completely engulfs previous bullish candle",
+            })
+
+        # Piercing Line
+        if (_is_bearish(o[i-1], c[i-1]) and _is_bullish(o[i], c[i]) and
+                o[i] < l[i-1] and c[i] > (o[i-1] + c[i-1]) / 2 and c[i] < o[i-1]):
+            patterns.append({
+                "time": int(times[i]),
+                "pattern_name": "Piercing Line",
+                "direction": "BULLISH",
+                "confidence": 0.7,
+                "description": "Bullish reversal - opens below previous low, closes above midpoint",
+            })
+
+        # Dark Cloud Cover
+        if (_is_bullish(o[i-1], c[i-1]) and _is_bearish(o[i], c[i]) and
+                o[i] > h[i-1] and c[i] < (o[i-1] + c[i-1]) / 2 and c[i] > o[i-1]):
+            patterns.append({
+                "time": int(times[i]),
+                "pattern_name": "Dark Cloud Cover",
+                "direction": "BEARISH",
+                "confidence": 0.7,
+                "description": "Bearish reversal - opens above previous high, closes below midpoint",
+            })
+
+        # Tweezer Bottom
+        if (abs(l[i] - l[i-1]) < avg * 0.05 and
+                _is_bearish(o[i-1], c[i-1]) and _is_bullish(o[i], c[i])):
+            patterns.append({
+                "time": int(times[i]),
+                "pattern_name": "Tweezer Bottom",
+                "direction": "BULLISH",
+                "confidence": 0.65,
+                "description": "Bullish reversal - two candles with matching lows",
+            })
+
+        # Tweezer Top
+        if (abs(h[i] - h[i-1]) < avg * 0.05 and
+                _is_bullish(o[i-1], c[i-1]) and _is_bearish(o[i], c[i])):
+            patterns.append({
+                "time": int(times[i]),
+                "pattern_name": "Tweezer Top",
+                "direction": "BEARISH",
+                "confidence": 0.65,
+                "description": "Bearish reversal - two candles with matching highs",
+            })
+
+        if i < 2:
+            continue
+
+        # --- Three candle patterns ---
+
+        # Morning Star
+        body_2 = _body(o[i-2], c[i-2])
+        if (_is_bearish(o[i-2], c[i-2]) and body_2 > avg and
+                body_prev < avg * 0.3 and
+                _is_bullish(o[i], c[i]) and body_i > avg and
+                c[i] > (o[i-2] + c[i-2]) / 2):
+            patterns.append({
+                "time": int(times[i]),
+                "pattern_name": "Morning Star",
+                "direction": "BULLISH",
+                "confidence": 0.85,
+                "description": "Strong bullish reversal - three candle pattern with gap down and recovery",
+            })
+
+        # Evening Star
+        if (_is_bullish(o[i-2], c[i-2]) and body_2 > avg and
+                body_prev < avg * 0.3 and
+                _is_bearish(o[i], c[i]) and body_i > avg and
+                c[i] < (o[i-2] + c[i-2]) / 2):
+            patterns.append({
+                "time": int(times[i]),
+                "pattern_name": "Evening Star",
+                "direction": "BEARISH",
+                "confidence": 0.85,
+                "description": "Strong bearish reversal - three candle pattern with gap up and decline",
+            })
+
+        # Three White Soldiers
+        if (all(_is_bullish(o[i-j], c[i-j]) for j in range(3)) and
+                c[i] > c[i-1] > c[i-2] and
+                o[i] > o[i-1] > o[i-2] and
+                all(_body(o[i-j], c[i-j]) > avg * 0.5 for j in range(3))):
+            patterns.append({
+                "time": int(times[i]),
+                "pattern_name": "Three White Soldiers",
+                "direction": "BULLISH",
+                "confidence": 0.85,
+                "description": "Strong bullish continuation - three consecutive long bullish candles",
+            })
+
+        # Three Black Crows
+        if (all(_is_bearish(o[i-j], c[i-j]) for j in range(3)) and
+                c[i] < c[i-1] < c[i-2] and
+                o[i] < o[i-1] < o[i-2] and
+                all(_body(o[i-j], c[i-j]) > avg * 0.5 for j in range(3))):
+            patterns.append({
+                "time": int(times[i]),
+                "pattern_name": "Three Black Crows",
+                "direction": "BEARISH",
+                "confidence": 0.85,
+                "description": "Strong bearish continuation - three consecutive long bearish candles",
+            })
+
+    return patterns
+
+
+# --- app/services/indicator_service RSI / Supertrend (iloc-in-loop) ---
+
+def _candles_to_df(candles: List[Dict]) -> pd.DataFrame:
+    df = pd.DataFrame(candles)
+    df.columns = [c.capitalize() if c != "time" else "Time" for c in df.columns]
+    return df
+
+
+def calculate_rsi(candles: List[Dict], period: int = 14) -> List[Dict]:
+    df = _candles_to_df(candles)
+    delta = df["Close"].diff()
+    gain = delta.where(delta > 0, 0.0)
+    loss = (-delta).where(delta < 0, 0.0)
+
+    avg_gain = gain.rolling(window=period).mean()
+    avg_loss = loss.rolling(window=period).mean()
+
+    for i in range(period, len(df)):
+        avg_gain.iloc[i] = (avg_gain.iloc[i-1] * (period - 1) + gain.iloc[i]) / period
+        avg_loss.iloc[i] = (avg_loss.iloc[i-1] * (period - 1) + loss.iloc[i]) / period
+
+    rs = avg_gain / avg_loss
+    rsi = 100 - (100 / (1 + rs))
+
+    return [{"time": c["time"], "value": round(float(v), 2) if not pd.isna(v) else None}
+            for c, v in zip(candles, rsi)]
+
+
+def calculate_supertrend(candles: List[Dict], period: int = 10, multiplier: float = 3.0) -> List[Dict]:
+    df = _candles_to_df(candles)
+    high = df["High"]
+    low = df["Low"]
+    close = df["Close"]
+
+    tr = pd.concat([
+        high - low,
+        (high - close.shift(1)).abs(),
+        (low - close.shift(1)).abs()
+    ], axis=1).max(axis=1)
+    atr_series = tr.rolling(window=period).mean()
+
+    hl2 = (high + low) / 2
+    upper_band = hl2 + (multiplier * atr_series)
+    lower_band = hl2 - (multiplier * atr_series)
+
+    supertrend = pd.Series(index=df.index, dtype=float)
+    direction = pd.Series(index=df.index, dtype=float)
+
+    supertrend.iloc[period - 1] = upper_band.iloc[period - 1]
+    direction.iloc[period - 1] = -1
+
+    for i in range(period, len(df)):
+        if close.iloc[i] > supertrend.iloc[i - 1]:
+            supertrend.iloc[i] = max(lower_band.iloc[i], supertrend.iloc[i - 1]) if direction.iloc[i-1] == 1 else lower_band.iloc[i]
+            direction.iloc[i] = 1
+        else:
+            supertrend.iloc[i] = min(upper_band.iloc[i], supertrend.iloc[i - 1]) if direction.iloc[i-1] == -1 else upper_band.iloc[i]
+            direction.iloc[i] = -1
+
+    return [{"time": c["time"], "value": round(float(v), 2) if not pd.isna(v) else None,
+             "color": "#22c55e" if d == 1 else "#ef4444" if d == -1 else None}
+            for c, v, d in zip(candles, supertrend, direction)]
+
+
+# --- app/websocket/manager.ConnectionManager price fan-out (scan + sequential await) ---
+
+class ConnectionManager:
+    def __init__(self):
+        self._price_connections = {}
+
+    async def connect_prices(self, websocket):
+        await websocket.accept()
+        self._price_connections[websocket] = set()
+
+    def disconnect_prices(self, websocket):
+        self._price_connections.pop(websocket, None)
+
+    def subscribe(self, websocket, symbols: List[str]):
+        if websocket in self._price_connections:
+            self._price_connections[websocket].update(s.upper() for s in symbols)
+
+    async def broadcast_price(self, symbol: str, data: Dict):
+        message = json.dumps({"type": "price", "symbol": symbol, "data": data})
+        dead = []
+        for ws, symbols in self._price_connections.items():
+            if symbol in symbols:
+                try:
+                    await ws.send_text(message)
+                except Exception:
+                    dead.append(ws)
+        for ws in dead:
+            self.disconnect_prices(ws)
+
+
+# --- app/services/screener_service.run_screen (per-symbol loop) ---
+
+def run_screen(
+    symbols: List[str],
+    quotes: Dict[str, Dict],
+    histories: Dict[str, CandleFrame],
+    min_pe: Optional[float] = None,
+    max_pe: Optional[float] = None,
+    min_market_cap: Optional[float] = None,
+    max_market_cap: Optional[float] = None,
+    min_rsi: Optional[float] = None,
+    max_rsi: Optional[float] = None,
+    macd_cross: Optional[str] = None,
+    min_volume_ratio: Optional[float] = None,
+    near_52w_high_pct: Optional[float] = None,
+    near_52w_low_pct: Optional[float] = None,
+    min_roe: Optional[float] = None,
+    max_debt_to_equity: Optional[float] = None,
+) -> List[Dict]:
+    """Run screener with given filters (quotes and histories passed in)."""
+    from app.services.indicator_service import calculate_rsi, calculate_macd
+
+    results = []
+
+    for symbol in symbols:
+        try:
+            quote = quotes.get(symbol)
+            if not quote:
+                continue
+
+            stock_data = {
+                "symbol": symbol,
+                "name": quote.get("name", symbol),
+                "last_price": quote.get("last_price", 0),
+                "day_change": quote.get("day_change", 0),
+                "day_change_pct": quote.get("day_change_pct", 0),
+                "volume": quote.get("volume", 0),
+                "passed_filters": [],
+            }
+
+            # Technical filters that need historical data
+            need_technicals = any([min_rsi, max_rsi, macd_cross, min_volume_ratio])
+
+            if need_technicals:
+                candles = histories.get(symbol)
+                if candles and len(candles) > 20:
+                    # RSI filter
+                    if min_rsi is not None or max_rsi is not None:
+                        rsi_data = calculate_rsi(candles)
+                        current_rsi = None
+                        for r in reversed(rsi_data):
+                            if r["value"] is not None:
+                                current_rsi = r["value"]
+                                break
+                        if current_rsi is not None:
+                            stock_data["rsi"] = round(current_rsi, 2)
+                            if min_rsi and current_rsi < min_rsi:
+                                continue
+                            if max_rsi and current_rsi > max_rsi:
+                                continue
+                            stock_data["passed_filters"].append("RSI")
+
+                    # MACD filter
+                    if macd_cross:
+                        macd_data = calculate_macd(candles)
+                        macd_vals = macd_data["macd"]
+                        signal_vals = macd_data["signal"]
+                        if len(macd_vals) >= 2:
+                            m1 = macd_vals[-1]["value"]
+                            m2 = macd_vals[-2]["value"]
+                            s1 = signal_vals[-1]["value"]
+                            s2 = signal_vals[-2]["value"]
+                            if m1 is not None and m2 is not None and s1 is not None and s2 is not None:
+                                if macd_cross == "bullish" and m2 < s2 and m1 > s1:
+                                    stock_data["passed_filters"].append("MACD Bullish Cross")
+                                elif macd_cross == "bearish" and m2 > s2 and m1 < s1:
+                                    stock_data["passed_filters"].append("MACD Bearish Cross")
+                                elif macd_cross == "bullish" and not (m2 < s2 and m1 > s1):
+                                    continue
+                                elif macd_cross == "bearish" and not (m2 > s2 and m1 < s1):
+                                    continue
+
+                    # Volume filter
+                    if min_volume_ratio:
+                        volumes = candles.volume[-20:].tolist()
+                        avg_vol = sum(volumes) / len(volumes) if volumes else 0
+                        current_vol = int(candles.volume[-1])
+                        ratio = current_vol / avg_vol if avg_vol > 0 else 0
+                        stock_data["volume_ratio"] = round(ratio, 2)
+                        if ratio < min_volume_ratio:
+                            continue
+                        stock_data["passed_filters"].append("High Volume")
+
+            results.append(stock_data)
+
+        except Exception:
+            continue
+
+    results.sort(key=lambda x: abs(x.get("day_change_pct", 0)), reverse=True)
+    return results
+
+
+# --- app/ai/chart_patterns (extrema searched per detector, per-pair/triple loops) ---
+
+def _find_peaks_troughs(closes: np.ndarray, order: int = 5):
+    """Find local peaks and troughs."""
+    peaks = argrelextrema(closes, np.greater, order=order)[0]
+    troughs = argrelextrema(closes, np.less, order=order)[0]
+    return peaks, troughs
+
+
+def detect_head_and_shoulders(candles: CandleFrame, order: int = 5) -> List[Dict]:
+    """Detect Head and Shoulders pattern."""
+    patterns = []
+    if len(candles) < 30:
+        return patterns
+
+    closes = candles.close
+    times = candles.time
+    peaks, troughs = _find_peaks_troughs(closes, order)
+
+    if len(peaks) < 3 or len(troughs) < 2:
+        return patterns
+
+    for i in range(len(peaks) - 2):
+        p1, p2, p3 = peaks[i], peaks[i + 1], peaks[i + 2]
+        left_shoulder = closes[p1]
+        head = closes[p2]
+        right_shoulder = closes[p3]
+
+        # Head should be highest
+        if head <= left_shoulder or head <= right_shoulder:
+            continue
+
+        # Shoulders should be roughly equal (within 3%)
+        shoulder_diff = abs(left_shoulder - right_shoulder) / max(left_shoulder, right_shoulder)
+        if shoulder_diff > 0.03:
+            continue
+
+        # Find neckline troughs between shoulders
+        t_between = troughs[(troughs > p1) & (troughs < p3)]
+        if len(t_between) < 2:
+            continue
+
+        confidence = 0.7 + min(0.2, (1 - shoulder_diff) * 0.2)
+
+        patterns.append({
+            "time": int(times[p3]),
+            "pattern_name": "Head and Shoulders",
+            "direction": "BEARISH",
+            "confidence": round(confidence, 2),
+            "description": f"Bearish reversal pattern. Head: {head:.2f}, Shoulders: {left_shoulder:.2f}/{right_shoulder:.2f}",
+            "points": {
+                "left_shoulder": {"time": int(times[p1]), "price": float(left_shoulder)},
+                "head": {"time": int(times[p2]), "price": float(head)},
+                "right_shoulder": {"time": int(times[p3]), "price": float(right_shoulder)},
+            }
+        })
+
+    return patterns
+
+
+def detect_double_top_bottom(candles: CandleFrame, order: int = 5) -> List[Dict]:
+    """Detect Double Top and Double Bottom patterns."""
+    patterns = []
+    if len(candles) < 20:
+        return patterns
+
+    closes = candles.close
+    times = candles.time
+    peaks, troughs = _find_peaks_troughs(closes, order)
+
+    # Double Top
+    for i in range(len(peaks) - 1):
+        p1, p2 = peaks[i], peaks[i + 1]
+        if p2 - p1 < 5:
+            continue
+        price_diff = abs(closes[p1] - closes[p2]) / max(closes[p1], closes[p2])
+        if price_diff < 0.02:
+            confidence = 0.75 + min(0.15, (1 - price_diff) * 0.15)
+            patterns.append({
+                "time": int(times[p2]),
+                "pattern_name": "Double Top",
+                "direction": "BEARISH",
+                "confidence": round(confidence, 2),
+                "description": f"Bearish reversal - two peaks at similar levels ({closes[p1]:.2f}, {closes[p2]:.2f})",
+            })
+
+    # Double Bottom
+    for i in range(len(troughs) - 1):
+        t1, t2 = troughs[i], troughs[i + 1]
+        if t2 - t1 < 5:
+            continue
+        price_diff = abs(closes[t1] - closes[t2]) / max(closes[t1], closes[t2])
+        if price_diff < 0.02:
+            confidence = 0.75 + min(0.15, (1 - price_diff) * 0.15)
+            patterns.append({
+                "time": int(times[t2]),
+                "pattern_name": "Double Bottom",
+                "direction": "BULLISH",
+                "confidence": round(confidence, 2),
+                "description": f"Bullish reversal - two troughs at similar levels ({closes[t1]:.2f}, {closes[t2]:.2f})",
+            })
+
+    return patterns
+
+
+def detect_triangles(candles: CandleFrame, min_points: int = 4) -> List[Dict]:
+    """Detect triangle patterns (ascending, descending, symmetric)."""
+    patterns = []
+    if len(candles) < 20:
+        return patterns
+
+    closes = candles.close
+    highs = candles.high
+    lows = candles.low
+    times = candles.time
+
+    peaks, troughs = _find_peaks_troughs(closes, order=3)
+
+    if len(peaks) < 2 or len(troughs) < 2:
+        return patterns
+
+    # Check recent peaks and troughs (last 30 candles)
+    window = min(30, len(candles))
+    recent_peaks = peaks[peaks > len(candles) - window]
+    recent_troughs = troughs[troughs > len(candles) - window]
+
+    if len(recent_peaks) >= 2 and len(recent_troughs) >= 2:
+        peak_values = closes[recent_peaks]
+        trough_values = closes[recent_troughs]
+
+        peaks_slope = (peak_values[-1] - peak_values[0]) / (recent_peaks[-1] - recent_peaks[0]) if recent_peaks[-1] != recent_peaks[0] else 0
+        troughs_slope = (trough_values[-1] - trough_values[0]) / (recent_troughs[-1] - recent_troughs[0]) if recent_troughs[-1] != recent_troughs[0] else 0
+
+        # Ascending Triangle
+        if abs(peaks_slope) < 0.1 and troughs_slope > 0.1:
+            patterns.append({
+                "time": int(times[-1]),
+                "pattern_name": "Ascending Triangle",
+                "direction": "BULLISH",
+                "confidence": 0.7,
+                "description": "Bullish continuation - flat resistance with rising support",
+            })
+
+        # Descending Triangle
+        elif peaks_slope < -0.1 and abs(troughs_slope) < 0.1:
+            patterns.append({
+                "time": int(times[-1]),
+                "pattern_name": "Descending Triangle",
+                "direction": "BEARISH",
+                "confidence": 0.7,
+                "description": "Bearish continuation - declining resistance with flat support",
+            })
+
+        # Symmetric Triangle
+        elif peaks_slope < -0.05 and troughs_slope > 0.05:
+            patterns.append({
+                "time": int(times[-1]),
+                "pattern_name": "Symmetric Triangle",
+                "direction": "NEUTRAL",
+                "confidence": 0.65,
+                "description": "Converging trendlines - breakout direction unclear",
+            })
+
+    return patterns
+
+
+def detect_wedges(candles: CandleFrame) -> List[Dict]:
+    """Detect Rising and Falling Wedge patterns."""
+    patterns = []
+    if len(candles) < 20:
+        return patterns
+
+    closes = candles.close
+    highs = candles.high
+    lows = candles.low
+    times = candles.time
+
+    peaks, troughs = _find_peaks_troughs(closes, order=3)
+
+    if len(peaks) < 2 or len(troughs) < 2:
+        return patterns
+
+    window = min(30, len(candles))
+    recent_peaks = peaks[peaks > len(candles) - window]
+    recent_troughs = troughs[troughs > len(candles) - window]
+
+    if len(recent_peaks) >= 2 and len(recent_troughs) >= 2:
+        peak_values = closes[recent_peaks]
+        trough_values = closes[recent_troughs]
+
+        peaks_slope = (peak_values[-1] - peak_values[0]) / (recent_peaks[-1] - recent_peaks[0]) if recent_peaks[-1] != recent_peaks[0] else 0
+        troughs_slope = (trough_values[-1] - trough_values[0]) / (recent_troughs[-1] - recent_troughs[0]) if recent_troughs[-1] != recent_troughs[0] else 0
+
+        range_narrowing = (peak_values[-1] - trough_values[-1]) < (peak_values[0] - trough_values[0])
+
+        # Rising Wedge (bearish)
+        if peaks_slope > 0 and troughs_slope > 0 and range_narrowing:
+            patterns.append({
+                "time": int(times[-1]),
+                "pattern_name": "Rising Wedge",
+                "direction": "BEARISH",
+                "confidence": 0.7,
+                "description": "Bearish reversal - both support and resistance rising but converging",
+            })
+
+        # Falling Wedge (bullish)
+        elif peaks_slope < 0 and troughs_slope < 0 and range_narrowing:
+            patterns.append({
+                "time": int(times[-1]),
+                "pattern_name": "Falling Wedge",
+                "direction": "BULLISH",
+                "confidence": 0.7,
+                "description": "Bullish reversal - both support and resistance falling but converging",
+            })
+
+    return patterns
+
+
+def detect_all_chart_patterns(candles: CandleFrame) -> List[Dict]:
+    """Run all chart pattern detectors."""
+    patterns = []
+    patterns.extend(detect_head_and_shoulders(candles))
+    patterns.extend(detect_double_top_bottom(candles))
+    patterns.extend(detect_triangles(candles))
+    patterns.extend(detect_wedges(candles))
+    return patterns
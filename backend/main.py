@@ -3,16 +3,21 @@
 import asyncio
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.config import settings
 from app.database import init_db
-from app.routers import stocks, market, charts, portfolio, patterns, screener, news
+from app.routers import stocks, market, charts, portfolio, patterns, screener, news, metrics
+from app.services.cpu_executor import cpu_executor, CPUExecutorBusy
 from app.websocket.price_feed import price_ws_endpoint
 from app.websocket.market_feed import market_ws_endpoint
 from app.tasks.price_poller import price_poller
 from app.tasks.index_poller import index_poller
+from app.tasks.snapshot_poller import snapshot_poller
+from app.tasks.indicator_snapshot_poller import indicator_snapshot_poller
+from app.tasks.fundamentals_poller import fundamentals_poller
 from app.tasks.news_poller import news_poller
 from app.tasks.pattern_scanner import pattern_scanner
 
@@ -26,11 +31,15 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Stock Market Analyzer...")
     await init_db()
     logger.info("Database initialized")
+    await cpu_executor.start()
 
     # Start background tasks
     tasks = [
         asyncio.create_task(price_poller()),
         asyncio.create_task(index_poller()),
+        asyncio.create_task(snapshot_poller()),
+        asyncio.create_task(indicator_snapshot_poller()),
+        asyncio.create_task(fundamentals_poller()),
         asyncio.create_task(news_poller()),
         asyncio.create_task(pattern_scanner()),
     ]
@@ -41,6 +50,7 @@ async def lifespan(app: FastAPI):
     # Shutdown
     for task in tasks:
         task.cancel()
+    cpu_executor.shutdown()
     logger.info("Shutting down...")
 
 
@@ -60,6 +70,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(CPUExecutorBusy)
+async def cpu_busy_handler(request: Request, exc: CPUExecutorBusy):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
 # REST API Routers
 app.include_router(stocks.router)
 app.include_router(market.router)
@@ -68,6 +84,7 @@ app.include_router(portfolio.router)
 app.include_router(patterns.router)
 app.include_router(screener.router)
 app.include_router(news.router)
+app.include_router(metrics.router)
 
 
 # WebSocket endpoints